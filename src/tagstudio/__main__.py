@@ -6,6 +6,7 @@
 """TagStudio launcher."""
 
 import argparse
+import multiprocessing
 import sys
 import traceback
 
@@ -19,6 +20,9 @@ logger = structlog.get_logger(__name__)
 
 
 def main():
+    # Required for process pools to work in frozen (PyInstaller) builds.
+    multiprocessing.freeze_support()
+
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-o",
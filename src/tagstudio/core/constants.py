@@ -21,6 +21,9 @@ BACKUP_FOLDER_NAME: str = "backups"
 COLLAGE_FOLDER_NAME: str = "collages"
 IGNORE_NAME: str = ".ts_ignore"
 THUMB_CACHE_NAME: str = "thumbs"
+REFRESH_CHECKPOINT_NAME: str = "refresh_checkpoint"
+REFRESH_REPORTS_NAME: str = "refresh_reports.json"
+THUMB_PREGENERATION_NAME: str = "thumb_pregeneration.json"
 
 FONT_SAMPLE_TEXT: str = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789!?@$%(){}[]"
 FONT_SAMPLE_SIZES: list[int] = [10, 15, 20]
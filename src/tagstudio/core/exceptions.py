@@ -3,3 +3,6 @@
 
 
 class NoRendererError(Exception): ...
+
+
+class RenderCancelledError(Exception): ...
@@ -14,7 +14,10 @@ JSON_FILENAME: str = "ts_library.json"
 
 DB_VERSION_CURRENT_KEY: str = "CURRENT"
 DB_VERSION_INITIAL_KEY: str = "INITIAL"
-DB_VERSION: int = 400
+DB_VERSION: int = 406
+
+# The number of perceptual hashes recorded while rendering that are written in one transaction.
+PERCEPTUAL_HASH_BATCH_SIZE: int = 100
 
 TAG_CHILDREN_QUERY = text("""
 WITH RECURSIVE ChildTags AS (
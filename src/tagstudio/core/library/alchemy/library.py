@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import os
 import re
 import shutil
 import sys
@@ -12,6 +13,7 @@ from dataclasses import dataclass
 from datetime import UTC, datetime
 from os import makedirs
 from pathlib import Path
+from threading import Lock
 from typing import TYPE_CHECKING
 
 import structlog
@@ -25,6 +27,7 @@ from sqlalchemy import (
     Update,
     and_,
     asc,
+    case,
     create_engine,
     delete,
     desc,
@@ -37,7 +40,7 @@ from sqlalchemy import (
     update,
 )
 from sqlalchemy.dialects import sqlite
-from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
 from sqlalchemy.orm import (
     InstanceState,
     Session,
@@ -67,6 +70,7 @@ from tagstudio.core.library.alchemy.constants import (
     DB_VERSION_INITIAL_KEY,
     DEFAULT_FIELD_TEMPLATES,
     JSON_FILENAME,
+    PERCEPTUAL_HASH_BATCH_SIZE,
     SQL_FILENAME,
     TAG_CHILDREN_QUERY,
 )
@@ -84,16 +88,23 @@ from tagstudio.core.library.alchemy.fields import (
 from tagstudio.core.library.alchemy.joins import CategoryExclusion, TagEntry, TagParent
 from tagstudio.core.library.alchemy.migrations import DBMigrations, MigrationError
 from tagstudio.core.library.alchemy.models import (
+    ArchiveCover,
+    AudioWaveform,
     Entry,
+    EntryHash,
     Namespace,
     Tag,
     TagAlias,
     TagColorGroup,
+    TextEncoding,
     Version,
+    VideoProbe,
 )
 from tagstudio.core.library.alchemy.visitors import SQLBoolExpressionBuilder
 from tagstudio.core.library.ignore import migrate_ext_list
 from tagstudio.core.library.json.library import Library as JsonLibrary
+from tagstudio.core.utils.image_hash import SIMILAR_IMAGE_DISTANCE, BKTree
+from tagstudio.core.utils.path_set import PathSet
 from tagstudio.core.utils.types import unwrap
 
 if TYPE_CHECKING:
@@ -208,25 +219,38 @@ class Library:
 
     library_dir: Path | None = None
     engine: Engine | None = None
-    included_files: set[Path] = set()
+    included_files: PathSet = PathSet()
 
     def __init__(self) -> None:
         self.dupe_entries_count: int = -1  # NOTE: For internal management.
         self.dupe_files_count: int = -1
         self.ignored_entries_count: int = -1
         self.unlinked_entries_count: int = -1
+        # Index of perceptual image hashes, built on demand for similar image searches.
+        self._similar_index: BKTree[int] | None = None
+        # Perceptual hashes recorded while rendering that haven't been written yet, by path.
+        # Each is stored with the size and modification time of the file it was computed from.
+        self._pending_perceptual_hashes: dict[Path, tuple[str, int, int]] = {}
+        self._pending_perceptual_hashes_lock = Lock()
 
     def close(self):
         if self.engine:
+            try:
+                self.flush_perceptual_hashes()
+            except SQLAlchemyError as e:
+                logger.warning("[Library] Couldn't save perceptual hashes", error=e)
             self.engine.dispose()
         self.library_dir = None
         self.folder = None
-        self.included_files = set()
+        self.included_files = PathSet()
 
         self.dupe_entries_count = -1
         self.dupe_files_count = -1
         self.ignored_entries_count = -1
         self.unlinked_entries_count = -1
+        self._similar_index = None
+        with self._pending_perceptual_hashes_lock:
+            self._pending_perceptual_hashes.clear()
 
     def migrate_json_to_sqlite(self, json_lib: JsonLibrary):
         """Migrate JSON library data to the SQLite database."""
@@ -492,6 +516,12 @@ class Library:
                     "CREATE INDEX IF NOT EXISTS idx_tag_entries_entry_id ON tag_entries (entry_id)"
                 )
             )
+            session.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS idx_entry_hashes_content_hash "
+                    "ON entry_hashes (content_hash)"
+                )
+            )
 
             session.commit()
 
@@ -695,6 +725,307 @@ class Library:
                 yield entry
                 session.expunge(entry)
 
+    def all_entry_paths(self) -> Iterator[tuple[int, Path]]:
+        """Load the ID and path of every entry, without building full Entry objects."""
+        with Session(self.engine) as session:
+            stmt = select(Entry.id, Entry.path).execution_options(yield_per=10_000)
+            yield from session.execute(stmt).tuples()
+
+    def entry_paths_by_glob(
+        self, globs: list[str], invert: bool = False
+    ) -> Iterator[tuple[int, Path]]:
+        """Load the ID and path of every entry whose path matches any of the GLOB patterns.
+
+        Args:
+            globs (list[str]): The SQLite GLOB patterns to match paths against.
+            invert (bool): Flag for loading the entries that match none of the patterns instead.
+        """
+        if not globs:
+            if invert:
+                yield from self.all_entry_paths()
+            return
+
+        condition = or_(*[Entry.path.op("GLOB")(glob) for glob in globs])
+        with Session(self.engine) as session:
+            stmt = (
+                select(Entry.id, Entry.path)
+                .where(~condition if invert else condition)
+                .execution_options(yield_per=10_000)
+            )
+            yield from session.execute(stmt).tuples()
+
+    def all_entry_hashes(self) -> dict[int, EntryHash]:
+        """Load every stored file hash, keyed by entry ID."""
+        self.flush_perceptual_hashes()
+        with Session(self.engine) as session:
+            hashes = {h.entry_id: h for h in session.scalars(select(EntryHash))}
+            session.expunge_all()
+        return hashes
+
+    def save_entry_hashes(self, hashes: Iterable[EntryHash]) -> None:
+        """Insert or replace the stored file hashes for one or more entries."""
+        values = [
+            {
+                "entry_id": h.entry_id,
+                "size": h.size,
+                "mtime_ns": h.mtime_ns,
+                "partial_hash": h.partial_hash,
+                "content_hash": h.content_hash,
+                "perceptual_hash": h.perceptual_hash,
+            }
+            for h in hashes
+        ]
+        batch_size = MAX_SQL_VARIABLES // 6
+        with Session(self.engine) as session:
+            for sub_list in [values[i : i + batch_size] for i in range(0, len(values), batch_size)]:
+                stmt = sqlite.insert(EntryHash).values(sub_list)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[EntryHash.entry_id],
+                    set_={
+                        "size": stmt.excluded.size,
+                        "mtime_ns": stmt.excluded.mtime_ns,
+                        "partial_hash": stmt.excluded.partial_hash,
+                        "content_hash": stmt.excluded.content_hash,
+                        "perceptual_hash": stmt.excluded.perceptual_hash,
+                    },
+                )
+                session.execute(stmt)
+            session.commit()
+        self._similar_index = None
+
+    def save_perceptual_hash(self, path: Path, perceptual_hash: str) -> None:
+        """Store the perceptual hash of an image, computed while it was already decoded.
+
+        Hashes are written in batches, so rendering a page of thumbnails doesn't commit once per
+        image. Pending hashes are written before hashes are read, and when the library closes.
+        Any other stored hashes for the entry are kept if the file hasn't changed since they
+        were computed, and discarded otherwise.
+
+        Args:
+            path (Path): The path of the image, relative to the library directory.
+            perceptual_hash (str): The perceptual hash of the image.
+        """
+        try:
+            st = (unwrap(self.library_dir) / path).stat()
+        except OSError:
+            return
+
+        with self._pending_perceptual_hashes_lock:
+            self._pending_perceptual_hashes[path] = (perceptual_hash, st.st_size, st.st_mtime_ns)
+            flush = len(self._pending_perceptual_hashes) >= PERCEPTUAL_HASH_BATCH_SIZE
+        if flush:
+            self.flush_perceptual_hashes()
+
+    def flush_perceptual_hashes(self) -> None:
+        """Write the perceptual hashes recorded by save_perceptual_hash() in one transaction."""
+        with self._pending_perceptual_hashes_lock:
+            pending, self._pending_perceptual_hashes = self._pending_perceptual_hashes, {}
+        if not pending:
+            return
+
+        try:
+            self.__write_perceptual_hashes(pending)
+        except SQLAlchemyError:
+            # Keep the hashes for the next batch, unless newer ones were recorded meanwhile.
+            with self._pending_perceptual_hashes_lock:
+                self._pending_perceptual_hashes = pending | self._pending_perceptual_hashes
+            raise
+        self._similar_index = None
+
+    def __write_perceptual_hashes(self, pending: dict[Path, tuple[str, int, int]]) -> None:
+        paths = list(pending)
+        batch_size = MAX_SQL_VARIABLES // 4
+        with Session(self.engine) as session:
+            for i in range(0, len(paths), batch_size):
+                values = [
+                    {
+                        "entry_id": entry_id,
+                        "size": pending[path][1],
+                        "mtime_ns": pending[path][2],
+                        "perceptual_hash": pending[path][0],
+                    }
+                    for entry_id, path in session.execute(
+                        select(Entry.id, Entry.path).where(
+                            Entry.path.in_(paths[i : i + batch_size])
+                        )
+                    ).tuples()
+                ]
+                if not values:
+                    continue
+                # An upsert, since hash scans may store a row for the same entry meanwhile.
+                # Their other hashes are kept if the file hasn't changed since.
+                stmt = sqlite.insert(EntryHash).values(values)
+                same_file = and_(
+                    EntryHash.size == stmt.excluded.size,
+                    EntryHash.mtime_ns == stmt.excluded.mtime_ns,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[EntryHash.entry_id],
+                    set_={
+                        "size": stmt.excluded.size,
+                        "mtime_ns": stmt.excluded.mtime_ns,
+                        "partial_hash": case((same_file, EntryHash.partial_hash), else_=None),
+                        "content_hash": case((same_file, EntryHash.content_hash), else_=None),
+                        "perceptual_hash": stmt.excluded.perceptual_hash,
+                    },
+                )
+                session.execute(stmt)
+            session.commit()
+
+    def get_video_probe(self, path: Path) -> VideoProbe | None:
+        """Load the stored probe of a video, if the file hasn't changed since it was probed.
+
+        Args:
+            path (Path): The path of the video, relative to the library directory.
+        """
+        return self.__get_file_metadata(VideoProbe, path)
+
+    def save_video_probe(self, path: Path, probe: VideoProbe) -> None:
+        """Store the probe of a video along with the current stats of the file.
+
+        Args:
+            path (Path): The path of the video, relative to the library directory.
+            probe (VideoProbe): The probe results. Its entry ID and file stats are filled in.
+        """
+        self.__save_file_metadata(path, probe)
+
+    def get_audio_waveform(self, path: Path) -> AudioWaveform | None:
+        """Load the stored peaks of an audio file, if the file hasn't changed since.
+
+        Args:
+            path (Path): The path of the audio file, relative to the library directory.
+        """
+        return self.__get_file_metadata(AudioWaveform, path)
+
+    def save_audio_waveform(self, path: Path, waveform: AudioWaveform) -> None:
+        """Store the peaks of an audio file along with the current stats of the file.
+
+        Args:
+            path (Path): The path of the audio file, relative to the library directory.
+            waveform (AudioWaveform): The peaks. Its entry ID and file stats are filled in.
+        """
+        self.__save_file_metadata(path, waveform)
+
+    def get_text_encoding(self, path: Path) -> TextEncoding | None:
+        """Load the stored encoding of a text file, if the file hasn't changed since.
+
+        Args:
+            path (Path): The path of the text file, relative to the library directory.
+        """
+        return self.__get_file_metadata(TextEncoding, path)
+
+    def save_text_encoding(self, path: Path, encoding: TextEncoding) -> None:
+        """Store the detected encoding of a text file along with the current stats of the file.
+
+        Args:
+            path (Path): The path of the text file, relative to the library directory.
+            encoding (TextEncoding): The encoding. Its entry ID and file stats are filled in.
+        """
+        self.__save_file_metadata(path, encoding)
+
+    def get_archive_cover(self, path: Path) -> ArchiveCover | None:
+        """Load the stored cover of an archive, if the file hasn't changed since.
+
+        Args:
+            path (Path): The path of the archive, relative to the library directory.
+        """
+        return self.__get_file_metadata(ArchiveCover, path)
+
+    def save_archive_cover(self, path: Path, cover: ArchiveCover) -> None:
+        """Store the cover of an archive along with the current stats of the file.
+
+        Args:
+            path (Path): The path of the archive, relative to the library directory.
+            cover (ArchiveCover): The cover. Its entry ID and file stats are filled in.
+        """
+        self.__save_file_metadata(path, cover)
+
+    def __get_file_metadata[T: VideoProbe | AudioWaveform | TextEncoding | ArchiveCover](
+        self, model: type[T], path: Path
+    ) -> T | None:
+        """Load the stored metadata of a file, if it's still up to date.
+
+        This runs on render threads, so database errors, e.g. while a refresh is writing, are
+        logged and treated as a miss instead of being raised.
+        """
+        try:
+            st = (unwrap(self.library_dir) / path).stat()
+        except OSError, TypeError:
+            return None
+
+        try:
+            with Session(self.engine) as session:
+                row = session.scalar(
+                    select(model).join(Entry, Entry.id == model.entry_id).where(Entry.path == path)
+                )
+                if row is None or row.size != st.st_size or row.mtime_ns != st.st_mtime_ns:
+                    return None
+                session.expunge(row)
+        except SQLAlchemyError as e:
+            logger.warning(
+                "[Library] Couldn't load file metadata", table=model.__tablename__, error=e
+            )
+            return None
+        return row
+
+    def __save_file_metadata(
+        self, path: Path, row: VideoProbe | AudioWaveform | TextEncoding | ArchiveCover
+    ) -> None:
+        """Store the metadata of a file along with its current stats.
+
+        Database errors are logged and the metadata isn't stored, see __get_file_metadata.
+        """
+        try:
+            st = (unwrap(self.library_dir) / path).stat()
+        except OSError, TypeError:
+            return
+
+        try:
+            with Session(self.engine) as session:
+                entry_id = session.scalar(select(Entry.id).where(Entry.path == path))
+                if entry_id is None:
+                    return
+                row.entry_id = entry_id
+                row.size = st.st_size
+                row.mtime_ns = st.st_mtime_ns
+                session.merge(row)
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.warning(
+                "[Library] Couldn't save file metadata", table=row.__tablename__, error=e
+            )
+
+    def remove_entry_hashes(self, entry_ids: list[int]) -> None:
+        """Remove the stored file hashes for the given entry IDs."""
+        with Session(self.engine) as session:
+            for sub_list in [
+                entry_ids[i : i + MAX_SQL_VARIABLES]
+                for i in range(0, len(entry_ids), MAX_SQL_VARIABLES)
+            ]:
+                session.execute(delete(EntryHash).where(EntryHash.entry_id.in_(sub_list)))
+            session.commit()
+        self._similar_index = None
+
+    def get_dupe_hash_groups(self) -> list[list[int]]:
+        """Return groups of entry IDs whose files share the same content hash."""
+        dupe_hashes = (
+            select(EntryHash.content_hash)
+            .where(EntryHash.content_hash.is_not(None))
+            .group_by(EntryHash.content_hash)
+            .having(func.count() > 1)
+        )
+        stmt = (
+            select(EntryHash.content_hash, EntryHash.entry_id)
+            .where(EntryHash.content_hash.in_(dupe_hashes))
+            .order_by(EntryHash.content_hash, EntryHash.entry_id)
+        )
+
+        groups: dict[str, list[int]] = {}
+        with Session(self.engine) as session:
+            for content_hash, entry_id in session.execute(stmt):
+                groups.setdefault(content_hash, []).append(entry_id)
+        return list(groups.values())
+
     @property
     def tags(self) -> list[Tag]:
         with Session(self.engine) as session:
@@ -728,6 +1059,49 @@ class Library:
         full_ts_path.mkdir(parents=True, exist_ok=True)
         return False
 
+    def all_perceptual_hashes(self) -> Iterator[tuple[int, str]]:
+        """Load the entry ID and perceptual hash of every image that has one."""
+        self.flush_perceptual_hashes()
+        with Session(self.engine) as session:
+            stmt = (
+                select(EntryHash.entry_id, EntryHash.perceptual_hash)
+                .where(EntryHash.perceptual_hash.is_not(None))
+                .execution_options(yield_per=10_000)
+            )
+            yield from session.execute(stmt).tuples()  # pyright: ignore[reportReturnType]
+
+    def get_similar_entry_ids(
+        self, entry_id: int, max_distance: int = SIMILAR_IMAGE_DISTANCE
+    ) -> list[int]:
+        """Return the IDs of entries whose images look similar to the given entry's image.
+
+        Args:
+            entry_id (int): The ID of the entry to compare against, which is included in the
+                results if it has a perceptual hash.
+            max_distance (int): The maximum number of differing perceptual hash bits.
+
+        Returns:
+            list[int]: The IDs of similar entries, closest first. Empty if the entry's image
+                hasn't been hashed.
+        """
+        self.flush_perceptual_hashes()
+        with Session(self.engine) as session:
+            perceptual_hash = session.scalar(
+                select(EntryHash.perceptual_hash).where(EntryHash.entry_id == entry_id)
+            )
+        if perceptual_hash is None:
+            return []
+
+        index = self._similar_index
+        if index is None:
+            index = BKTree[int]()
+            for other_id, other_hash in self.all_perceptual_hashes():
+                index.add(int(other_hash, 16), other_id)
+            self._similar_index = index
+
+        results = sorted(index.search(int(perceptual_hash, 16), max_distance))
+        return [similar_id for _, similar_id in results]
+
     def add_entries(self, items: list[Entry]) -> list[int]:
         """Add multiple Entry records to the Library."""
         assert items
@@ -748,6 +1122,91 @@ class Library:
 
         return new_ids
 
+    def insert_entries(self, paths: list[Path], stats: list[os.stat_result | None]) -> list[int]:
+        """Insert entries for new files in a single transaction, skipping existing paths.
+
+        Unlike add_entries, rows are inserted with Core INSERT statements instead of building
+        Entry objects, and a path that's already in the library doesn't abort the rest.
+
+        Args:
+            paths (list[Path]): The paths of the files, relative to the library directory.
+            stats (list[os.stat_result | None]): The stat result of each file, used for the
+                created and modified dates, or None if the file couldn't be read.
+
+        Returns:
+            list[int]: The IDs of the inserted entries.
+        """
+        date_added = datetime.now()
+        values: list[dict[str, object]] = []
+        for path, st in zip(paths, stats, strict=True):
+            date_created: datetime | None = None
+            date_modified: datetime | None = None
+            if st is not None:
+                # st_birthtime on Windows and Mac, st_ctime on Linux.
+                date_created = datetime.fromtimestamp(getattr(st, "st_birthtime", st.st_ctime))
+                date_modified = datetime.fromtimestamp(st.st_mtime)
+            values.append(
+                {
+                    "path": path,
+                    "filename": path.name,
+                    "suffix": path.suffix.lstrip(".").lower(),
+                    "date_created": date_created,
+                    "date_modified": date_modified,
+                    "date_added": date_added,
+                }
+            )
+
+        # Executed as a single "executemany", which SQLAlchemy splits into multi-row INSERT
+        # statements sized to fit SQLite's variable limit, compiling the statement only once.
+        stmt = sqlite.insert(Entry.__table__).on_conflict_do_nothing().returning(Entry.id)
+        with Session(self.engine) as session:
+            new_ids = list(session.connection().execute(stmt, values).scalars())
+            session.commit()
+
+        if len(new_ids) < len(values):
+            logger.warning(
+                "[Library][insert_entries] Skipped existing paths",
+                skipped=len(values) - len(new_ids),
+            )
+        return new_ids
+
+    def get_modified_dates(
+        self, after_id: int, limit: int
+    ) -> list[tuple[int, Path, datetime | None]]:
+        """Return the stored modification dates of a batch of entries, in order of their IDs.
+
+        Args:
+            after_id (int): Only entries with a greater ID are returned.
+            limit (int): The maximum number of entries to return.
+
+        Returns:
+            list[tuple[int, Path, datetime | None]]: The ID, path and modification date of
+                each entry.
+        """
+        with Session(self.engine) as session:
+            stmt = (
+                select(Entry.id, Entry.path, Entry.date_modified)
+                .where(Entry.id > after_id)
+                .order_by(Entry.id)
+                .limit(limit)
+            )
+            return [(row.id, row.path, row.date_modified) for row in session.execute(stmt)]
+
+    def update_modified_dates(self, dates: dict[int, datetime]) -> None:
+        """Store new modification dates of entries in a single transaction.
+
+        Args:
+            dates (dict[int, datetime]): The new modification date of each entry, by ID.
+        """
+        if not dates:
+            return
+        with Session(self.engine) as session:
+            session.execute(
+                update(Entry),
+                [{"id": entry_id, "date_modified": date} for entry_id, date in dates.items()],
+            )
+            session.commit()
+
     def remove_entries(self, entry_ids: list[int]) -> None:
         """Remove Entry items matching supplied IDs from the Library."""
         with Session(self.engine) as session:
@@ -756,7 +1215,15 @@ class Library:
                 for i in range(0, len(entry_ids), MAX_SQL_VARIABLES)
             ]:
                 session.query(Entry).where(Entry.id.in_(sub_list)).delete()
+                Library.__delete_file_metadata(session, sub_list)
             session.commit()
+        self._similar_index = None
+
+    @staticmethod
+    def __delete_file_metadata(session: Session, entry_ids: Sequence[int]) -> None:
+        """Delete the stored hashes and render metadata of the files of entries."""
+        for model in (EntryHash, VideoProbe, AudioWaveform, TextEncoding, ArchiveCover):
+            session.execute(delete(model).where(model.entry_id.in_(entry_ids)))
 
     def has_entry_with_path(self, path: Path) -> bool:
         """Check if an entry with this path is in the library."""
@@ -1099,6 +1566,87 @@ class Library:
             session.commit()
         return True
 
+    def relink_entries(self, paths: dict[int, Path]) -> None:
+        """Set the paths of multiple entries in a single transaction.
+
+        If an entry already exists at a new path (or an earlier entry in the batch was moved
+        there), the moved entry is merged into it instead: its tags and any fields the other
+        entry doesn't have are moved over, and then it's removed.
+
+        Args:
+            paths (dict[int, Path]): The new path of each entry, keyed by entry ID.
+        """
+        with Session(self.engine) as session:
+            targets = list(set(paths.values()))
+            claimed: dict[Path, int] = {}
+            for i in range(0, len(targets), MAX_SQL_VARIABLES):
+                stmt = select(Entry.path, Entry.id).where(
+                    Entry.path.in_(targets[i : i + MAX_SQL_VARIABLES])
+                )
+                for path, entry_id in session.execute(stmt):
+                    claimed[path] = entry_id
+
+            updates: list[dict[str, int | Path]] = []
+            merges: list[tuple[int, int]] = []
+            for entry_id, path in paths.items():
+                into_id = claimed.setdefault(path, entry_id)
+                if into_id == entry_id:
+                    updates.append({"id": entry_id, "path": path})
+                else:
+                    merges.append((entry_id, into_id))
+
+            if updates:
+                session.execute(update(Entry), updates)
+            for from_id, into_id in merges:
+                self.__merge_entry_rows(session, from_id, into_id)
+            session.commit()
+
+        logger.info("[Library][relink_entries]", relinked=len(updates), merged=len(merges))
+        if merges:
+            self._similar_index = None
+
+    @staticmethod
+    def __merge_entry_rows(session: Session, from_id: int, into_id: int) -> None:
+        """Move the tags and unique fields of one entry to another, then delete the first."""
+        tag_ids = session.scalars(select(TagEntry.tag_id).where(TagEntry.entry_id == from_id)).all()
+        values = [(tag_id, into_id) for tag_id in tag_ids]
+        if values:
+            session.execute(sqlite.insert(TagEntry).values(values).on_conflict_do_nothing())
+        session.execute(delete(TagEntry).where(TagEntry.entry_id == from_id))
+
+        for field_type in (TextField, DatetimeField):
+            existing = set(
+                session.scalars(select(field_type).where(field_type.entry_id == into_id))
+            )
+            fields = session.scalars(select(field_type).where(field_type.entry_id == from_id))
+            for field in fields.all():
+                if field in existing:
+                    session.delete(field)
+                else:
+                    field.entry_id = into_id
+                    existing.add(field)
+
+        session.execute(delete(Entry).where(Entry.id == from_id))
+        Library.__delete_file_metadata(session, [from_id])
+
+    def entry_file_stats(self, entry_ids: list[int]) -> dict[int, tuple[int, int]]:
+        """Load the last known size and modification time of the files of entries.
+
+        Only entries whose files have been hashed have their stats recorded.
+
+        Returns:
+            dict[int, tuple[int, int]]: The size and mtime (in nanoseconds) keyed by entry ID.
+        """
+        stats: dict[int, tuple[int, int]] = {}
+        with Session(self.engine) as session:
+            for i in range(0, len(entry_ids), MAX_SQL_VARIABLES):
+                stmt = select(EntryHash.entry_id, EntryHash.size, EntryHash.mtime_ns).where(
+                    EntryHash.entry_id.in_(entry_ids[i : i + MAX_SQL_VARIABLES])
+                )
+                for entry_id, size, mtime_ns in session.execute(stmt):
+                    stats[entry_id] = (size, mtime_ns)
+        return stats
+
     def remove_tag(self, tag_id: int) -> bool:
         with Session(self.engine, expire_on_commit=False) as session:
             try:
@@ -1802,10 +2350,10 @@ class Library:
         success = False
 
         try:
-            self.mirror_entry_fields([from_entry, into_entry])
-            tag_ids = [tag.id for tag in from_entry.tags]
-            self.add_tags_to_entries(into_entry.id, tag_ids)
-            self.remove_entries([from_entry.id])
+            with Session(self.engine) as session:
+                self.__merge_entry_rows(session, from_entry.id, into_entry.id)
+                session.commit()
+            self._similar_index = None
             success = True
         except Exception as e:
             logger.error(
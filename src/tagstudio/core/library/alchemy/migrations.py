@@ -101,6 +101,12 @@ class DBMigrations:
             MigrationTo202,  # changes: tag_parents
             MigrationTo300,  # changes: deletes folders
             MigrationTo400,  # changes: add category_exclusions
+            MigrationTo401,  # changes: add entry_hashes
+            MigrationTo402,  # changes: add entry_hashes.perceptual_hash
+            MigrationTo403,  # changes: add video_probes
+            MigrationTo404,  # changes: add audio_waveforms
+            MigrationTo405,  # changes: add text_encodings
+            MigrationTo406,  # changes: add archive_covers
         ]
         with Session(self.engine) as session:
             for migration in migrations:
@@ -616,3 +622,132 @@ class MigrationTo400(DBMigration):
         """)
         )
         session.flush()
+
+
+class MigrationTo401(DBMigration):
+    version = 401
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 401."""
+        logger.info(fmt_log("Creating entry_hashes table..."))
+        session.execute(
+            text("""
+        CREATE TABLE entry_hashes (
+            entry_id     INTEGER NOT NULL PRIMARY KEY REFERENCES entries(id),
+            size         INTEGER NOT NULL,
+            mtime_ns     INTEGER NOT NULL,
+            partial_hash VARCHAR,
+            content_hash VARCHAR
+        )
+        """)
+        )
+        session.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS idx_entry_hashes_content_hash "
+                "ON entry_hashes (content_hash)"
+            )
+        )
+        session.flush()
+
+
+class MigrationTo402(DBMigration):
+    version = 402
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 402."""
+        logger.info(fmt_log("Adding perceptual_hash column to entry_hashes table..."))
+        session.execute(text("ALTER TABLE entry_hashes ADD COLUMN perceptual_hash VARCHAR"))
+        session.flush()
+
+
+class MigrationTo403(DBMigration):
+    version = 403
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 403."""
+        logger.info(fmt_log("Creating video_probes table..."))
+        session.execute(
+            text("""
+        CREATE TABLE video_probes (
+            entry_id    INTEGER NOT NULL PRIMARY KEY REFERENCES entries(id),
+            size        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            is_readable BOOLEAN NOT NULL,
+            is_drm      BOOLEAN NOT NULL,
+            codec       VARCHAR,
+            duration    FLOAT,
+            width       INTEGER,
+            height      INTEGER
+        )
+        """)
+        )
+        session.flush()
+
+
+class MigrationTo404(DBMigration):
+    version = 404
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 404."""
+        logger.info(fmt_log("Creating audio_waveforms table..."))
+        session.execute(
+            text("""
+        CREATE TABLE audio_waveforms (
+            entry_id    INTEGER NOT NULL PRIMARY KEY REFERENCES entries(id),
+            size        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            peaks       BLOB NOT NULL
+        )
+        """)
+        )
+        session.flush()
+
+
+class MigrationTo405(DBMigration):
+    version = 405
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 405."""
+        logger.info(fmt_log("Creating text_encodings table..."))
+        session.execute(
+            text("""
+        CREATE TABLE text_encodings (
+            entry_id    INTEGER NOT NULL PRIMARY KEY REFERENCES entries(id),
+            size        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            encoding    VARCHAR
+        )
+        """)
+        )
+        session.flush()
+
+
+class MigrationTo406(DBMigration):
+    version = 406
+
+    @override
+    @classmethod
+    def run(cls, session: Session, library_dir: Path, fmt_log: LoggingMethod):
+        """Migrate DB to DB_VERSION 406."""
+        logger.info(fmt_log("Creating archive_covers table..."))
+        session.execute(
+            text("""
+        CREATE TABLE archive_covers (
+            entry_id    INTEGER NOT NULL PRIMARY KEY REFERENCES entries(id),
+            size        INTEGER NOT NULL,
+            mtime_ns    INTEGER NOT NULL,
+            member      VARCHAR
+        )
+        """)
+        )
+        session.flush()
@@ -271,6 +271,116 @@ class Entry(Base):
         self.tags.remove(tag)
 
 
+class EntryHash(Base):
+    __tablename__ = "entry_hashes"
+
+    entry_id: Mapped[int] = mapped_column(ForeignKey("entries.id"), primary_key=True)
+    # The file stats the hashes were computed with, used to tell when they're outdated.
+    size: Mapped[int] = mapped_column(nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(nullable=False)
+    # A hash of only the start and end of the file, used to quickly rule out non-duplicates.
+    partial_hash: Mapped[str | None] = mapped_column()
+    content_hash: Mapped[str | None] = mapped_column()
+    # A difference hash of image contents, used to find visually similar images.
+    perceptual_hash: Mapped[str | None] = mapped_column()
+
+    def __init__(
+        self,
+        entry_id: int,
+        size: int,
+        mtime_ns: int,
+        partial_hash: str | None = None,
+        content_hash: str | None = None,
+        perceptual_hash: str | None = None,
+    ) -> None:
+        self.entry_id = entry_id
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.partial_hash = partial_hash
+        self.content_hash = content_hash
+        self.perceptual_hash = perceptual_hash
+        super().__init__()
+
+
+class VideoProbe(Base):
+    __tablename__ = "video_probes"
+
+    entry_id: Mapped[int] = mapped_column(ForeignKey("entries.id"), primary_key=True)
+    # The file stats the video was probed with, used to tell when the probe is outdated.
+    size: Mapped[int] = mapped_column(nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(nullable=False)
+    # False if FFprobe couldn't read the file, or its streams are DRM-protected.
+    is_readable: Mapped[bool] = mapped_column(nullable=False)
+    is_drm: Mapped[bool] = mapped_column(nullable=False, default=False)
+    codec: Mapped[str | None] = mapped_column()
+    duration: Mapped[float | None] = mapped_column()
+    width: Mapped[int | None] = mapped_column()
+    height: Mapped[int | None] = mapped_column()
+
+    def __init__(
+        self,
+        is_readable: bool,
+        is_drm: bool = False,
+        codec: str | None = None,
+        duration: float | None = None,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> None:
+        self.is_readable = is_readable
+        self.is_drm = is_drm
+        self.codec = codec
+        self.duration = duration
+        self.width = width
+        self.height = height
+        super().__init__()
+
+
+class AudioWaveform(Base):
+    __tablename__ = "audio_waveforms"
+
+    entry_id: Mapped[int] = mapped_column(ForeignKey("entries.id"), primary_key=True)
+    # The file stats the peaks were computed with, used to tell when they are outdated.
+    size: Mapped[int] = mapped_column(nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(nullable=False)
+    # The absolute 16-bit peak levels of evenly sized spans of the track, as little-endian
+    # unsigned 16-bit integers. Waveforms of any bar count are drawn from them.
+    peaks: Mapped[bytes] = mapped_column(nullable=False)
+
+    def __init__(self, peaks: bytes) -> None:
+        self.peaks = peaks
+        super().__init__()
+
+
+class TextEncoding(Base):
+    __tablename__ = "text_encodings"
+
+    entry_id: Mapped[int] = mapped_column(ForeignKey("entries.id"), primary_key=True)
+    # The file stats the encoding was detected with, used to tell when it's outdated.
+    size: Mapped[int] = mapped_column(nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(nullable=False)
+    # None if no encoding could be detected.
+    encoding: Mapped[str | None] = mapped_column()
+
+    def __init__(self, encoding: str | None) -> None:
+        self.encoding = encoding
+        super().__init__()
+
+
+class ArchiveCover(Base):
+    __tablename__ = "archive_covers"
+
+    entry_id: Mapped[int] = mapped_column(ForeignKey("entries.id"), primary_key=True)
+    # The file stats the cover was found with, used to tell when it's outdated.
+    size: Mapped[int] = mapped_column(nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(nullable=False)
+    # The name of the archive member used as the cover, or None if the archive has no image.
+    member: Mapped[str | None] = mapped_column()
+
+    def __init__(self, member: str | None) -> None:
+        self.member = member
+        super().__init__()
+
+
 class Version(Base):
     __tablename__ = "versions"
 
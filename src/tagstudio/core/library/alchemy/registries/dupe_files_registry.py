@@ -2,14 +2,25 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import stat
 import xml.etree.ElementTree as ET
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 
 import structlog
 
+from tagstudio.core.library.alchemy.enums import MAX_SQL_VARIABLES
 from tagstudio.core.library.alchemy.library import Library
-from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.library.alchemy.models import Entry, EntryHash
+from tagstudio.core.media_types import MediaCategories
+from tagstudio.core.utils.file_hash import (
+    PARTIAL_HASH_CHUNK,
+    full_file_hash,
+    hash_files,
+    partial_file_hash,
+)
+from tagstudio.core.utils.image_hash import SIMILAR_IMAGE_DISTANCE, BKTree, image_file_hash
 from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger()
@@ -17,7 +28,10 @@ logger = structlog.get_logger()
 
 @dataclass
 class DupeFilesRegistry:
-    """State handler for DupeGuru results."""
+    """State handler for duplicate files, found either natively or from DupeGuru results.
+
+    Duplicates can either be files with identical contents, or visually similar images.
+    """
 
     library: Library
     groups: list[list[Entry]] = field(default_factory=list)
@@ -68,7 +82,227 @@ class DupeFilesRegistry:
 
             self.groups.append(files)
 
-    def merge_dupe_entries(self):
+    def scan_dupe_files(self, max_workers: int | None = None) -> Iterator[int]:
+        """Find duplicate files in the library by comparing their contents.
+
+        Files are first grouped by size, then by a hash of their start and end, and finally by
+        a hash of their full contents. Only files sharing a group with another file move on to
+        the next, more expensive stage. Hashes are stored in the library and only recomputed
+        when a file's size or modification time changes.
+
+        Args:
+            max_workers (int | None): The maximum number of processes to hash files with.
+
+        Yields:
+            int: The number of files processed so far in the current stage.
+        """
+        library_dir = unwrap(self.library.library_dir)
+        stored = self.library.all_entry_hashes()
+        hashes: dict[int, EntryHash] = {}
+        changed: set[int] = set()
+        missing: list[int] = []
+        sizes: dict[int, list[int]] = {}
+        paths: dict[int, Path] = {}
+
+        logger.info("[DupeFilesRegistry] Scanning for duplicate files...")
+        for i, (entry_id, path) in enumerate(self.library.all_entry_paths()):
+            if i % 100 == 0:
+                yield i
+            try:
+                st = (library_dir / path).stat()
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
+                if entry_id in stored:
+                    missing.append(entry_id)
+                continue
+
+            entry_hash = stored.get(entry_id)
+            if (
+                entry_hash is None
+                or entry_hash.size != st.st_size
+                or entry_hash.mtime_ns != st.st_mtime_ns
+            ):
+                entry_hash = EntryHash(entry_id, st.st_size, st.st_mtime_ns)
+                changed.add(entry_id)
+            hashes[entry_id] = entry_hash
+
+            # Empty files are all identical to each other, but aren't meaningful duplicates.
+            if st.st_size > 0:
+                sizes.setdefault(st.st_size, []).append(entry_id)
+                paths[entry_id] = library_dir / path
+
+        # Stage 1: Only files that share their size with another file can be duplicates.
+        candidates = [id for ids in sizes.values() if len(ids) > 1 for id in ids]
+        yield from self.__hash_stage(
+            paths, hashes, changed, candidates, partial=True, max_workers=max_workers
+        )
+
+        # Stage 2: Narrow the candidates down to files sharing the same size and partial hash.
+        partials: dict[tuple[int, str], list[int]] = {}
+        for entry_id in candidates:
+            entry_hash = hashes[entry_id]
+            if entry_hash.partial_hash is None:
+                continue
+            # Files small enough to be read in full by the partial hash are already complete.
+            if entry_hash.size <= PARTIAL_HASH_CHUNK * 2:
+                if entry_hash.content_hash != entry_hash.partial_hash:
+                    entry_hash.content_hash = entry_hash.partial_hash
+                    changed.add(entry_id)
+                continue
+            partials.setdefault((entry_hash.size, entry_hash.partial_hash), []).append(entry_id)
+
+        # Stage 3: Hash the full contents of any files that are still potential duplicates.
+        candidates = [id for ids in partials.values() if len(ids) > 1 for id in ids]
+        yield from self.__hash_stage(
+            paths, hashes, changed, candidates, partial=False, max_workers=max_workers
+        )
+
+        self.library.remove_entry_hashes(missing)
+        self.library.save_entry_hashes(hashes[id] for id in changed)
+        self.__load_groups(self.library.get_dupe_hash_groups())
+
+    def scan_similar_images(
+        self, max_distance: int = SIMILAR_IMAGE_DISTANCE, max_workers: int | None = None
+    ) -> Iterator[int]:
+        """Find groups of visually similar images in the library.
+
+        Images are compared by their perceptual hash, which is usually recorded while rendering
+        their thumbnail. Images without a valid stored hash are opened and hashed here instead.
+        Each image is grouped with every not yet grouped image within max_distance of it.
+
+        Args:
+            max_distance (int): The maximum number of differing perceptual hash bits.
+            max_workers (int | None): The maximum number of processes to hash images with.
+
+        Yields:
+            int: The number of images processed so far in the current stage.
+        """
+        library_dir = unwrap(self.library.library_dir)
+        image_exts = MediaCategories.IMAGE_RASTER_TYPES.extensions
+        stored = self.library.all_entry_hashes()
+        hashes: dict[int, EntryHash] = {}
+        changed: set[int] = set()
+        paths: dict[int, Path] = {}
+
+        logger.info("[DupeFilesRegistry] Scanning for similar images...")
+        for i, (entry_id, path) in enumerate(self.library.all_entry_paths()):
+            if i % 100 == 0:
+                yield i
+            if path.suffix.lower() not in image_exts:
+                continue
+            try:
+                st = (library_dir / path).stat()
+            except OSError:
+                continue
+
+            entry_hash = stored.get(entry_id)
+            if (
+                entry_hash is None
+                or entry_hash.size != st.st_size
+                or entry_hash.mtime_ns != st.st_mtime_ns
+            ):
+                entry_hash = EntryHash(entry_id, st.st_size, st.st_mtime_ns)
+            hashes[entry_id] = entry_hash
+            if entry_hash.perceptual_hash is None:
+                paths[entry_id] = library_dir / path
+
+        pending = list(paths.keys())
+        logger.info("[DupeFilesRegistry] Hashing images", images=len(hashes), pending=len(pending))
+        for i, (entry_id, perceptual_hash) in enumerate(
+            zip(
+                pending,
+                hash_files([paths[id] for id in pending], image_file_hash, max_workers),
+                strict=True,
+            )
+        ):
+            if i % 100 == 0:
+                yield i
+            if perceptual_hash is not None:
+                hashes[entry_id].perceptual_hash = perceptual_hash
+                changed.add(entry_id)
+        self.library.save_entry_hashes(hashes[id] for id in changed)
+
+        tree = BKTree[int]()
+        hash_values: dict[int, int] = {}
+        for entry_id, entry_hash in hashes.items():
+            if entry_hash.perceptual_hash is not None:
+                hash_values[entry_id] = int(entry_hash.perceptual_hash, 16)
+                tree.add(hash_values[entry_id], entry_id)
+
+        grouped: set[int] = set()
+        id_groups: list[list[int]] = []
+        for i, (entry_id, value) in enumerate(sorted(hash_values.items())):
+            if i % 100 == 0:
+                yield i
+            if entry_id in grouped:
+                continue
+            group = [
+                other_id
+                for _, other_id in sorted(tree.search(value, max_distance))
+                if other_id not in grouped
+            ]
+            if len(group) > 1:
+                grouped.update(group)
+                id_groups.append(group)
+
+        self.__load_groups(id_groups)
+
+    def __hash_stage(
+        self,
+        paths: dict[int, Path],
+        hashes: dict[int, EntryHash],
+        changed: set[int],
+        candidates: list[int],
+        partial: bool,
+        max_workers: int | None,
+    ) -> Iterator[int]:
+        """Compute the partial or full hashes for candidates that don't have a valid one."""
+        if partial:
+            pending = [id for id in candidates if hashes[id].partial_hash is None]
+        else:
+            pending = [id for id in candidates if hashes[id].content_hash is None]
+        hash_func = partial_file_hash if partial else full_file_hash
+
+        logger.info(
+            "[DupeFilesRegistry] Hashing files",
+            stage="partial" if partial else "full",
+            candidates=len(candidates),
+            pending=len(pending),
+        )
+        for i, (entry_id, file_hash) in enumerate(
+            zip(
+                pending,
+                hash_files([paths[id] for id in pending], hash_func, max_workers),
+                strict=True,
+            )
+        ):
+            if i % 100 == 0:
+                yield i
+            if partial:
+                hashes[entry_id].partial_hash = file_hash
+            else:
+                hashes[entry_id].content_hash = file_hash
+            changed.add(entry_id)
+
+    def __load_groups(self, id_groups: list[list[int]]) -> None:
+        """Load the full entries for groups of duplicate entry IDs."""
+        self.groups.clear()
+
+        ids = [id for group in id_groups for id in group]
+        entries: dict[int, Entry] = {}
+        for i in range(0, len(ids), MAX_SQL_VARIABLES):
+            for entry in self.library.get_entries_full(ids[i : i + MAX_SQL_VARIABLES]):
+                entries[entry.id] = entry
+
+        for group in id_groups:
+            files = [entries[id] for id in group if id in entries]
+            if len(files) > 1:
+                self.groups.append(files)
+
+        logger.info("[DupeFilesRegistry] Found duplicate files", groups=len(self.groups))
+
+    def merge_dupe_entries(self) -> Iterator[int]:
         """Merge the duplicate Entry items.
 
         A duplicate Entry is defined as an Entry pointing to a file
@@ -79,8 +313,16 @@ class DupeFilesRegistry:
             groups=len(self.groups),
         )
 
+        # Entries are removed in batches rather than one group at a time.
+        remove_ids: list[int] = []
         for i, entries in enumerate(self.groups):
             yield i
-            remove_ids = entries[1:]
-            logger.info("Removing entries group", ids=remove_ids)
-            self.library.remove_entries([e.id for e in remove_ids])
+            remove_ids.extend(e.id for e in entries[1:])
+            if len(remove_ids) >= MAX_SQL_VARIABLES:
+                logger.info("Removing entries batch", count=len(remove_ids))
+                self.library.remove_entries(remove_ids)
+                remove_ids = []
+
+        if remove_ids:
+            logger.info("Removing entries batch", count=len(remove_ids))
+            self.library.remove_entries(remove_ids)
@@ -2,24 +2,45 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
-from collections.abc import Iterator
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
+from itertools import batched
+from pathlib import Path
 
 import structlog
 
 from tagstudio.core.library.alchemy.library import Library
-from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.core.library.ignore import Ignore
+from tagstudio.core.library.ignore_matcher import IgnoreMatcher
+from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger(__name__)
 
+# The number of entries matched against the ignore patterns at a time.
+CHUNK_SIZE: int = 10_000
+
+# The minimum number of entries before matching is spread across a process pool.
+MIN_POOL_ENTRIES: int = 100_000
+
+# The number of chunks queued for each worker process, so that workers never wait for the next
+# chunk to be read while no more of the library is held in memory than needed.
+MAX_PENDING_CHUNKS_PER_WORKER: int = 2
+
+
+def _match_chunk(matcher: IgnoreMatcher, paths: list[str]) -> list[int]:
+    """Return the indices of the paths that are ignored by the matcher."""
+    return [i for i, path in enumerate(paths) if matcher.match(path)]
+
 
 @dataclass
 class IgnoredRegistry:
     """State tracker for ignored entries."""
 
     lib: Library
-    ignored_entries: list[Entry] = field(default_factory=list)
+    ignored_entries: list[tuple[int, Path]] = field(default_factory=list)
 
     @property
     def ignored_count(self) -> int:
@@ -28,20 +49,75 @@ class IgnoredRegistry:
     def reset(self):
         self.ignored_entries.clear()
 
-    def refresh_ignored_entries(self) -> Iterator[int]:
-        """Track the number of entries that would otherwise be ignored by the current rules."""
+    def refresh_ignored_entries(self, max_workers: int | None = None) -> Iterator[int]:
+        """Track the number of entries that would otherwise be ignored by the current rules.
+
+        When there are no negated patterns, simple patterns (e.g. "*.jpg") are matched by SQLite
+        so that those entries never have to be loaded. The rest are streamed in chunks and
+        matched against the remaining patterns, using a process pool for large libraries.
+
+        Args:
+            max_workers (int | None): The maximum number of processes to match entries with.
+
+        Yields:
+            int: The number of entries checked so far.
+        """
         logger.info("[IgnoredRegistry] Refreshing ignored entries...")
 
         self.ignored_entries = []
+        Ignore.get_patterns(unwrap(self.lib.library_dir))
+        matcher = Ignore.compiled_patterns
+        if not matcher:
+            # If the compiled_patterns has malfunctioned, don't consider that a false positive
+            return
+
+        rows: Iterable[tuple[int, Path]]
+        split = matcher.split_sql_globs()
+        if split is not None:
+            globs, remaining_matcher = split
+            self.ignored_entries.extend(self.lib.entry_paths_by_glob(globs))
+            logger.info(
+                "[IgnoredRegistry] Matched simple patterns in SQL",
+                globs=len(globs),
+                ignored=len(self.ignored_entries),
+            )
+            yield len(self.ignored_entries)
+            if remaining_matcher is None:
+                return
+            matcher = remaining_matcher
+            rows = self.lib.entry_paths_by_glob(globs, invert=True)
+        else:
+            rows = self.lib.all_entry_paths()
+
+        checked = len(self.ignored_entries)
+        chunks = batched(rows, CHUNK_SIZE, strict=False)
+        if max_workers == 1 or self.lib.entries_count - checked < MIN_POOL_ENTRIES:
+            for chunk in chunks:
+                matches = _match_chunk(matcher, [path.as_posix() for _, path in chunk])
+                self.ignored_entries.extend(chunk[i] for i in matches)
+                checked += len(chunk)
+                yield checked
+            return
+
+        workers = max_workers or os.cpu_count() or 1
+        # Chunks are read from the database as workers free up, rather than all at once.
+        in_flight: deque[tuple[tuple[tuple[int, Path], ...], Future[list[int]]]] = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in chunks:
+                paths = [path.as_posix() for _, path in chunk]
+                in_flight.append((chunk, executor.submit(_match_chunk, matcher, paths)))
+                if len(in_flight) >= workers * MAX_PENDING_CHUNKS_PER_WORKER:
+                    checked += self.__collect(*in_flight.popleft())
+                    yield checked
+            while in_flight:
+                checked += self.__collect(*in_flight.popleft())
+                yield checked
 
-        for i, entry in enumerate(self.lib.all_entries()):
-            yield i
-            if not Ignore.compiled_patterns:
-                # If the compiled_patterns has malfunctioned, don't consider that a false positive
-                yield i
-            elif Ignore.compiled_patterns.match(entry.path):
-                self.ignored_entries.append(entry)
+    def __collect(self, chunk: tuple[tuple[int, Path], ...], future: Future[list[int]]) -> int:
+        """Record the ignored entries of a matched chunk, and return the size of the chunk."""
+        self.ignored_entries.extend(chunk[i] for i in future.result())
+        return len(chunk)
 
     def remove_ignored_entries(self) -> None:
-        self.lib.remove_entries(list(map(lambda ignored: ignored.id, self.ignored_entries)))
+        self.lib.remove_entries([entry_id for entry_id, _ in self.ignored_entries])
         self.ignored_entries = []
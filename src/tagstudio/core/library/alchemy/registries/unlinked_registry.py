@@ -2,20 +2,49 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import os
+from collections import defaultdict
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 
 import structlog
-from wcmatch import glob, pathlib
 
+from tagstudio.core.library.alchemy.enums import MAX_SQL_VARIABLES
 from tagstudio.core.library.alchemy.library import Library
 from tagstudio.core.library.alchemy.models import Entry
-from tagstudio.core.library.ignore import PATH_GLOB_FLAGS, Ignore, ignore_to_glob
+from tagstudio.core.library.ignore import Ignore
 from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger()
 
+# The maximum number of directories listed at the same time when checking for unlinked entries.
+MAX_SCAN_THREADS: int = 8
+
+
+def _find_missing_files(directory: Path, names: list[str]) -> set[str]:
+    """Return the names that don't belong to a file in the directory, listing it only once.
+
+    Args:
+        directory (Path): The directory that should contain the files.
+        names (list[str]): The file names to look for.
+    """
+    try:
+        with os.scandir(directory) as it:
+            files = {e.name for e in it if e.is_file()}
+    except FileNotFoundError, NotADirectoryError:
+        # Every file inside of a missing directory is missing too.
+        return set(names)
+    except OSError as e:
+        logger.warning("[UnlinkedRegistry] Couldn't list directory", path=directory, error=e)
+        files = set()
+
+    # Names that weren't listed are checked individually, as they may still exist on
+    # case-insensitive file systems or in directories that can't be listed.
+    return {name for name in names if name not in files and not os.path.isfile(directory / name)}
+
 
 @dataclass
 class UnlinkedRegistry:
@@ -32,66 +61,145 @@ class UnlinkedRegistry:
     def reset(self):
         self.unlinked_entries.clear()
 
-    def refresh_unlinked_files(self) -> Iterator[int]:
-        """Track the number of entries that point to an invalid filepath."""
+    def refresh_unlinked_files(self, max_workers: int = MAX_SCAN_THREADS) -> Iterator[int]:
+        """Track the number of entries that point to an invalid filepath.
+
+        Entries are grouped by their parent directory, and each directory is listed once
+        instead of checking every file on its own. Directories are listed concurrently, which
+        mostly helps on network drives where each file system call is slow.
+
+        Args:
+            max_workers (int): The maximum number of directories to list at the same time.
+
+        Yields:
+            int: The index of each entry that has been checked.
+        """
         logger.info("[UnlinkedRegistry] Refreshing unlinked files...")
 
+        library_dir = unwrap(self.lib.library_dir)
         self.unlinked_entries = []
-        for i, entry in enumerate(self.lib.all_entries()):
-            yield i
-            full_path = unwrap(self.lib.library_dir) / entry.path
-            if not full_path.exists() or not full_path.is_file():
-                self.unlinked_entries.append(entry)
+        directories: dict[Path, list[tuple[int, str]]] = defaultdict(list)
+        for entry_id, path in self.lib.all_entry_paths():
+            directories[path.parent].append((entry_id, path.name))
+
+        unlinked_ids: list[int] = []
+        i = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda item: _find_missing_files(library_dir / item[0], [n for _, n in item[1]]),
+                directories.items(),
+            )
+            for files, missing in zip(directories.values(), results, strict=True):
+                for entry_id, name in files:
+                    yield i
+                    i += 1
+                    if name in missing:
+                        unlinked_ids.append(entry_id)
+
+        unlinked_ids.sort()
+        for start in range(0, len(unlinked_ids), MAX_SQL_VARIABLES):
+            self.unlinked_entries.extend(
+                self.lib.get_entries(unlinked_ids[start : start + MAX_SQL_VARIABLES])
+            )
+        logger.info(
+            "[UnlinkedRegistry] Checked entries",
+            directories=len(directories),
+            unlinked=len(self.unlinked_entries),
+        )
+
+    def build_filename_index(self) -> dict[str, list[Path]]:
+        """Walk the library directory once, indexing the files that aren't ignored by name.
+
+        Returns:
+            dict[str, list[Path]]: The relative paths of every file, keyed by their file name.
+        """
+        library_dir = unwrap(self.lib.library_dir)
+        index: dict[str, list[Path]] = defaultdict(list)
+
+        Ignore.get_patterns(library_dir)
+        for path in unwrap(Ignore.compiled_patterns).walk(library_dir):
+            index[path.name].append(path)
+
+        logger.info("[UnlinkedRegistry] Indexed library files", names=len(index))
+        return index
 
-    def match_unlinked_file_entry(self, match_entry: Entry) -> list[Path]:
+    def match_unlinked_file_entry(
+        self,
+        match_entry: Entry,
+        index: dict[str, list[Path]] | None = None,
+        file_stats: tuple[int, int] | None = None,
+    ) -> list[Path]:
         """Try and match unlinked file entries with matching results in the library directory.
 
         Works if files were just moved to different subfolders and don't have duplicate names.
+        If several files share the name, the ones whose size and then modification time match
+        the last known stats of the entry's file are preferred, if its file was hashed. Any
+        ties left are broken by the modification date stored with the entry.
+
+        Args:
+            match_entry (Entry): The unlinked entry to find the file of.
+            index (dict[str, list[Path]] | None): A filename index from build_filename_index,
+                which is built if not provided.
+            file_stats (tuple[int, int] | None): The last known size and mtime (in nanoseconds)
+                of the entry's file.
         """
-        library_dir = unwrap(self.lib.library_dir)
-        matches: list[Path] = []
-
-        # NOTE: ignore_to_glob() is needed for wcmatch, not ripgrep.
-        ignore_patterns = ignore_to_glob(Ignore.get_patterns(library_dir))
-        for path in pathlib.Path(str(library_dir)).glob(
-            patterns=f"***/{glob.escape(match_entry.path.name)}",
-            flags=PATH_GLOB_FLAGS,
-            exclude=ignore_patterns,
-        ):
-            if path.is_dir():
-                continue
-            if path.name == match_entry.path.name:
-                new_path = Path(path).relative_to(library_dir)
-                matches.append(new_path)
+        if index is None:
+            index = self.build_filename_index()
+        matches = index.get(match_entry.path.name, [])
+
+        date_modified = match_entry.date_modified
+        if len(matches) > 1 and (file_stats is not None or date_modified is not None):
+            library_dir = unwrap(self.lib.library_dir)
+            stats: dict[Path, os.stat_result] = {}
+            for path in matches:
+                try:
+                    stats[path] = (library_dir / path).stat()
+                except OSError:
+                    continue
+
+            if file_stats is not None:
+                size, mtime_ns = file_stats
+                same_size = [p for p in matches if p in stats and stats[p].st_size == size]
+                same_mtime = [p for p in same_size if stats[p].st_mtime_ns == mtime_ns]
+                matches = same_mtime or same_size or matches
+            if len(matches) > 1 and date_modified is not None:
+                # Stored the same way as by the library refresh.
+                same_date = [
+                    p
+                    for p in matches
+                    if p in stats and datetime.fromtimestamp(stats[p].st_mtime) == date_modified
+                ]
+                matches = same_date or matches
 
         logger.info("[UnlinkedRegistry] Matches", matches=matches)
-        return matches
+        return list(matches)
 
     def fix_unlinked_entries(self) -> Iterator[int]:
-        """Attempt to fix unlinked file entries by finding a match in the library directory."""
+        """Attempt to fix unlinked file entries by finding a match in the library directory.
+
+        The library directory is only walked once, and every relink and merge is applied
+        together in a single transaction at the end.
+        """
         self.files_fixed_count = 0
-        matched_entries: list[Entry] = []
+        index = self.build_filename_index()
+        file_stats = self.lib.entry_file_stats([entry.id for entry in self.unlinked_entries])
+
+        relinks: dict[int, Path] = {}
         for i, entry in enumerate(self.unlinked_entries):
             yield i
-            item_matches = self.match_unlinked_file_entry(entry)
+            item_matches = self.match_unlinked_file_entry(entry, index, file_stats.get(entry.id))
             if len(item_matches) == 1:
                 logger.info(
                     "[UnlinkedRegistry]",
                     entry=entry.path.as_posix(),
                     item_matches=item_matches[0].as_posix(),
                 )
-                if not self.lib.update_entry_path(entry.id, item_matches[0]):
-                    try:
-                        match = unwrap(self.lib.get_entry_full_by_path(item_matches[0]))
-                        entry_full = unwrap(self.lib.get_entry_full(entry.id))
-                        self.lib.merge_entries(entry_full, match)
-                    except AttributeError:
-                        continue
-                self.files_fixed_count += 1
-                matched_entries.append(entry)
-
-        for entry in matched_entries:
-            self.unlinked_entries.remove(entry)
+                relinks[entry.id] = item_matches[0]
+
+        if relinks:
+            self.lib.relink_entries(relinks)
+        self.files_fixed_count = len(relinks)
+        self.unlinked_entries = [e for e in self.unlinked_entries if e.id not in relinks]
 
     def remove_unlinked_entries(self) -> None:
         self.lib.remove_entries(list(map(lambda unlinked: unlinked.id, self.unlinked_entries)))
@@ -108,6 +108,16 @@ class SQLBoolExpressionBuilder(BaseVisitor[ColumnElement[bool]]):
         elif node.type == ConstraintType.Special:  # noqa: SIM102 unnecessary once there is a second special constraint
             if node.value.lower() == "untagged":
                 return ~Entry.id.in_(select(Entry.id).join(TagEntry))
+        elif node.type == ConstraintType.Similar:
+            try:
+                entry_id = int(node.value)
+            except ValueError:
+                logger.error(
+                    "[SQLBoolExpressionBuilder] Could not cast value to an int Entry ID",
+                    value=node.value,
+                )
+                return false()
+            return Entry.id.in_(self.lib.get_similar_entry_ids(entry_id))
 
         # raise exception if Constraint stays unhandled
         raise NotImplementedError("This type of constraint is not implemented yet")
@@ -180,6 +190,8 @@ class SQLBoolExpressionBuilder(BaseVisitor[ColumnElement[bool]]):
                         pass
                     case ConstraintType.Special:
                         pass
+                    case ConstraintType.Similar:
+                        pass
                     case _:
                         raise NotImplementedError(f"Unhandled constraint: '{term.type}'")
 
@@ -2,21 +2,17 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
-from copy import deepcopy
+import sys
 from pathlib import Path
 
 import structlog
-import wcmatch.fnmatch as fnmatch
-from wcmatch import glob, pathlib
 
 from tagstudio.core.constants import IGNORE_NAME, TS_FOLDER_NAME
+from tagstudio.core.library.ignore_matcher import IgnoreMatcher
 from tagstudio.core.utils.singleton import Singleton
 
 logger = structlog.get_logger()
 
-PATH_GLOB_FLAGS = glob.GLOBSTARLONG | glob.DOTGLOB | glob.NEGATE | pathlib.MATCHBASE
-
-
 GLOBAL_IGNORE = [
     # TagStudio -------------------
     f"{TS_FOLDER_NAME}",
@@ -36,59 +32,16 @@ GLOBAL_IGNORE = [
     ".localized",
 ]
 
+# Patterns applied after the user's patterns, which can't be overridden by them.
+FORCED_IGNORE = [
+    f"/{TS_FOLDER_NAME}/",
+]
 
-def ignore_to_glob(ignore_patterns: list[str]) -> list[str]:
-    """Convert .gitignore-like patterns to Unix-like glob syntax.
-
-    Args:
-        ignore_patterns (list[str]): The .gitignore-like patterns to convert.
-    """
-    glob_patterns: list[str] = deepcopy(ignore_patterns)
-    glob_patterns_remove: list[str] = []
-    additional_patterns: list[str] = []
-    root_patterns: list[str] = []
-
-    # Expand .gitignore patterns to mimic the same behavior with unix-like glob patterns.
-    for pattern in glob_patterns:
-        # Temporarily remove any exclusion character before processing
-        exclusion_char = ""
-        gp = pattern
-        if pattern.startswith("!"):
-            gp = pattern[1:]
-            exclusion_char = "!"
-
-        if not gp.startswith("**/") and not gp.startswith("*/") and not gp.startswith("/"):
-            # Create a version of a prefix-less pattern that starts with "**/"
-            gp = "**/" + gp
-            additional_patterns.append(exclusion_char + gp)
-
-            gp = gp.removeprefix("**/").removeprefix("*/")
-            additional_patterns.append(exclusion_char + gp)
-
-        elif gp.startswith("/"):
-            # Matches "/file" case for .gitignore behavior where it should only match
-            # a file or folder int the root directory, and nowhere else.
-            glob_patterns_remove.append(gp)
-            gp = gp.lstrip("/")
-            root_patterns.append(exclusion_char + gp)
-
-    for gp in glob_patterns_remove:
-        glob_patterns.remove(gp)
-
-    glob_patterns = glob_patterns + additional_patterns
-
-    # Add "/**" suffix to suffix-less patterns to match implicit .gitignore behavior.
-    for pattern in glob_patterns:
-        if pattern.endswith("/**"):
-            continue
-
-        glob_patterns.append(pattern.removesuffix("/*").removesuffix("/") + "/**")
-
-    glob_patterns = glob_patterns + root_patterns
-    glob_patterns = list(set(glob_patterns))
-
-    logger.info("[Ignore]", glob_patterns=glob_patterns)
-    return glob_patterns
+# Added to include-lists written for older versions, where folders didn't need to be un-ignored.
+INCLUDE_DIRS_COMMENT = (
+    "# Folders need to be un-ignored in order for the files inside of them to be un-ignored."
+)
+INCLUDE_DIRS_PATTERN = "!*/"
 
 
 def migrate_ext_list(exts: list[str], is_exclude_list: bool) -> str:
@@ -103,7 +56,8 @@ def migrate_ext_list(exts: list[str], is_exclude_list: bool) -> str:
     prefix = ""
     if not is_exclude_list:
         prefix = "!"
-        out += "*\n"
+        # Directories must be re-included, as files inside of ignored directories can't be.
+        out += f"*\n{INCLUDE_DIRS_COMMENT}\n{INCLUDE_DIRS_PATTERN}\n"
     out += "\n".join([f"{prefix}*.{x.lstrip('.')}\n" for x in exts])
     return out
 
@@ -111,9 +65,9 @@ def migrate_ext_list(exts: list[str], is_exclude_list: bool) -> str:
 class Ignore(metaclass=Singleton):
     """Class for processing and managing glob-like file ignore file patterns."""
 
-    _last_loaded: tuple[Path, float] | None = None
+    _last_loaded: tuple[Path, int] | None = None
     _patterns: list[str] = []
-    compiled_patterns: fnmatch.WcMatcher | None = None
+    compiled_patterns: IgnoreMatcher | None = None
 
     @staticmethod
     def read_ignore_file(library_dir: Path) -> list[str]:
@@ -151,6 +105,9 @@ class Ignore(metaclass=Singleton):
     def get_patterns(library_dir: Path, include_global: bool = True) -> list[str]:
         """Get the ignore patterns for the given library directory.
 
+        The patterns are compiled into Ignore.compiled_patterns, which is only recompiled when
+        the '.ts_ignore' file's modification time changes.
+
         Args:
             library_dir (Path): The path of the library to load patterns from.
             include_global (bool): Flag for including the global ignore set.
@@ -164,25 +121,25 @@ class Ignore(metaclass=Singleton):
                 "[Ignore] No .ts_ignore file found",
                 path=ts_ignore_path,
             )
+            if Ignore._last_loaded is not None or Ignore.compiled_patterns is None:
+                Ignore.compiled_patterns = Ignore.compile(patterns + FORCED_IGNORE)
             Ignore._last_loaded = None
-            Ignore._patterns = patterns
+            Ignore._patterns = patterns + FORCED_IGNORE
 
             return Ignore._patterns
 
         # Process the .ts_ignore file if the previous result is non-existent or outdated.
-        loaded = (ts_ignore_path, ts_ignore_path.stat().st_mtime)
-        if not Ignore._last_loaded or (Ignore._last_loaded and Ignore._last_loaded != loaded):
+        loaded = (ts_ignore_path, ts_ignore_path.stat().st_mtime_ns)
+        if Ignore._last_loaded != loaded or Ignore.compiled_patterns is None:
             logger.info(
                 "[Ignore] Processing the .ts_ignore file...",
                 library=library_dir,
                 last_mtime=Ignore._last_loaded[1] if Ignore._last_loaded else None,
                 new_mtime=loaded[1],
             )
-            Ignore._patterns = patterns + Ignore._load_ignore_file(ts_ignore_path)
-            Ignore.compiled_patterns = fnmatch.compile(
-                ignore_to_glob(Ignore._patterns),
-                PATH_GLOB_FLAGS,
-            )
+            user_patterns = Ignore._translate_include_list(Ignore._load_ignore_file(ts_ignore_path))
+            Ignore._patterns = patterns + user_patterns + FORCED_IGNORE
+            Ignore.compiled_patterns = Ignore.compile(Ignore._patterns)
         else:
             logger.info(
                 "[Ignore] No updates to the .ts_ignore detected",
@@ -194,6 +151,37 @@ class Ignore(metaclass=Singleton):
 
         return Ignore._patterns
 
+    @staticmethod
+    def compile(patterns: list[str]) -> IgnoreMatcher:
+        """Compile .gitignore-like patterns into a matcher, using the platform's case rules.
+
+        Args:
+            patterns (list[str]): The patterns to compile.
+        """
+        return IgnoreMatcher(patterns, ignore_case=sys.platform == "win32")
+
+    @staticmethod
+    def _translate_include_list(patterns: list[str]) -> list[str]:
+        """Un-ignore folders in the patterns of a .ts_ignore file that ignores all but some files.
+
+        Older versions kept files in subfolders when "*" was followed by negations like
+        "!*.jpg", but under .gitignore rules the subfolders themselves are ignored. A "!*/"
+        pattern is added after the "*" to keep the old behavior. The file itself isn't changed,
+        and a "*/" pattern after the negations still ignores the subfolders.
+
+        Args:
+            patterns (list[str]): The patterns of the .ts_ignore file, without comments.
+        """
+        if "*" not in patterns:
+            return patterns
+        wildcard = patterns.index("*")
+        negations = [p for p in patterns[wildcard + 1 :] if p.startswith("!")]
+        if not negations or INCLUDE_DIRS_PATTERN in negations:
+            return patterns
+
+        logger.info("[Ignore] Un-ignoring folders for a legacy include-list")
+        return [*patterns[: wildcard + 1], INCLUDE_DIRS_PATTERN, *patterns[wildcard + 1 :]]
+
     @staticmethod
     def _load_ignore_file(path: Path) -> list[str]:
         """Load and process the .ts_ignore file into a list of glob patterns.
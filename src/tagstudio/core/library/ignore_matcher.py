@@ -0,0 +1,378 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import contextlib
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path, PurePath
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def _translate_segment(pattern: str) -> str:
+    """Translate the wildcards of a .gitignore pattern (without "**" handling) into a regex."""
+    out: list[str] = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "\\" and i < n:
+            out.append(re.escape(pattern[i]))
+            i += 1
+        elif c == "*":
+            # Consecutive asterisks that aren't a "**" path segment act as a single asterisk.
+            while i < n and pattern[i] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                # An unclosed bracket is matched literally.
+                out.append(re.escape(c))
+                continue
+            chars = pattern[i:j]
+            i = j + 1
+            negate = chars[:1] in ("!", "^")
+            if negate:
+                chars = chars[1:]
+            chars = chars.replace("\\", "\\\\").replace("[", "\\[")
+            out.append(f"[^{chars}/]" if negate else f"[{chars}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def translate_pattern(pattern: str) -> tuple[str, bool, bool] | None:
+    """Translate a single .gitignore pattern into a regex matching relative POSIX paths.
+
+    Args:
+        pattern (str): The .gitignore pattern, without surrounding whitespace.
+
+    Returns:
+        tuple[str, bool, bool] | None: The regex, whether the pattern is negated, and whether it
+            only matches directories. None if the line isn't a pattern.
+    """
+    if not pattern or pattern.startswith("#"):
+        return None
+
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith("/") and not pattern.endswith("\\/")
+    pattern = pattern.rstrip("/") if dir_only else pattern
+    if not pattern:
+        return None
+
+    # Patterns with a separator at the start or middle are relative to the library root,
+    # otherwise they may match at any depth.
+    anchored = "/" in pattern
+    pattern = pattern.removeprefix("/")
+
+    # A path segment made up of only asterisks (e.g. "**") matches any number of directories.
+    parts = [
+        "**" if len(part) > 1 and part.strip("*") == "" else part for part in pattern.split("/")
+    ]
+    regex: list[str] = [] if anchored else ["(?:.*/)?"]
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            if last:
+                # A trailing "/**" matches everything inside, but not the directory itself.
+                regex.append(".*" if i == 0 else "/.*")
+            elif i == 0:
+                regex.append("(?:.*/)?")
+            else:
+                regex.append("/(?:.*/)?")
+            continue
+        if i > 0 and parts[i - 1] != "**":
+            regex.append("/")
+        regex.append(_translate_segment(part))
+
+    return "".join(regex), negated, dir_only
+
+
+def _glob_escape(text: str) -> str:
+    """Escape the special characters of a SQLite GLOB pattern."""
+    return re.sub(r"([*?\[])", r"[\1]", text)
+
+
+def sql_globs(pattern: str) -> list[str] | None:
+    """Convert a simple .gitignore pattern into equivalent SQLite GLOB patterns for paths.
+
+    Simple patterns are wildcard-free paths anchored to the library root, and names that
+    match at any depth which are either literal (e.g. ".DS_Store"), a suffix (e.g. "*.jpg"),
+    or a prefix (e.g. "._*"). A path is matched by the pattern exactly when it matches any of
+    the returned GLOB patterns, including paths inside of matching directories.
+
+    Args:
+        pattern (str): The .gitignore pattern, without surrounding whitespace.
+
+    Returns:
+        list[str] | None: The GLOB patterns, or None if the pattern isn't simple.
+    """
+    if not pattern or pattern[0] in "#!":
+        return None
+
+    dir_only = pattern.endswith("/")
+    body = pattern.rstrip("/")
+    if not body or "//" in body or any(c in body for c in "?[\\"):
+        return None
+
+    if "/" in body:
+        # Anchored to the library root.
+        if "*" in body:
+            return None
+        literal = _glob_escape(body.removeprefix("/"))
+        return [f"{literal}/*"] if dir_only else [literal, f"{literal}/*"]
+
+    # SQLite's "*" also matches "/", so a leading or trailing "*" can stand in for any
+    # number of leading or trailing path components.
+    name = body.strip("*")
+    if not name or "*" in name or body.count("*") > 1:
+        # A wildcard in the middle of a name can't be expressed without also matching "/".
+        return None
+    literal = _glob_escape(name)
+    if body.startswith("*"):
+        # A name suffix: the last component, or any directory component, ends with it.
+        return [f"*{literal}/*"] if dir_only else [f"*{literal}", f"*{literal}/*"]
+    if body.endswith("*"):
+        # A name prefix: the first component, or any component after a "/", starts with it.
+        if dir_only:
+            return [f"{literal}*/*", f"*/{literal}*/*"]
+        return [f"{literal}*", f"*/{literal}*"]
+    if dir_only:
+        return [f"{literal}/*", f"*/{literal}/*"]
+    return [literal, f"*/{literal}", f"{literal}/*", f"*/{literal}/*"]
+
+
+class IgnoreMatcher:
+    """Matches relative paths against .gitignore-style patterns.
+
+    All patterns are compiled into a single regex per kind of path (file or directory), with
+    the alternatives in reverse order so that the first one to match is the last matching
+    pattern, which decides whether a path is ignored. Like Git, a path inside of an ignored
+    directory is always ignored, even if a later negated pattern matches it. Results for
+    directories are cached, so checking many files in the same directory only evaluates the
+    patterns against each file itself.
+    """
+
+    def __init__(self, patterns: list[str], ignore_case: bool = False) -> None:
+        """Compile a list of .gitignore-style patterns.
+
+        Args:
+            patterns (list[str]): The patterns, in the order they appear in the ignore file.
+            ignore_case (bool): Flag for matching paths case-insensitively.
+        """
+        self.patterns = patterns
+        self.ignore_case = ignore_case
+        file_rules: list[tuple[str, bool]] = []
+        dir_rules: list[tuple[str, bool]] = []
+        for raw_pattern in patterns:
+            translated = translate_pattern(raw_pattern.strip())
+            if translated is None:
+                continue
+            regex, negated, dir_only = translated
+            dir_rules.append((regex, negated))
+            if not dir_only:
+                file_rules.append((regex, negated))
+
+        flags = re.DOTALL | (re.IGNORECASE if ignore_case else 0)
+        self._file_regex, self._file_negated = self.__compile(file_rules, flags)
+        self._dir_regex, self._dir_negated = self.__compile(dir_rules, flags)
+        self._dir_cache: dict[str, bool] = {}
+
+    def __getstate__(self) -> dict[str, object]:
+        # Don't send cached directory results along when pickling for other processes.
+        state = self.__dict__.copy()
+        state["_dir_cache"] = {}
+        return state
+
+    @staticmethod
+    def __compile(
+        rules: list[tuple[str, bool]], flags: int
+    ) -> tuple[re.Pattern[str] | None, list[bool]]:
+        """Combine rules into one regex, returning it with each group's negation flag."""
+        if not rules:
+            return None, []
+        rules = rules[::-1]
+        regex = re.compile("|".join(f"({r})" for r, _ in rules), flags)
+        # Group indices start at 1, so pad the list to line up with Match.lastindex.
+        return regex, [False] + [negated for _, negated in rules]
+
+    @staticmethod
+    def __test(regex: re.Pattern[str] | None, negated: list[bool], path: str) -> bool:
+        if regex is None:
+            return False
+        match = regex.fullmatch(path)
+        return match is not None and not negated[match.lastindex or 0]
+
+    def is_dir_ignored(self, path: str) -> bool:
+        """Return whether a directory and everything inside of it is ignored.
+
+        Args:
+            path (str): The POSIX path of the directory, relative to the library root.
+        """
+        cached = self._dir_cache.get(path)
+        if cached is not None:
+            return cached
+
+        parent, _, _ = path.rpartition("/")
+        ignored = (parent != "" and self.is_dir_ignored(parent)) or self.__test(
+            self._dir_regex, self._dir_negated, path
+        )
+        self._dir_cache[path] = ignored
+        return ignored
+
+    def match(self, path: PurePath | str, is_dir: bool = False) -> bool:
+        """Return whether a path is ignored.
+
+        Args:
+            path (PurePath | str): The path, relative to the library root.
+            is_dir (bool): Flag for whether the path is a directory.
+        """
+        path_str = path.as_posix() if isinstance(path, PurePath) else path.replace("\\", "/")
+        path_str = path_str.strip("/")
+        if not path_str or path_str == ".":
+            return False
+        if is_dir:
+            return self.is_dir_ignored(path_str)
+
+        parent, _, _ = path_str.rpartition("/")
+        if parent and self.is_dir_ignored(parent):
+            return True
+        return self.__test(self._file_regex, self._file_negated, path_str)
+
+    def split_sql_globs(self) -> tuple[list[str], IgnoreMatcher | None] | None:
+        """Split off the patterns that can be matched with SQLite GLOB patterns instead.
+
+        This is only possible when there are no negated patterns, as a path is then ignored if
+        any single pattern matches it, regardless of order.
+
+        Returns:
+            tuple[list[str], IgnoreMatcher | None] | None: The GLOB patterns, and a matcher for
+                the remaining patterns (or None if every pattern was converted). None if the
+                patterns can't be split.
+        """
+        # SQLite's GLOB is always case-sensitive.
+        if self.ignore_case:
+            return None
+
+        globs: list[str] = []
+        remaining: list[str] = []
+        for raw_pattern in self.patterns:
+            pattern = raw_pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            if pattern.startswith("!"):
+                return None
+            pattern_globs = sql_globs(pattern)
+            if pattern_globs is None:
+                remaining.append(pattern)
+            else:
+                globs.extend(pattern_globs)
+
+        return globs, IgnoreMatcher(remaining) if remaining else None
+
+    def walk(self, root: Path) -> Iterator[Path]:
+        """Yield the relative paths of every file under root that isn't ignored.
+
+        Ignored directories are pruned without being read. Symlinks are followed, while
+        directories that were already visited are skipped to avoid symlink loops.
+
+        Args:
+            root (Path): The directory to walk, which paths are matched relative to.
+        """
+        for _, files in self.walk_dirs(root):
+            yield from files
+
+    def walk_dirs(
+        self, root: Path, after: str | None = None, mtimes: dict[Path, float] | None = None
+    ) -> Iterator[tuple[str, list[Path]]]:
+        """Yield the files that aren't ignored under root, one directory at a time.
+
+        Directories are visited depth-first with their subdirectories in sorted order, so the
+        order is the same between walks of an unchanged directory tree. This allows a walk to
+        resume from the last directory that was completed.
+
+        Args:
+            root (Path): The directory to walk, which paths are matched relative to.
+            after (str | None): The relative POSIX path of a directory visited in a previous
+                walk. It and every directory visited before it are skipped, and only its parent
+                directories are read to find the directories after it.
+            mtimes (dict[Path, float] | None): If given, the modification time of each yielded
+                file is stored in it by relative path, taken from the directory entry that was
+                read anyway, so the file doesn't have to be looked up again.
+
+        Yields:
+            tuple[str, list[Path]]: The relative POSIX path of a directory ("" for the root),
+                and the relative paths of the files directly inside of it.
+        """
+        after_key: list[str] | None = None
+        if after is not None:
+            after_key = after.split("/") if after else []
+
+        visited: set[tuple[int, int]] = set()
+        stack: list[str] = [""]
+        while stack:
+            rel_dir = stack.pop()
+            skip_files = False
+            if after_key is not None:
+                key = rel_dir.split("/") if rel_dir else []
+                skip_files = key <= after_key
+                if skip_files and after_key[: len(key)] != key:
+                    # Everything inside of this directory was visited before the resume point.
+                    continue
+
+            try:
+                st = os.stat(root / rel_dir)
+                if (st.st_dev, st.st_ino) in visited:
+                    continue
+                visited.add((st.st_dev, st.st_ino))
+                with os.scandir(root / rel_dir) as it:
+                    dir_entries = list(it)
+            except OSError as e:
+                logger.warning("[IgnoreMatcher] Couldn't read directory", path=rel_dir, error=e)
+                continue
+
+            files: list[Path] = []
+            subdirs: list[str] = []
+            for dir_entry in dir_entries:
+                rel_path = f"{rel_dir}/{dir_entry.name}" if rel_dir else dir_entry.name
+                try:
+                    is_dir = dir_entry.is_dir()
+                    is_file = not is_dir and dir_entry.is_file()
+                except OSError:
+                    continue
+                if is_dir:
+                    if not self.is_dir_ignored(rel_path):
+                        subdirs.append(dir_entry.name)
+                elif (
+                    is_file
+                    and not skip_files
+                    and not self.__test(self._file_regex, self._file_negated, rel_path)
+                ):
+                    path = Path(rel_path)
+                    files.append(path)
+                    if mtimes is not None:
+                        with contextlib.suppress(OSError):
+                            mtimes[path] = dir_entry.stat().st_mtime
+
+            # Pushed in reverse so that they're popped in sorted order.
+            subdirs.sort(reverse=True)
+            stack.extend(f"{rel_dir}/{name}" if rel_dir else name for name in subdirs)
+            if not skip_files:
+                yield rel_dir, files
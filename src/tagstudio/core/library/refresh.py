@@ -2,76 +2,213 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import hashlib
+import os
 import shutil
-from collections.abc import Iterator
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
-from datetime import datetime as dt
+from datetime import datetime
 from pathlib import Path
-from time import time
+from threading import Event
+from time import perf_counter, time
 
 import structlog
-from wcmatch import pathlib
 
 from tagstudio.core.library.alchemy.library import Library
-from tagstudio.core.library.alchemy.models import Entry
-from tagstudio.core.library.ignore import PATH_GLOB_FLAGS, Ignore, ignore_to_glob
+from tagstudio.core.library.ignore import Ignore
+from tagstudio.core.library.refresh_checkpoint import RefreshCheckpoint
+from tagstudio.core.library.refresh_report import RefreshReport
 from tagstudio.core.utils.silent_subprocess import silent_run  # pyright: ignore
+from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger(__name__)
 
 
+# The number of new entries inserted per transaction.
+SAVE_BATCH_SIZE: int = 10_000
+
+# The minimum number of seconds between saving checkpoints while scanning.
+CHECKPOINT_INTERVAL: float = 5.0
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except OSError:
+        return None
+
+
+def _dir_key(rel_dir: str) -> list[str]:
+    """Return the key that orders directories the same way as IgnoreMatcher.walk_dirs."""
+    return rel_dir.split("/") if rel_dir else []
+
+
 @dataclass
 class RefreshTracker:
     library: Library
     files_not_in_library: list[Path] = field(default_factory=list)
+    new_entry_ids: list[int] = field(default_factory=list)
+    modified_entry_ids: list[int] = field(default_factory=list)
+    checkpoint: RefreshCheckpoint | None = None
+    report: RefreshReport | None = None
+    # The modification times of the library's files seen by the internal walker, by path.
+    _scanned_mtimes: dict[Path, float] = field(default_factory=dict, repr=False)
+    _cancel_event: Event = field(default_factory=Event, repr=False)
 
     @property
     def files_count(self) -> int:
         return len(self.files_not_in_library)
 
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        """Stop the running scan or save, keeping a checkpoint to resume from later.
+
+        Thread-safe. The scan stops before the next file, and saving stops before the next
+        batch of new files.
+        """
+        self._cancel_event.set()
+
     def save_new_files(self) -> Iterator[int]:
-        """Save the list of files that are not in the library."""
-        batch_size = 200
-
-        index = 0
-        while index < len(self.files_not_in_library):
-            yield index
-            end = min(len(self.files_not_in_library), index + batch_size)
-            entries = [
-                Entry(
-                    path=entry_path,
-                    fields=[],
-                    date_added=dt.now(),
-                )
-                for entry_path in self.files_not_in_library[index:end]
-            ]
-            self.library.add_entries(entries)
-            index = end
-        self.files_not_in_library = []
+        """Save the list of files that are not in the library.
+
+        Files are inserted SAVE_BATCH_SIZE at a time, each batch in a single transaction.
+        The IDs of the new entries are collected in new_entry_ids. Afterwards the stored
+        modification dates of the other entries are checked, see update_modified_dates. Once
+        done or cancelled, the report of the refresh is saved.
+        """
+        library_dir = unwrap(self.library.library_dir)
+        report = self.report or RefreshReport()
+        stat_phase = report.phase("stat")
+        insert_phase = report.phase("inserting")
+        self.new_entry_ids = []
+
+        with report.count_round_trips(unwrap(self.library.engine)):
+            for index in range(0, len(self.files_not_in_library), SAVE_BATCH_SIZE):
+                if self.cancelled:
+                    logger.info("[Refresh]: Saving new files cancelled", saved=index)
+                    self.files_not_in_library = self.files_not_in_library[index:]
+                    report.cancelled = True
+                    break
+                yield index
+                paths = self.files_not_in_library[index : index + SAVE_BATCH_SIZE]
+                start_time = perf_counter()
+                stats = [_stat(library_dir / path) for path in paths]
+                stat_phase.seconds += perf_counter() - start_time
+                stat_phase.files += len(paths)
+
+                start_time = perf_counter()
+                self.new_entry_ids.extend(self.library.insert_entries(paths, stats))
+                insert_phase.seconds += perf_counter() - start_time
+                insert_phase.files += len(paths)
+                if self.checkpoint is not None:
+                    self.checkpoint.saved_count += len(paths)
+                    self.checkpoint.save([])
+            else:
+                self.files_not_in_library = []
+                if self.checkpoint is not None:
+                    self.checkpoint.clear()
+                yield from self.update_modified_dates(report)
+
+        report.save(library_dir)
+
+    def update_modified_dates(self, report: RefreshReport | None = None) -> Iterator[int]:
+        """Store the modification dates of files that changed since they were last scanned.
+
+        Cached thumbnails are looked up by entry ID and stored modification date without
+        reading the file system, so this is where changed files are noticed. Entries are
+        checked SAVE_BATCH_SIZE at a time, and the IDs of the changed ones are collected in
+        modified_entry_ids. Files that the internal walker visited during the scan aren't read
+        again, only the others are. Missing files are left for the unlinked entries check.
+
+        Args:
+            report (RefreshReport | None): The report to record the timings in.
+        """
+        library_dir = unwrap(self.library.library_dir)
+        phase = (report or RefreshReport()).phase("modified")
+        new_entry_ids = set(self.new_entry_ids)
+        self.modified_entry_ids = []
+        after_id = 0
+        checked = 0
+
+        while not self.cancelled:
+            yield checked
+            start_time = perf_counter()
+            rows = self.library.get_modified_dates(after_id, SAVE_BATCH_SIZE)
+            if not rows:
+                break
+            modified: dict[int, datetime] = {}
+            for entry_id, path, date_modified in rows:
+                if entry_id in new_entry_ids:
+                    continue
+                mtime = self._scanned_mtimes.get(path)
+                if mtime is None:
+                    st = _stat(library_dir / path)
+                    if st is None:
+                        continue
+                    mtime = st.st_mtime
+                new_date = datetime.fromtimestamp(mtime)
+                if new_date != date_modified:
+                    modified[entry_id] = new_date
+            self.library.update_modified_dates(modified)
+            self.modified_entry_ids.extend(modified)
+            after_id = rows[-1][0]
+            checked += len(rows)
+            phase.seconds += perf_counter() - start_time
+            phase.files += len(rows)
+        else:
+            if report is not None:
+                report.cancelled = True
+        self._scanned_mtimes = {}
 
     def refresh_dir(self, library_dir: Path, force_internal_tools: bool = False) -> Iterator[int]:
         """Scan a directory for files, and add those relative filenames to internal variables.
 
+        Progress is saved to a checkpoint as the scan goes along. If a previous refresh was
+        cancelled or interrupted, the scan resumes after the last directory it completed, and
+        the new files it had already found are kept.
+
         Args:
             library_dir (Path): The library directory.
             force_internal_tools (bool): Option to force the use of internal tools for scanning
-                (i.e. wcmatch) instead of using tools found on the system (i.e. ripgrep).
+                (i.e. IgnoreMatcher) instead of using tools found on the system (i.e. ripgrep).
         """
         if self.library.library_dir is None:
             raise ValueError("No library directory set.")
 
         ignore_patterns = Ignore.get_patterns(library_dir)
-
+        patterns_key = hashlib.sha256("\n".join(ignore_patterns).encode()).hexdigest()
+        self.checkpoint = RefreshCheckpoint(library_dir, patterns_key)
+        pending = self.checkpoint.load()
+        if pending is None:
+            self.checkpoint.clear()
+            self.files_not_in_library = []
+        else:
+            logger.info("[Refresh]: Resuming previous refresh", last_dir=self.checkpoint.last_dir)
+            self.files_not_in_library = pending
+            if self.checkpoint.scan_complete:
+                self.report = RefreshReport(resumed=True)
+                return iter([0])
+
+        self.report = RefreshReport(resumed=pending is not None)
+        self._scanned_mtimes = {}
+        after = self.checkpoint.last_dir
         if force_internal_tools:
-            return self.__wc_add(library_dir, ignore_to_glob(ignore_patterns))
+            return self.__internal_add(library_dir, after)
 
+        start_time = perf_counter()
         dir_list: list[str] | None = self.__get_dir_list(library_dir, ignore_patterns)
+        if dir_list is not None:
+            self.report.phase("listing").seconds += perf_counter() - start_time
 
-        # Use ripgrep if it was found and working, else fallback to wcmatch.
+        # Use ripgrep if it was found and working, else fallback to the internal walker.
         if dir_list is not None:
-            return self.__rg_add(library_dir, dir_list)
+            return self.__rg_add(library_dir, dir_list, after)
         else:
-            return self.__wc_add(library_dir, ignore_to_glob(ignore_patterns))
+            return self.__internal_add(library_dir, after)
 
     def __get_dir_list(self, library_dir: Path, ignore_patterns: list[str]) -> list[str] | None:
         """Use ripgrep to return a list of matched directories and files.
@@ -115,82 +252,121 @@ class RefreshTracker:
         logger.warning("[Refresh: ripgrep not found on system]")
         return None
 
-    def __rg_add(self, library_dir: Path, dir_list: list[str]) -> Iterator[int]:
-        start_time_total = time()
-        start_time_loop = time()
-        dir_file_count = 0
-        self.files_not_in_library = []
-
+    def __rg_add(self, library_dir: Path, dir_list: list[str], after: str | None) -> Iterator[int]:
+        # Group the files by directory, visiting them in the same order as the internal walker.
+        dirs: dict[str, list[Path]] = defaultdict(list)
         for r in dir_list:
-            f = pathlib.Path(r)
-
-            end_time_loop = time()
-            # Yield output every 1/30 of a second
-            if (end_time_loop - start_time_loop) > 0.034:
-                yield dir_file_count
-                start_time_loop = time()
-
-            # Skip if the file/path is already mapped in the Library
-            if f in self.library.included_files:
-                dir_file_count += 1
-                continue
-
-            # Ignore if the file is a directory
-            if f.is_dir():
-                continue
-
-            dir_file_count += 1
-            self.library.included_files.add(f)
-
-            if not self.library.has_entry_with_path(f):
-                self.files_not_in_library.append(f)
-
-        end_time_total = time()
-        yield dir_file_count
-        logger.info(
-            "[Refresh]: Directory scan time",
-            path=library_dir,
-            duration=(end_time_total - start_time_total),
-            files_scanned=dir_file_count,
-            tool_used="ripgrep (system)",
+            f = Path(r)
+            parent = f.parent.as_posix()
+            dirs["" if parent == "." else parent].append(f)
+
+        after_key = None if after is None else _dir_key(after)
+        sorted_dirs = (
+            (rel_dir, dirs[rel_dir])
+            for rel_dir in sorted(dirs, key=_dir_key)
+            if after_key is None or _dir_key(rel_dir) > after_key
         )
+        unwrap(self.report).backend = "ripgrep"
+        return self.__add_dirs(library_dir, sorted_dirs, "ripgrep (system)")
+
+    def __internal_add(self, library_dir: Path, after: str | None) -> Iterator[int]:
+        logger.info("[Refresh]: Falling back to the internal walker for scanning")
+        matcher = unwrap(Ignore.compiled_patterns)
+        # Ignored directories are pruned by the walker, so their contents are never read.
+        dirs = matcher.walk_dirs(library_dir, after, self._scanned_mtimes)
+        unwrap(self.report).backend = "internal"
+        return self.__add_dirs(library_dir, dirs, "IgnoreMatcher (internal)")
+
+    def __add_dirs(
+        self, library_dir: Path, dirs: Iterable[tuple[str, list[Path]]], tool_used: str
+    ) -> Iterator[int]:
+        """Find the files that aren't in the library yet, one directory at a time.
 
-    def __wc_add(self, library_dir: Path, ignore_patterns: list[str]) -> Iterator[int]:
+        Args:
+            library_dir (Path): The library directory.
+            dirs (Iterable[tuple[str, list[Path]]]): The relative path of each directory, and
+                the relative paths of the files inside of it, in the order of walk_dirs.
+            tool_used (str): The name of the tool that listed the files, for logging.
+        """
+        checkpoint = unwrap(self.checkpoint)
+        report = unwrap(self.report)
+        listing = report.phase("listing")
+        diffing = report.phase("diffing")
         start_time_total = time()
         start_time_loop = time()
+        last_checkpoint_time = time()
         dir_file_count = 0
-        self.files_not_in_library = []
-
-        logger.info("[Refresh]: Falling back to wcmatch for scanning")
+        # New files from completed directories that aren't in the checkpoint yet.
+        unsaved: list[Path] = []
+        scan_cancelled = False
+
+        with report.count_round_trips(unwrap(self.library.engine)):
+            dirs_iter = iter(dirs)
+            while True:
+                start_time = perf_counter()
+                next_dir = next(dirs_iter, None)
+                listing.seconds += perf_counter() - start_time
+                if next_dir is None:
+                    break
+                rel_dir, files = next_dir
+                listing.files += len(files)
+
+                # The time spent yielding is left out of the diffing time.
+                diff_start_time = perf_counter()
+                dir_new_files: list[Path] = []
+                # Files are only marked as included once their directory is complete, so that
+                # a directory that was cancelled partway through is fully scanned again.
+                dir_included_files: list[Path] = []
+                for f in files:
+                    if self.cancelled:
+                        break
+
+                    end_time_loop = time()
+                    # Yield output every 1/30 of a second
+                    if (end_time_loop - start_time_loop) > 0.034:
+                        diffing.seconds += perf_counter() - diff_start_time
+                        yield dir_file_count
+                        diff_start_time = perf_counter()
+                        start_time_loop = time()
+
+                    diffing.files += 1
+                    # Skip if the file/path is already mapped in the Library
+                    if f in self.library.included_files:
+                        dir_file_count += 1
+                        continue
 
-        try:
-            for f in pathlib.Path(str(library_dir)).glob(
-                "***/*", flags=PATH_GLOB_FLAGS, exclude=ignore_patterns
-            ):
-                end_time_loop = time()
-                # Yield output every 1/30 of a second
-                if (end_time_loop - start_time_loop) > 0.034:
-                    yield dir_file_count
-                    start_time_loop = time()
-
-                # Skip if the file/path is already mapped in the Library
-                if f in self.library.included_files:
                     dir_file_count += 1
-                    continue
-
-                # Ignore if the file is a directory
-                if f.is_dir():
-                    continue
-
-                dir_file_count += 1
-                self.library.included_files.add(f)
+                    dir_included_files.append(f)
+
+                    if not self.library.has_entry_with_path(f):
+                        dir_new_files.append(f)
+                diffing.seconds += perf_counter() - diff_start_time
+
+                if self.cancelled:
+                    # The current directory is scanned again when resuming.
+                    checkpoint.save(unsaved)
+                    logger.info("[Refresh]: Scan cancelled", last_dir=checkpoint.last_dir)
+                    scan_cancelled = True
+                    break
+
+                for f in dir_included_files:
+                    self.library.included_files.add(f)
+                self.files_not_in_library.extend(dir_new_files)
+                unsaved.extend(dir_new_files)
+                checkpoint.last_dir = rel_dir
+                if time() - last_checkpoint_time >= CHECKPOINT_INTERVAL:
+                    checkpoint.save(unsaved)
+                    unsaved = []
+                    last_checkpoint_time = time()
+                    yield dir_file_count
 
-                relative_path = f.relative_to(library_dir)
+        if scan_cancelled:
+            report.cancelled = True
+            report.save(library_dir)
+            return
 
-                if not self.library.has_entry_with_path(relative_path):
-                    self.files_not_in_library.append(relative_path)
-        except ValueError:
-            logger.info("[Refresh]: ValueError when refreshing directory with wcmatch!")
+        checkpoint.scan_complete = True
+        checkpoint.save(unsaved)
 
         end_time_total = time()
         yield dir_file_count
@@ -199,5 +375,5 @@ class RefreshTracker:
             path=library_dir,
             duration=(end_time_total - start_time_total),
             files_scanned=dir_file_count,
-            tool_used="wcmatch (internal)",
+            tool_used=tool_used,
         )
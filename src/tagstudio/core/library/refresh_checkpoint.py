@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import structlog
+
+from tagstudio.core.constants import REFRESH_CHECKPOINT_NAME, TS_FOLDER_NAME
+
+logger = structlog.get_logger(__name__)
+
+CHECKPOINT_VERSION: int = 1
+STATE_NAME: str = "state.json"
+PENDING_NAME: str = "pending.jsonl"
+
+
+class RefreshCheckpoint:
+    """The progress of a library refresh, saved so that an interrupted refresh can be resumed.
+
+    The checkpoint is a folder inside of the library's .TagStudio folder. Its state file holds
+    the last directory that was completely scanned, whether the scan finished, and how many of
+    the new files found have been saved to the library. The new files themselves are kept in a
+    separate file which is only ever appended to, so that saving a checkpoint doesn't rewrite
+    every file found so far.
+    """
+
+    def __init__(self, library_dir: Path, patterns_key: str) -> None:
+        """Create a checkpoint for a library.
+
+        Args:
+            library_dir (Path): The library directory.
+            patterns_key (str): A key of the ignore patterns used for the scan. A checkpoint
+                saved with different patterns isn't resumed.
+        """
+        self.folder = library_dir / TS_FOLDER_NAME / REFRESH_CHECKPOINT_NAME
+        self.patterns_key = patterns_key
+        self.last_dir: str | None = None
+        self.scan_complete: bool = False
+        self.saved_count: int = 0
+        self._pending_count: int = 0
+
+    @property
+    def state_path(self) -> Path:
+        return self.folder / STATE_NAME
+
+    @property
+    def pending_path(self) -> Path:
+        return self.folder / PENDING_NAME
+
+    def load(self) -> list[Path] | None:
+        """Load a previously saved checkpoint.
+
+        Returns:
+            list[Path] | None: The new files found that haven't been saved to the library yet,
+                or None if there's no checkpoint that can be resumed.
+        """
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != CHECKPOINT_VERSION:
+                return None
+            if state.get("patterns_key") != self.patterns_key:
+                logger.info("[RefreshCheckpoint] Ignore patterns changed, starting over")
+                return None
+
+            pending: list[Path] = []
+            if state["pending_count"] == 0:
+                self.pending_path.unlink(missing_ok=True)
+            else:
+                with open(self.pending_path, "r+b") as f:
+                    offset = 0
+                    for line in f:
+                        if len(pending) == state["pending_count"]:
+                            # Drop files written after the state was last saved.
+                            f.truncate(offset)
+                            break
+                        pending.append(Path(json.loads(line)))
+                        offset += len(line)
+                if len(pending) < state["pending_count"]:
+                    raise ValueError("Missing pending files")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("[RefreshCheckpoint] Couldn't load checkpoint", error=e)
+            return None
+
+        self.last_dir = state["last_dir"]
+        self.scan_complete = state["scan_complete"]
+        self.saved_count = state["saved_count"]
+        self._pending_count = len(pending)
+        logger.info(
+            "[RefreshCheckpoint] Loaded checkpoint",
+            last_dir=self.last_dir,
+            scan_complete=self.scan_complete,
+            pending=len(pending) - self.saved_count,
+        )
+        return pending[self.saved_count :]
+
+    def save(self, new_files: list[Path]) -> None:
+        """Save the checkpoint, adding files found since it was last saved.
+
+        Args:
+            new_files (list[Path]): The new files found since the checkpoint was last saved.
+        """
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            if new_files:
+                with open(self.pending_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(path.as_posix()) + "\n" for path in new_files)
+            self._pending_count += len(new_files)
+
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "patterns_key": self.patterns_key,
+                "last_dir": self.last_dir,
+                "scan_complete": self.scan_complete,
+                "saved_count": self.saved_count,
+                "pending_count": self._pending_count,
+            }
+            # Replace the state in one step, so that it's never left half written.
+            temp_path = self.state_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            logger.warning("[RefreshCheckpoint] Couldn't save checkpoint", error=e)
+
+    def clear(self) -> None:
+        """Delete the checkpoint, once a refresh is finished or can't be resumed."""
+        shutil.rmtree(self.folder, ignore_errors=True)
+        self.last_dir = None
+        self.scan_complete = False
+        self.saved_count = 0
+        self._pending_count = 0
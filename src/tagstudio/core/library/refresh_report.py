@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import json
+import os
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import structlog
+from sqlalchemy import Engine, event
+
+from tagstudio.core.constants import REFRESH_REPORTS_NAME, TS_FOLDER_NAME
+
+logger = structlog.get_logger(__name__)
+
+# The number of past refresh reports kept for each library.
+MAX_REFRESH_REPORTS: int = 50
+
+
+def _process_peak_memory() -> int | None:
+    """Return the peak resident memory of this process in bytes, if it can be measured.
+
+    This is the peak since the process started, not just during a refresh.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows.
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class PhaseStats:
+    """The time spent on one phase of a refresh, and the number of files it handled."""
+
+    seconds: float = 0.0
+    files: int = 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class RefreshReport:
+    """Timings and counters of a single library refresh, saved to compare runs over time.
+
+    The phases are "listing" (finding the files on disk), "diffing" (checking which files are
+    new), "stat" (reading the stats of new files), "inserting" (adding the new entries) and
+    "modified" (checking which existing files changed).
+
+    The process_peak_memory is the peak resident memory of the whole process when the report
+    was saved, which includes memory used before the refresh, like for rendering thumbnails.
+    """
+
+    backend: str = ""
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    resumed: bool = False
+    cancelled: bool = False
+    phases: dict[str, PhaseStats] = field(default_factory=dict)
+    db_round_trips: int = 0
+    process_peak_memory: int | None = None
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(phase.seconds for phase in self.phases.values())
+
+    @property
+    def files_scanned(self) -> int:
+        return self.phase("diffing").files
+
+    def phase(self, name: str) -> PhaseStats:
+        """Return the stats of a phase, adding it if it hasn't been recorded yet."""
+        return self.phases.setdefault(name, PhaseStats())
+
+    @contextmanager
+    def count_round_trips(self, engine: Engine) -> Iterator[None]:
+        """Count the statements this thread sends to the database while the context is active."""
+        thread_id = threading.get_ident()
+
+        def on_execute(*_: Any) -> None:
+            if threading.get_ident() == thread_id:
+                self.db_round_trips += 1
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            yield
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        for name, phase in self.phases.items():
+            data["phases"][name]["files_per_second"] = round(phase.files_per_second, 1)
+        return data
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> RefreshReport:
+        phases = {
+            name: PhaseStats(seconds=phase["seconds"], files=phase["files"])
+            for name, phase in data.get("phases", {}).items()
+        }
+        return RefreshReport(
+            backend=data.get("backend", ""),
+            started_at=data.get("started_at", ""),
+            resumed=data.get("resumed", False),
+            cancelled=data.get("cancelled", False),
+            phases=phases,
+            db_round_trips=data.get("db_round_trips", 0),
+            # Older reports stored the same measurement under a name that suggested it was
+            # taken during the refresh.
+            process_peak_memory=data.get("process_peak_memory", data.get("peak_memory")),
+        )
+
+    def save(self, library_dir: Path) -> None:
+        """Add the report to the library's saved reports, dropping the oldest ones."""
+        self.process_peak_memory = _process_peak_memory()
+        logger.info("[RefreshReport]", **self.to_dict())
+
+        reports = [r.to_dict() for r in load_refresh_reports(library_dir)]
+        reports.append(self.to_dict())
+        path = library_dir / TS_FOLDER_NAME / REFRESH_REPORTS_NAME
+        try:
+            temp_path = path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(reports[-MAX_REFRESH_REPORTS:], f, indent=2)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("[RefreshReport] Couldn't save refresh report", error=e)
+
+
+def load_refresh_reports(library_dir: Path) -> list[RefreshReport]:
+    """Load the saved refresh reports of a library, oldest first."""
+    path = library_dir / TS_FOLDER_NAME / REFRESH_REPORTS_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [RefreshReport.from_dict(data) for data in json.load(f)]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("[RefreshReport] Couldn't load refresh reports", error=e)
+        return []
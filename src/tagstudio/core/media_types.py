@@ -5,6 +5,7 @@
 import enum
 import mimetypes
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 
 import structlog
@@ -23,6 +24,12 @@ FILETYPE_EQUIVALENTS = [
 ]
 
 
+@cache
+def _guess_mime_type(ext: str) -> str | None:
+    """Return the MIME type guessed for an extension, remembering the guess for next time."""
+    return mimetypes.guess_type(Path("x" + ext), strict=False)[0]
+
+
 class MediaType(enum.StrEnum):
     """Names of media types."""
 
@@ -93,7 +100,7 @@ class MediaCategory:
         if ext in self.extensions:
             return True
         elif mime_fallback and self.is_iana:
-            mime_type: str | None = mimetypes.guess_type(Path("x" + ext), strict=False)[0]
+            mime_type: str | None = _guess_mime_type(ext)
             if mime_type is not None and mime_type.startswith(self.media_type.value):
                 return True
         return False
@@ -686,6 +693,9 @@ class MediaCategories:
         KRITA_TYPES,
     ]
 
+    # The media types of each extension and MIME fallback flag, filled in by get_types().
+    _types_cache: dict[tuple[str, bool], frozenset[MediaType]] = {}
+
     @staticmethod
     def get_types(ext: str, mime_fallback: bool = False) -> set[MediaType]:
         """Return a set of MediaTypes given a file extension.
@@ -694,13 +704,16 @@ class MediaCategories:
             ext (str): File extension with a leading "." and in all lowercase.
             mime_fallback (bool): Flag to guess MIME type if no set matches are made.
         """
-        media_types: set[MediaType] = set()
-
-        for cat in MediaCategories.ALL_CATEGORIES:
-            if cat.contains(ext, mime_fallback):
-                media_types.add(cat.media_type)
+        media_types = MediaCategories._types_cache.get((ext, mime_fallback))
+        if media_types is None:
+            media_types = frozenset(
+                cat.media_type
+                for cat in MediaCategories.ALL_CATEGORIES
+                if cat.contains(ext, mime_fallback)
+            )
+            MediaCategories._types_cache[(ext, mime_fallback)] = media_types
 
-        return media_types
+        return set(media_types)
 
     @staticmethod
     def is_ext_in_category(ext: str, media_cat: MediaCategory, mime_fallback: bool = False) -> bool:
@@ -14,6 +14,7 @@ class ConstraintType(Enum):
     FileType = 3
     Path = 4
     Special = 5
+    Similar = 6
 
     @staticmethod
     def from_string(text: str) -> ConstraintType | None:
@@ -24,6 +25,7 @@ class ConstraintType(Enum):
             "filetype": ConstraintType.FileType,
             "path": ConstraintType.Path,
             "special": ConstraintType.Special,
+            "similar": ConstraintType.Similar,
         }.get(text.lower())
 
 
@@ -2,25 +2,93 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import codecs
 from pathlib import Path
 
 from chardet.universaldetector import UniversalDetector
 
+# The number of bytes read from the start of text files to detect their encoding and show them.
+TEXT_PREFIX_SIZE: int = 8 * 1024
+# The number of bytes fed to the encoding detector at a time.
+DETECT_CHUNK_SIZE: int = 1024
+
+# Longer BOMs come first, since the UTF-32 LE BOM starts with the UTF-16 LE BOM.
+BOM_ENCODINGS: tuple[tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
 
-def detect_char_encoding(filepath: Path) -> str | None:
-    """Attempts to detect the character encoding of a text file.
+
+def read_prefix(filepath: Path, size: int = TEXT_PREFIX_SIZE) -> bytes:
+    """Read at most size bytes from the start of a file.
 
     Args:
-    filepath (Path): The path of the text file to analyze.
+        filepath (Path): The path of the file to read.
+        size (int): The maximum number of bytes to read.
+    """
+    with open(filepath, "rb") as file:
+        return file.read(size)
+
+
+def detect_prefix_encoding(data: bytes) -> str | None:
+    """Attempts to detect the character encoding of the start of a text file.
+
+    A byte order mark decides the encoding if there is one. Otherwise the data is fed to chardet
+    in small chunks, until it's confident about the encoding.
+
+    Args:
+        data (bytes): The first bytes of the file.
 
     Returns:
-    str | None: The detected character encoding, if any.
+        str | None: The detected character encoding, if any.
     """
+    for bom, encoding in BOM_ENCODINGS:
+        if data.startswith(bom):
+            return encoding
+
     detector = UniversalDetector()
-    with open(filepath, "rb") as text_file:
-        for line in text_file.readlines():
-            detector.feed(line)
-            if detector.done:
-                break
-        detector.close()
+    for start in range(0, len(data), DETECT_CHUNK_SIZE):
+        detector.feed(data[start : start + DETECT_CHUNK_SIZE])
+        if detector.done:
+            break
+    detector.close()
     return detector.result["encoding"]
+
+
+def detect_char_encoding(filepath: Path) -> str | None:
+    """Attempts to detect the character encoding of a text file from its first bytes.
+
+    Args:
+        filepath (Path): The path of the text file to analyze.
+
+    Returns:
+        str | None: The detected character encoding, if any.
+    """
+    return detect_prefix_encoding(read_prefix(filepath))
+
+
+def read_text_prefix(
+    filepath: Path, encoding: str | None = None, size: int = TEXT_PREFIX_SIZE
+) -> tuple[str, str | None]:
+    """Read and decode the start of a text file, without reading the rest of it.
+
+    Args:
+        filepath (Path): The path of the text file to read.
+        encoding (str | None): The encoding of the file, or None to detect it.
+        size (int): The maximum number of bytes to read.
+
+    Returns:
+        The decoded text, and the encoding that was used. A character cut off at the end of the
+        prefix is left out.
+
+    Raises:
+        UnicodeDecodeError: If the text isn't valid in the encoding.
+    """
+    data = read_prefix(filepath, size)
+    if encoding is None:
+        encoding = detect_prefix_encoding(data)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")()
+    return decoder.decode(data, final=len(data) < size), encoding
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import hashlib
+import mmap
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# The number of bytes read from both the start and end of a file for a partial hash.
+PARTIAL_HASH_CHUNK: int = 64 * 1024  # 64 KiB
+
+# The minimum number of files to hash before a process pool is worth spinning up.
+MIN_POOL_JOBS: int = 32
+
+
+def partial_file_hash(filepath: Path) -> str | None:
+    """Hash the first and last PARTIAL_HASH_CHUNK bytes of a file.
+
+    Files smaller than two chunks are hashed in full, meaning their partial hash is also
+    their full content hash.
+
+    Args:
+        filepath (Path): The path of the file to hash.
+
+    Returns:
+        str | None: The hex digest of the hash, or None if the file couldn't be read.
+    """
+    hasher = hashlib.blake2b(digest_size=32)
+    try:
+        with open(filepath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            hasher.update(f.read(PARTIAL_HASH_CHUNK))
+            if size > PARTIAL_HASH_CHUNK * 2:
+                f.seek(-PARTIAL_HASH_CHUNK, os.SEEK_END)
+            hasher.update(f.read(PARTIAL_HASH_CHUNK))
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def full_file_hash(filepath: Path) -> str | None:
+    """Hash the entire contents of a file using a memory-mapped read.
+
+    Args:
+        filepath (Path): The path of the file to hash.
+
+    Returns:
+        str | None: The hex digest of the hash, or None if the file couldn't be read.
+    """
+    hasher = hashlib.blake2b(digest_size=32)
+    try:
+        with open(filepath, "rb") as f:
+            # Empty files can't be memory-mapped.
+            if os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    hasher.update(m)
+    except OSError, ValueError:
+        return None
+    return hasher.hexdigest()
+
+
+def hash_files(
+    filepaths: list[Path],
+    hash_func: Callable[[Path], str | None],
+    max_workers: int | None = None,
+) -> Iterator[str | None]:
+    """Hash a list of files, spreading the work across a process pool when worthwhile.
+
+    Args:
+        filepaths (list[Path]): The paths of the files to hash.
+        hash_func (Callable): A module-level hashing function, such as full_file_hash.
+        max_workers (int | None): The maximum number of worker processes.
+            Defaults to the number of CPUs.
+
+    Yields:
+        str | None: The hash of each file, in the same order as the given paths.
+    """
+    if len(filepaths) < MIN_POOL_JOBS or max_workers == 1:
+        yield from map(hash_func, filepaths)
+        return
+
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(filepaths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(hash_func, filepaths, chunksize=chunksize)
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import structlog
+from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL.Image import DecompressionBombError
+
+from tagstudio.core.utils.types import unwrap
+
+logger = structlog.get_logger(__name__)
+
+# The width and height of the grid compared by the difference hash, resulting in a 64-bit hash.
+DHASH_SIZE: int = 8
+
+# The default maximum number of differing bits for two images to be considered similar.
+SIMILAR_IMAGE_DISTANCE: int = 10
+
+# The color that transparent images are drawn on, both for thumbnails and for hashing.
+IMAGE_BACKGROUND: str = "#1e1e1e"
+
+
+def flatten_image(image: Image.Image) -> Image.Image:
+    """Convert an image to RGB, drawing any transparent parts on the image background."""
+    if image.mode != "RGB" and image.mode != "RGBA":
+        image = image.convert(mode="RGBA")
+    if image.mode == "RGBA":
+        bg = Image.new("RGB", image.size, color=IMAGE_BACKGROUND)
+        bg.paste(image, mask=image.getchannel(3))
+        image = bg
+    return image
+
+
+def dhash(image: Image.Image) -> str:
+    """Compute the difference hash of an already decoded image.
+
+    The image is shrunk to a (DHASH_SIZE + 1) x DHASH_SIZE grayscale grid, and each bit of the
+    hash records whether a pixel is brighter than its right neighbor. Visually similar images
+    produce hashes with a small Hamming distance between them.
+
+    Args:
+        image (Image.Image): The image to hash.
+
+    Returns:
+        str: The hash as a hex string.
+    """
+    if image.mode not in ("L", "RGB", "RGBA"):
+        image = image.convert("RGBA")
+    small = image.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BOX).convert("L")
+    pixels = small.tobytes()
+
+    value = 0
+    for y in range(DHASH_SIZE):
+        row = y * (DHASH_SIZE + 1)
+        for x in range(DHASH_SIZE):
+            value = (value << 1) | (pixels[row + x] > pixels[row + x + 1])
+    return f"{value:0{DHASH_SIZE * DHASH_SIZE // 4}x}"
+
+
+def image_file_hash(filepath: Path) -> str | None:
+    """Open an image file and compute its difference hash.
+
+    Used for images that haven't had their hash recorded while rendering a thumbnail. The
+    image is rotated and flattened like rendered thumbnails are, so both give the same hash.
+
+    Args:
+        filepath (Path): The path of the image to hash.
+
+    Returns:
+        str | None: The hash as a hex string, or None if the image couldn't be read.
+    """
+    try:
+        with Image.open(filepath) as im:
+            # Decode at a reduced size where the format supports it (e.g. JPEG).
+            im.draft("RGB", (DHASH_SIZE * 8, DHASH_SIZE * 8))
+            return dhash(flatten_image(unwrap(ImageOps.exif_transpose(im))))
+    except (
+        DecompressionBombError,
+        OSError,
+        UnidentifiedImageError,
+        ValueError,
+    ) as e:
+        logger.error("[ImageHash] Couldn't hash image", filepath=filepath, error=type(e).__name__)
+        return None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Return the number of bits that differ between two hashes."""
+    return (a ^ b).bit_count()
+
+
+class BKTree[T]:
+    """A Burkhard-Keller tree for finding hashes within a Hamming distance of another hash.
+
+    Each child of a node is keyed by its distance to that node, so by the triangle inequality a
+    search only has to visit children whose key is within max_distance of the query's distance
+    to the node.
+    """
+
+    def __init__(self) -> None:
+        # Node: (hash, items sharing that hash, children keyed by distance)
+        self._root: tuple[int, list[T], dict[int, tuple]] | None = None
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: int, item: T) -> None:
+        """Add an item to the tree under the given hash."""
+        self._len += 1
+        if self._root is None:
+            self._root = (key, [item], {})
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(key, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, [item], {})
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> Iterator[tuple[int, T]]:
+        """Yield every item whose hash is within max_distance bits of the given hash.
+
+        Args:
+            key (int): The hash to search around.
+            max_distance (int): The maximum Hamming distance of results.
+
+        Yields:
+            tuple[int, T]: The distance to each matching item, and the item itself.
+        """
+        if self._root is None:
+            return
+
+        stack = [self._root]
+        while stack:
+            node_key, items, children = stack.pop()
+            distance = hamming_distance(key, node_key)
+            if distance <= max_distance:
+                for item in items:
+                    yield distance, item
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from collections.abc import Iterable
+from pathlib import PurePath, PureWindowsPath
+
+
+class PathSet:
+    """A memory-efficient set of relative file paths.
+
+    Paths are split into their parent directory and file name. Each directory is stored once
+    and mapped to the set of file names inside of it, so the directory part of a path isn't
+    repeated for every file and no Path objects are kept around. Membership follows Path
+    equality, meaning Windows paths are compared case-insensitively.
+    """
+
+    __slots__ = ("_dirs", "_len")
+
+    def __init__(self, paths: Iterable[PurePath | str] = ()) -> None:
+        self._dirs: dict[str, set[str]] = {}
+        self._len = 0
+        for path in paths:
+            self.add(path)
+
+    @staticmethod
+    def __split(path: PurePath | str) -> tuple[str, str]:
+        """Split a path into its parent directory and name, normalized like Path equality."""
+        if not isinstance(path, PurePath):
+            path = PurePath(path)
+        path_str = path.as_posix()
+        if isinstance(path, PureWindowsPath):
+            path_str = path_str.lower()
+        parent, _, name = path_str.rpartition("/")
+        return parent, name
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, PurePath | str):
+            return False
+        parent, name = self.__split(path)
+        names = self._dirs.get(parent)
+        return names is not None and name in names
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, path: PurePath | str) -> None:
+        """Add a path to the set."""
+        parent, name = self.__split(path)
+        names = self._dirs.get(parent)
+        if names is None:
+            names = self._dirs[parent] = set()
+        if name not in names:
+            names.add(name)
+            self._len += 1
+
+    def discard(self, path: PurePath | str) -> None:
+        """Remove a path from the set if it's present."""
+        parent, name = self.__split(path)
+        names = self._dirs.get(parent)
+        if names is not None and name in names:
+            names.remove(name)
+            self._len -= 1
+            if not names:
+                del self._dirs[parent]
+
+    def clear(self) -> None:
+        """Remove every path from the set."""
+        self._dirs.clear()
+        self._len = 0
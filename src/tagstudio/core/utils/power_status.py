@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import contextlib
+import sys
+from pathlib import Path
+
+import structlog
+
+from tagstudio.core.utils.silent_subprocess import (
+    silent_run,  # pyright: ignore[reportUnknownVariableType]
+)
+
+logger = structlog.get_logger(__name__)
+
+POWER_SUPPLY_PATH = Path("/sys/class/power_supply")
+
+
+def on_battery() -> bool:
+    """Return whether the machine is running on battery power.
+
+    Machines without a battery, and platforms where the power source can't be read, are
+    treated as being plugged in.
+    """
+    try:
+        if sys.platform == "win32":
+            return _on_battery_windows()
+        if sys.platform == "darwin":
+            return _on_battery_mac()
+        return _on_battery_linux()
+    except Exception as e:
+        logger.warning("[PowerStatus] Couldn't read the power source", error=e)
+        return False
+
+
+def _on_battery_linux() -> bool:
+    mains_online: bool | None = None
+    battery_discharging = False
+    if not POWER_SUPPLY_PATH.is_dir():
+        return False
+    for supply in POWER_SUPPLY_PATH.iterdir():
+        with contextlib.suppress(OSError):
+            supply_type = (supply / "type").read_text().strip()
+            if supply_type == "Mains":
+                online = (supply / "online").read_text().strip() == "1"
+                mains_online = bool(mains_online) or online
+            elif supply_type == "Battery":
+                status = (supply / "status").read_text().strip()
+                battery_discharging = battery_discharging or status == "Discharging"
+    if mains_online is None:
+        return battery_discharging
+    return not mains_online
+
+
+def _on_battery_mac() -> bool:
+    out = silent_run(["pmset", "-g", "batt"], shell=False, capture_output=True, text=True)
+    return out.returncode == 0 and "'Battery Power'" in str(out.stdout)
+
+
+def _on_battery_windows() -> bool:
+    import ctypes
+    from ctypes import wintypes
+
+    class SystemPowerStatus(ctypes.Structure):
+        _fields_ = [  # noqa: RUF012
+            ("ACLineStatus", wintypes.BYTE),
+            ("BatteryFlag", wintypes.BYTE),
+            ("BatteryLifePercent", wintypes.BYTE),
+            ("SystemStatusFlag", wintypes.BYTE),
+            ("BatteryLifeTime", wintypes.DWORD),
+            ("BatteryFullLifeTime", wintypes.DWORD),
+        ]
+
+    status = SystemPowerStatus()
+    if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):  # pyright: ignore[reportAttributeAccessIssue]
+        return False
+    # 0 is offline, 1 is online and 255 is unknown.
+    return status.ACLineStatus == 0
@@ -6,42 +6,24 @@ import contextlib
 import hashlib
 import math
 from copy import deepcopy
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import structlog
 from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFile, UnidentifiedImageError
 from PIL.Image import DecompressionBombError
+from sqlalchemy.exc import SQLAlchemyError
 
 from tagstudio.core.exceptions import NoRendererError
 from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.core.library.ignore import Ignore
-from tagstudio.core.media_types import MediaCategories, MediaType
+from tagstudio.core.utils.image_hash import dhash
 from tagstudio.core.utils.types import unwrap
 from tagstudio.previews.gradients import four_corner_gradient
-from tagstudio.previews.renderers.archive import (
-    apple_embedded_thumb,
-    archive_thumb,
-    krita_thumb,
-    open_doc_thumb,
-    powerpoint_thumb,
-)
-from tagstudio.previews.renderers.audio import audio_album_thumb, audio_waveform_thumb
-from tagstudio.previews.renderers.blender import blender_thumb
-from tagstudio.previews.renderers.clip_studio import clip_studio_thumb
-from tagstudio.previews.renderers.ebook import epub_thumb
-from tagstudio.previews.renderers.font import font_full_preview, font_small_thumb
-from tagstudio.previews.renderers.medibang_paint import medibang_paint_thumb
-from tagstudio.previews.renderers.paint_dot_net import paint_dot_net_thumb
-from tagstudio.previews.renderers.pdf import pdf_thumb
-from tagstudio.previews.renderers.raster_image import (
-    exr_image_thumb,
-    raster_image_thumb,
-    raw_image_thumb,
-)
-from tagstudio.previews.renderers.source_engine import vtf_thumb
-from tagstudio.previews.renderers.text import text_thumb
-from tagstudio.previews.renderers.vector_image import vector_image_thumb
-from tagstudio.previews.renderers.video import video_thumb
+from tagstudio.previews.render_scheduler import CancelToken
+from tagstudio.previews.renderer_registry import Renderer, RenderRequest, renderers
 from tagstudio.qt.app_settings import (
     DEFAULT_CACHED_THUMB_RES,
     MAX_CACHED_THUMB_RES,
@@ -53,6 +35,10 @@ from tagstudio.qt.cache_manager import CacheManager
 from tagstudio.qt.resource_manager import ResourceManager
 from tagstudio.qt.views.styles.palette import UI_COLORS, ColorType, UiColor, get_ui_color
 
+# Only import for type checking/autocompletion, will not be imported at runtime.
+if TYPE_CHECKING:
+    from tagstudio.previews.render_pool import RenderPool
+
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 Image.MAX_IMAGE_PIXELS = None
 
@@ -64,12 +50,14 @@ class FileRenderer:
     """A class for rendering image previews and thumbnails from files."""
 
     rm: ResourceManager = ResourceManager()
-    cached_img_ext: str = ".webp"
 
-    def __init__(self, library: Library, settings: AppSettings) -> None:
+    def __init__(
+        self, library: Library, settings: AppSettings, render_pool: RenderPool | None = None
+    ) -> None:
         super().__init__()
         self.lib = library
         self.settings = settings
+        self.render_pool = render_pool
 
         # Cached thumbnail elements.
         # Key: Size + Pixel Ratio Tuple + Radius Scale
@@ -88,29 +76,7 @@ class FileRenderer:
         Args:
             url (Path): The file url to assess. "$LOADING" will return the loading graphic.
         """
-        ext = url.suffix.lower()
-        types: set[MediaType] = MediaCategories.get_types(ext, mime_fallback=True)
-
-        # Manual icon overrides.
-        if ext in {".gif", ".vtf"}:
-            return MediaType.IMAGE
-        elif ext in {".dll", ".pyc", ".o", ".dylib"}:
-            return MediaType.PROGRAM
-        elif ext in {".mscz"}:  # noqa: SIM114
-            return MediaType.TEXT
-
-        # Loop though the specific (non-IANA) categories and return the string
-        # name of the first matching category found.
-        for cat in MediaCategories.ALL_CATEGORIES:
-            if not cat.is_iana and cat.media_type in types:
-                return cat.media_type.value
-
-        # If the type is broader (IANA registered) then search those types.
-        for cat in MediaCategories.ALL_CATEGORIES:
-            if cat.is_iana and cat.media_type in types:
-                return cat.media_type.value
-
-        return "file_generic"
+        return renderers.resource_id(url.suffix.lower())
 
     # NOTE: This method will be replaced with frontend specific decorations (Qt painting)
     def _get_mask(
@@ -536,6 +502,161 @@ class FileRenderer:
 
         return im
 
+    @staticmethod
+    def thumb_cache_key(
+        filepath: Path, entry_id: int | None = None, date_modified: datetime | None = None
+    ) -> str:
+        """Return the key of a file's thumbnail in the cache.
+
+        Args:
+            filepath (Path): The path of the file.
+            entry_id (int | None): The ID of the file's library entry. If given, the key is
+                made from the ID and the stored modification date, without reading the file's
+                stats. Changes to the file are picked up by library refreshes instead.
+            date_modified (datetime | None): The stored modification date of the entry.
+        """
+        mod_time: str = ""
+        if entry_id is not None:
+            if date_modified is not None:
+                mod_time = date_modified.isoformat()
+            hashable_str = f"{entry_id}:{mod_time}"
+        else:
+            with contextlib.suppress(Exception):
+                mod_time = str(filepath.stat().st_mtime_ns)
+            hashable_str = f"{str(filepath)}{mod_time}"
+        return hashlib.shake_128(hashable_str.encode("utf-8")).hexdigest(8)
+
+    def _cached_thumb_res(self) -> int:
+        """Return the resolution thumbnails are saved to the cache at."""
+        settings_res = self.settings.cached_thumb_resolution
+        return (
+            settings_res
+            if settings_res >= MIN_CACHED_THUMB_RES and settings_res <= MAX_CACHED_THUMB_RES
+            else DEFAULT_CACHED_THUMB_RES
+        )
+
+    def _cached_thumb_levels(self) -> tuple[int, ...]:
+        """Return the resolutions thumbnails are saved to the cache at, smallest first.
+
+        Besides the configured resolution, levels at half and twice that resolution are kept, so
+        that small grid sizes and HiDPI screens are served without going back to the file.
+        """
+        thumb_res = self._cached_thumb_res()
+        return tuple(
+            sorted(
+                {
+                    max(thumb_res // 2, MIN_CACHED_THUMB_RES),
+                    thumb_res,
+                    min(thumb_res * 2, MAX_CACHED_THUMB_RES),
+                }
+            )
+        )
+
+    @staticmethod
+    def themed_thumb_key(cache_key: str, filepath: Path, theme: Theme) -> str:
+        """Return the cache key of a thumbnail for a theme.
+
+        Thumbnails drawn in theme colors, like those of fonts and text files, are cached per
+        theme. All other thumbnails are shared between themes.
+        """
+        chain = FileRenderer._renderer_chain(FileRenderer._get_ext(filepath), is_thumb=True)
+        if any(renderer.savable and renderer.theme_dependent for renderer in chain):
+            return f"{cache_key}-{theme.name.lower()}"
+        return cache_key
+
+    @staticmethod
+    def _is_size_dependent(filepath: Path) -> bool:
+        """Return whether the thumbnail of a file may be drawn for the requested size."""
+        chain = FileRenderer._renderer_chain(FileRenderer._get_ext(filepath), is_thumb=True)
+        return any(renderer.size_dependent for renderer in chain)
+
+    @staticmethod
+    def thumb_level_key(cache_key: str, level: int) -> str:
+        """Return the cache key of one resolution level of a thumbnail."""
+        return f"{cache_key}@{level}"
+
+    @staticmethod
+    def decorated_thumb_key(
+        cache_key: str, scaled_size: int, dpi_scale: float, theme: Theme
+    ) -> str:
+        """Return the cache key of a thumbnail with the mask and edge of the grid applied."""
+        return f"{cache_key}@{scaled_size}x{dpi_scale:g}-{theme.name.lower()}"
+
+    def is_thumb_cached(self, cache: CacheManager, cache_key: str) -> bool:
+        """Return whether every resolution level of a thumbnail is cached."""
+        return all(
+            FileRenderer.thumb_level_key(cache_key, level) in cache
+            for level in self._cached_thumb_levels()
+        )
+
+    def _get_cached_thumb(
+        self, cache: CacheManager, cache_key: str, scaled_size: int, upscale: bool = True
+    ) -> Image.Image | None:
+        """Load the smallest cached level of a thumbnail that is at least the scaled size.
+
+        If the thumbnail is larger than every level, the largest level is loaded instead, unless
+        upscale is False.
+        """
+        levels = self._cached_thumb_levels()
+        fits = [level for level in levels if level >= scaled_size]
+        for level in fits or ([levels[-1]] if upscale else []):
+            image = cache.get_image(FileRenderer.thumb_level_key(cache_key, level))
+            if image is not None:
+                return image
+        return None
+
+    def _save_thumb_levels(self, cache: CacheManager, image: Image.Image, cache_key: str) -> None:
+        """Save a rendered thumbnail to the cache at every resolution level.
+
+        Each level is scaled down from the next larger one, so the file is only decoded once.
+        """
+        for level in reversed(self._cached_thumb_levels()):
+            if max(image.size) > level:
+                image = self._resize_image(image, (level, level))
+            cache.save_image(image, FileRenderer.thumb_level_key(cache_key, level))
+
+    def pregenerate_thumb(
+        self,
+        cache: CacheManager,
+        filepath: Path,
+        entry_id: int,
+        date_modified: datetime | None,
+        theme: Theme = Theme.DARK,
+        cancel_token: CancelToken | None = None,
+    ) -> bool:
+        """Render the thumbnail of an entry into the cache, unless it's already cached.
+
+        Only the cached image is rendered, without the mask and edge of grid thumbnails.
+
+        Args:
+            cache (CacheManager): The cache to save the thumbnail to.
+            filepath (Path): The path of the entry's file.
+            entry_id (int): The ID of the entry.
+            date_modified (datetime | None): The stored modification date of the entry.
+            theme (Theme): A theme enum to determine the light/dark theme.
+            cancel_token (CancelToken | None): A token checked before decoding and encoding.
+
+        Returns:
+            bool: Whether a thumbnail was rendered.
+        """
+        cache_key = FileRenderer.themed_thumb_key(
+            FileRenderer.thumb_cache_key(filepath, entry_id, date_modified), filepath, theme
+        )
+        if not self.settings.generate_thumbs or self.is_thumb_cached(cache, cache_key):
+            return False
+        thumb_res = self._cached_thumb_levels()[-1]
+        image = self._render(
+            cache=cache,
+            filepath=filepath,
+            size=(thumb_res, thumb_res),
+            dpi_scale=1,
+            theme=theme,
+            is_thumb=True,
+            cache_key=cache_key,
+            cancel_token=cancel_token,
+        )
+        return image is not None
+
     def render(
         self,
         cache: CacheManager | None,
@@ -546,6 +667,8 @@ class FileRenderer:
         theme: Theme = Theme.DARK,
         is_loading: bool = False,
         is_thumb: bool = False,
+        cancel_token: CancelToken | None = None,
+        entry: Entry | None = None,
     ):
         """Render a thumbnail or preview image.
 
@@ -558,8 +681,14 @@ class FileRenderer:
             theme (Theme): A theme enum to determine the light/dark theme.
             is_loading (bool): Is this a loading graphic?
             is_thumb (bool): Is this specifically a thumbnail? Use for specifying small variants.
-            update_on_ratio_change (bool): Should an updated ratio signal be sent?
+            cancel_token (CancelToken | None): A token checked between rendering steps.
+            entry (Entry | None): The library entry of the file. Its cached thumbnail is found by
+                its ID and stored modification date, instead of by reading the file's stats.
+
+        Raises:
+            RenderCancelledError: If the token was cancelled before rendering finished.
         """
+        token = cancel_token or CancelToken()
         render_mask_and_edge: bool = True
         scaled_size = math.ceil(max(size[0], size[1]) * dpi_scale)
         theme_color: UiColor = UiColor.THEME_LIGHT if theme == Theme.LIGHT else UiColor.THEME_DARK
@@ -608,46 +737,37 @@ class FileRenderer:
 
             return im_
 
-        def fetch_cached_image(file_name: Path):
-            image: Image.Image | None = None
-            if not cache:
-                return image
-            cached_path = cache.get_file_path(file_name)
-
-            if cached_path and cached_path.is_file():
-                try:
-                    image = Image.open(cached_path)
-                    if not image:
-                        raise UnidentifiedImageError  # pyright: ignore[reportUnreachable]
-                except Exception as e:
-                    logger.error(
-                        "[FileRenderer] Couldn't open cached thumbnail!", path=cached_path, error=e
-                    )
-            return image
-
         image: Image.Image | None = None
         # Try to get a non-loading thumbnail for the grid.
         if not is_loading and is_thumb and filepath and filepath != Path("."):
             # Attempt to retrieve cached image from disk
-            mod_time: str = ""
-            with contextlib.suppress(Exception):
-                mod_time = str(filepath.stat().st_mtime_ns)
-            hashable_str: str = f"{str(filepath)}{mod_time}"
-            hash_value = hashlib.shake_128(hashable_str.encode("utf-8")).hexdigest(8)
-            file_name = Path(f"{hash_value}{FileRenderer.cached_img_ext}")
-            image = fetch_cached_image(file_name)
+            cache_key = (
+                FileRenderer.thumb_cache_key(filepath, entry.id, entry.date_modified)
+                if entry is not None
+                else FileRenderer.thumb_cache_key(filepath)
+            )
+            cache_key = FileRenderer.themed_thumb_key(cache_key, filepath, theme)
+            # The mask and edge are drawn once per size, pixel ratio and theme, and cached with
+            # the thumbnail.
+            decorated_key = FileRenderer.decorated_thumb_key(
+                cache_key, scaled_size, dpi_scale, theme
+            )
+            image = cache.get_image(decorated_key) if cache else None
+            is_decorated = image is not None
+            # Thumbnails drawn for the requested size, like text or waveforms, are drawn again
+            # rather than scaled up when they're larger than every cached level.
+            size_dependent = FileRenderer._is_size_dependent(filepath)
+            if not image and cache:
+                image = self._get_cached_thumb(
+                    cache, cache_key, scaled_size, upscale=not size_dependent
+                )
 
             if not image and self.settings.generate_thumbs:
-                settings_res = self.settings.cached_thumb_resolution
-                thumb_res = (
-                    settings_res
-                    if settings_res >= MIN_CACHED_THUMB_RES and settings_res <= MAX_CACHED_THUMB_RES
-                    else DEFAULT_CACHED_THUMB_RES
-                )
+                thumb_res = self._cached_thumb_levels()[-1]
+                if size_dependent:
+                    thumb_res = max(thumb_res, scaled_size)
 
                 # Render from file, return result, and try to save a cached version.
-                # TODO: Audio waveforms are dynamically sized based on the base_size, so hardcoding
-                # the resolution breaks that.
                 image = self._render(
                     cache=cache,
                     filepath=filepath,
@@ -655,7 +775,8 @@ class FileRenderer:
                     dpi_scale=1,
                     theme=theme,
                     is_thumb=is_thumb,
-                    cache_filename=file_name,
+                    cache_key=cache_key,
+                    cancel_token=token,
                 )
 
             # If the normal renderer failed, fallback the defaults
@@ -669,7 +790,8 @@ class FileRenderer:
                 render_mask_and_edge = False
 
             # Apply the mask and edge
-            if image:
+            token.raise_if_cancelled()
+            if image and not is_decorated:
                 image = self._resize_image(image, (scaled_size, scaled_size))
                 if render_mask_and_edge:
                     mask = self._get_mask((scaled_size, scaled_size), dpi_scale)
@@ -679,6 +801,9 @@ class FileRenderer:
                     image = self._apply_edge(
                         four_corner_gradient(image, (scaled_size, scaled_size), mask), edge, theme
                     )
+                    # Only thumbnails of files that could be cached are cached decorated.
+                    if cache and self.is_thumb_cached(cache, cache_key):
+                        cache.save_image(image, decorated_key)
 
             # Check if the file is supposed to be ignored and render an overlay if needed
             try:
@@ -705,7 +830,7 @@ class FileRenderer:
 
         # A full preview image (never cached)
         elif not is_thumb:
-            image = self._render(cache, filepath, size, dpi_scale, theme)
+            image = self._render(cache, filepath, size, dpi_scale, theme, cancel_token=token)
             if not image:
                 image = (
                     render_unlinked((512, 512), 2)
@@ -736,162 +861,206 @@ class FileRenderer:
         dpi_scale: float,
         theme: Theme = Theme.DARK,
         is_thumb: bool = False,
-        cache_filename: Path | None = None,
+        cache_key: str | None = None,
+        cancel_token: CancelToken | None = None,
     ) -> Image.Image | None:
         """Render a thumbnail or preview image.
 
+        Files are rendered in the render pool when one is set, unless their renderer needs Qt or
+        was registered at runtime.
+
         Args:
             cache (CacheManager | None): A cache manager instance.
-            timestamp (float): The timestamp for which this job was dispatched.
             filepath (str | Path): The path of the file to render a thumbnail for.
             size (tuple[int, int]): The unmodified base size of the thumbnail.
             dpi_scale (float): The screen pixel ratio.
             theme (Theme): A theme enum to determine the light/dark theme.
             is_thumb (bool): Is this specifically a thumbnail? Use for specifying small variants.
-            cache_filename (Path | None): An optional filename to use to save to the cache.
+            cache_key (str | None): An optional key to save the image to the cache with, at every
+                thumbnail resolution level.
+            cancel_token (CancelToken | None): A token checked before decoding and encoding.
 
         """
+        token = cancel_token or CancelToken()
         scaled_size = math.ceil(max(size[0], size[1]) * dpi_scale)
-        image: Image.Image | None = None
         filepath_: Path = Path(filepath)
-        is_savable_type: bool = True
-
-        if filepath_ and filepath_.is_file():
-            try:
-                ext: str = filepath_.suffix.lower() if filepath_.suffix else filepath_.stem.lower()
-                # eBooks ===========================================================================
-                if MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.EBOOK_TYPES, mime_fallback=True
-                ):
-                    image = epub_thumb(filepath_, ext)
-                # Krita ============================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.KRITA_TYPES, mime_fallback=True
-                ):
-                    image = krita_thumb(filepath_)
-                # Clip Studio Paint ================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.CLIP_STUDIO_PAINT_TYPES
-                ):
-                    image = clip_studio_thumb(filepath_)
-                # VTF ==============================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.SOURCE_ENGINE_TYPES, mime_fallback=True
-                ):
-                    image = vtf_thumb(filepath_)
-                # Images ===========================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.IMAGE_TYPES, mime_fallback=True
-                ):
-                    # Raw Images -------------------------------------------------------------------
-                    if MediaCategories.is_ext_in_category(
-                        ext, MediaCategories.IMAGE_RAW_TYPES, mime_fallback=True
-                    ):
-                        image = raw_image_thumb(filepath_)
-                    # Vector Images ----------------------------------------------------------------
-                    elif MediaCategories.is_ext_in_category(
-                        ext, MediaCategories.IMAGE_VECTOR_TYPES, mime_fallback=True
-                    ):
-                        image = vector_image_thumb(filepath_, scaled_size)
-                    # EXR Images -------------------------------------------------------------------
-                    elif ext in [".exr"]:
-                        image = exr_image_thumb(filepath_)
-                    # Normal Images ----------------------------------------------------------------
-                    else:
-                        image = raster_image_thumb(filepath_)
-                # Videos ===========================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.VIDEO_TYPES, mime_fallback=True
-                ):
-                    image = video_thumb(filepath_)
-                # PowerPoint =======================================================================
-                elif ext in {".pptx"}:
-                    image = powerpoint_thumb(filepath_)
-                # OpenDocument/OpenOffice ==========================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.OPEN_DOCUMENT_TYPES, mime_fallback=True
-                ):
-                    image = open_doc_thumb(filepath_)
-                # Apple iWork + Creator Studio =====================================================
-                elif (
-                    MediaCategories.is_ext_in_category(ext, MediaCategories.IWORK_TYPES)
-                    or ext == ".pxd"
-                ):
-                    image = apple_embedded_thumb(filepath_)
-                # Plain Text =======================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.PLAINTEXT_TYPES, mime_fallback=True
-                ):
-                    image = text_thumb(filepath_)
-                # Fonts ============================================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.FONT_TYPES, mime_fallback=True
-                ):
-                    if is_thumb:
-                        # Short (Aa) Preview
-                        image = font_small_thumb(filepath_, scaled_size)
-                        if image is not None:
-                            image = self._apply_overlay_color(image, UiColor.BLUE, theme)
-                    else:
-                        # Large (Full Alphabet) Preview
-                        image = font_full_preview(filepath_, scaled_size)
-                # Audio ========================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.AUDIO_TYPES, mime_fallback=True
-                ):
-                    image = audio_album_thumb(filepath_, ext)
-                    if image is None:
-                        image = audio_waveform_thumb(filepath_, ext, scaled_size, dpi_scale)
-                        is_savable_type = False
-                        if image is not None:
-                            image = self._apply_overlay_color(image, UiColor.GREEN, theme)
-                # Blender ======================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.BLENDER_TYPES, mime_fallback=True
-                ):
-                    image = blender_thumb(filepath_)
-                # PDF ==========================================================
-                elif MediaCategories.is_ext_in_category(
-                    ext, MediaCategories.PDF_TYPES, mime_fallback=True
-                ):
-                    image = pdf_thumb(filepath_, scaled_size, ext)
-                # Archives =====================================================
-                elif MediaCategories.is_ext_in_category(ext, MediaCategories.ARCHIVE_TYPES):
-                    image = archive_thumb(filepath_, ext=ext)
-                # MDIPACK ======================================================
-                elif MediaCategories.is_ext_in_category(ext, MediaCategories.MDIPACK_TYPES):
-                    image = medibang_paint_thumb(filepath_)
-                # Paint.NET ====================================================
-                elif MediaCategories.is_ext_in_category(ext, MediaCategories.PAINT_DOT_NET_TYPES):
-                    image = paint_dot_net_thumb(filepath_)
-                # No Rendered Thumbnail ========================================
-                if not image:
-                    raise NoRendererError
-
-                if image:
-                    image = self._resize_image(image, (scaled_size, scaled_size))
-
-                if cache_filename and is_savable_type and image and cache:
-                    cache.save_image(image, cache_filename, mode="RGBA")
-
-            except (
-                AssertionError,
-                ChildProcessError,
-                DecompressionBombError,
-                UnidentifiedImageError,
-                ValueError,
-            ) as e:
-                logger.error(
-                    "[FileRenderer] Couldn't render thumbnail",
-                    filepath=filepath,
-                    error=type(e).__name__,
+        if not (filepath_ and filepath_.is_file()):
+            return None
+
+        token.raise_if_cancelled()
+
+        ext: str = FileRenderer._get_ext(filepath_)
+        with_hash = cache_key is not None
+        chain = self._renderer_chain(ext, is_thumb)
+        in_pool = (
+            self.render_pool is not None
+            and bool(chain)
+            and not chain[0].needs_qt
+            and renderers.is_builtin(chain[0])
+        )
+        result: tuple[Image.Image, bool, str | None] | None = None
+        start = 0
+        while result is None and start < len(chain):
+            # Metadata is looked up here, where the library is open, and passed on to the
+            # renderer. Renderers with a probe are only tried once the ones before them failed.
+            renderer = chain[start]
+            probe = self._probe(renderer, filepath_)
+            if in_pool:
+                result = unwrap(self.render_pool).render(
+                    filepath_, ext, scaled_size, dpi_scale, theme, is_thumb, with_hash, probe, start
                 )
-                image = None
-            except NoRendererError:
-                image = None
-
+            else:
+                result = self._render_file(
+                    filepath_, ext, scaled_size, dpi_scale, theme, is_thumb, with_hash, probe, start
+                )
+            start = next(
+                (i for i in range(start + 1, len(chain)) if chain[i].probe is not None),
+                len(chain),
+            )
+        if result is None:
+            return None
+
+        token.raise_if_cancelled()
+        image, is_savable_type, image_hash = result
+        if image_hash is not None:
+            self._save_perceptual_hash(filepath_, image_hash)
+        if cache_key and is_savable_type and cache:
+            self._save_thumb_levels(cache, image, cache_key)
         return image
 
+    def _probe(self, renderer: Renderer, filepath: Path) -> object | None:
+        """Look up the metadata of a file for a renderer, or None if it has no probe.
+
+        If the stored metadata can't be read or saved, None is returned, and the renderer reads
+        the metadata from the file itself.
+        """
+        if renderer.probe is None:
+            return None
+        try:
+            return renderer.probe(self.lib, filepath)
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning(
+                "[FileRenderer] Couldn't look up file metadata",
+                filepath=filepath,
+                error=type(e).__name__,
+            )
+            return None
+
+    @staticmethod
+    def _get_ext(filepath: Path) -> str:
+        """Return the lowercase extension of a file, or its name if it has no extension."""
+        return filepath.suffix.lower() if filepath.suffix else filepath.stem.lower()
+
+    @staticmethod
+    def needs_qt(ext: str) -> bool:
+        """Return whether files with an extension are rendered with Qt.
+
+        These can only be rendered in the main process, where the QApplication lives.
+        """
+        renderer = renderers.get(ext)
+        return renderer is not None and renderer.needs_qt
+
+    @staticmethod
+    def _renderer_chain(ext: str, is_thumb: bool) -> list[Renderer]:
+        """Return the renderer for an extension followed by its fallbacks, in the order tried."""
+        renderer = renderers.get(ext)
+        if renderer is not None and not is_thumb and renderer.preview is not None:
+            renderer = renderer.preview
+        chain: list[Renderer] = []
+        while renderer is not None:
+            chain.append(renderer)
+            renderer = renderer.fallback
+        return chain
+
+    def _render_file(
+        self,
+        filepath: Path,
+        ext: str,
+        scaled_size: int,
+        dpi_scale: float,
+        theme: Theme = Theme.DARK,
+        is_thumb: bool = False,
+        with_hash: bool = False,
+        probe: object | None = None,
+        start: int = 0,
+    ) -> tuple[Image.Image, bool, str | None] | None:
+        """Render a file and resize it to fit the scaled size.
+
+        Neither the cache nor the library are touched, so this can run in a worker process.
+
+        Args:
+            filepath (Path): The path of the file to render.
+            ext (str): The lowercase extension of the file.
+            scaled_size (int): The size to fit the image in, in pixels.
+            dpi_scale (float): The screen pixel ratio.
+            theme (Theme): A theme enum to determine the light/dark theme.
+            is_thumb (bool): Is this specifically a thumbnail? Use for specifying small variants.
+            with_hash (bool): Whether to compute the perceptual hash of decoded images.
+            probe (object | None): The metadata looked up by the probe of the first renderer.
+            start (int): The position in the fallback chain of the first renderer to try. Later
+                renderers with a probe aren't tried, since their metadata isn't known yet.
+
+        Returns:
+            The image, whether it can be saved to the cache, and the perceptual hash if one was
+            computed. None if the file couldn't be rendered.
+        """
+        image: Image.Image | None = None
+        is_savable_type: bool = True
+        image_hash: str | None = None
+
+        try:
+            request = RenderRequest(filepath, ext, scaled_size, dpi_scale, theme, probe)
+            chain = self._renderer_chain(ext, is_thumb)
+            for i in range(start, len(chain)):
+                renderer = chain[i]
+                if i > start and renderer.probe is not None:
+                    break
+                image = renderer.render(request)
+                if image is not None:
+                    is_savable_type = renderer.savable
+                    if renderer.overlay_color is not None:
+                        image = self._apply_overlay_color(image, renderer.overlay_color, theme)
+                    # Record a perceptual hash while the full image is already decoded.
+                    if with_hash and renderer.hashable:
+                        image_hash = dhash(image)
+                    break
+
+            # No Rendered Thumbnail
+            if not image:
+                raise NoRendererError
+
+            image = self._resize_image(image, (scaled_size, scaled_size))
+
+        except (
+            AssertionError,
+            ChildProcessError,
+            DecompressionBombError,
+            UnidentifiedImageError,
+            ValueError,
+        ) as e:
+            logger.error(
+                "[FileRenderer] Couldn't render thumbnail",
+                filepath=filepath,
+                error=type(e).__name__,
+            )
+            return None
+        except NoRendererError:
+            return None
+
+        return image, is_savable_type, image_hash
+
+    def _save_perceptual_hash(self, filepath: Path, image_hash: str) -> None:
+        """Store the perceptual hash of a decoded image, used to find similar images."""
+        try:
+            path = filepath.relative_to(unwrap(self.lib.library_dir))
+            self.lib.save_perceptual_hash(path, image_hash)
+        except (SQLAlchemyError, TypeError, ValueError) as e:
+            logger.warning(
+                "[FileRenderer] Couldn't save perceptual hash",
+                filepath=filepath,
+                error=type(e).__name__,
+            )
+
     def _resize_image(self, image: Image.Image, size: tuple[int, int]) -> Image.Image:
         orig_x, orig_y = image.size
         new_x, new_y = size
@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import multiprocessing
+import os
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from threading import Event, Lock, Timer
+
+import structlog
+from PIL import Image
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.qt.app_settings import AppSettings, Theme
+
+logger = structlog.get_logger(__name__)
+
+# The number of seconds without any jobs before the worker processes are stopped.
+IDLE_TIMEOUT: float = 30.0
+
+# Image modes that can be sent back from a worker as raw pixel data.
+RAW_MODES: set[str] = {"1", "L", "LA", "RGB", "RGBA"}
+
+# The renderer of a worker process, created for its first job.
+_renderer: FileRenderer | None = None
+
+
+def _render_in_worker(
+    filepath: Path,
+    ext: str,
+    scaled_size: int,
+    dpi_scale: float,
+    theme: Theme,
+    is_thumb: bool,
+    with_hash: bool,
+    probe: object | None,
+    start: int,
+) -> tuple[str, tuple[int, int], bytes, bool, str | None] | None:
+    """Render a file in a worker process, returning the raw pixels of the image."""
+    global _renderer
+    if _renderer is None:
+        _renderer = FileRenderer(Library(), AppSettings())
+
+    result = _renderer._render_file(  # pyright: ignore[reportPrivateUsage]
+        filepath, ext, scaled_size, dpi_scale, theme, is_thumb, with_hash, probe, start
+    )
+    if result is None:
+        return None
+    image, is_savable_type, image_hash = result
+    if image.mode not in RAW_MODES:
+        image = image.convert("RGBA")
+    return image.mode, image.size, image.tobytes(), is_savable_type, image_hash
+
+
+class RenderPool:
+    """Renders files in worker processes, so that decoding and resizing aren't bound by the GIL.
+
+    Worker processes are started as jobs come in, up to max_workers, so only as many run as the
+    render threads keep busy. They are stopped after idle_timeout seconds without any jobs, or
+    as soon as the pool is paused. While paused, files are rendered in the calling thread, so
+    urgent renders like previews never wait for the pool to be resumed.
+    """
+
+    def __init__(self, max_workers: int | None = None, idle_timeout: float = IDLE_TIMEOUT):
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self.idle_timeout = idle_timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = Lock()
+        self._in_flight: int = 0
+        self._idle_timer: Timer | None = None
+        self._resumed = Event()
+        self._resumed.set()
+        self._closed: bool = False
+        # Renders files in this process while the pool is paused.
+        self._renderer: FileRenderer | None = None
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the worker processes are currently started."""
+        return self._executor is not None
+
+    def render(
+        self,
+        filepath: Path,
+        ext: str,
+        scaled_size: int,
+        dpi_scale: float,
+        theme: Theme = Theme.DARK,
+        is_thumb: bool = False,
+        with_hash: bool = False,
+        probe: object | None = None,
+        start: int = 0,
+    ) -> tuple[Image.Image, bool, str | None] | None:
+        """Render a file in a worker process, or in the calling thread while paused.
+
+        Takes the same arguments as, and returns the same result as, FileRenderer._render_file.
+        The probe result has to be picklable, since it's sent to the worker process. None is
+        returned if the file couldn't be rendered or the pool was shut down.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            paused = self.paused
+            if not paused:
+                if self._idle_timer is not None:
+                    self._idle_timer.cancel()
+                    self._idle_timer = None
+                if self._executor is None:
+                    logger.info(
+                        "[RenderPool] Starting render processes", max_workers=self.max_workers
+                    )
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        # Forking a process with running Qt threads isn't safe.
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                executor = self._executor
+                future = executor.submit(
+                    _render_in_worker,
+                    filepath,
+                    ext,
+                    scaled_size,
+                    dpi_scale,
+                    theme,
+                    is_thumb,
+                    with_hash,
+                    probe,
+                    start,
+                )
+                self._in_flight += 1
+        if paused:
+            return self.__renderer()._render_file(  # pyright: ignore[reportPrivateUsage]
+                filepath, ext, scaled_size, dpi_scale, theme, is_thumb, with_hash, probe, start
+            )
+
+        try:
+            result = future.result()
+        except (BrokenProcessPool, CancelledError) as e:
+            logger.error("[RenderPool] Couldn't render file", filepath=filepath, error=e)
+            with self._lock:
+                if isinstance(e, BrokenProcessPool) and self._executor is executor:
+                    # A new pool is started for the next job.
+                    self._executor = None
+            result = None
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self.__stop_when_idle()
+
+        if result is None:
+            return None
+        mode, size, data, is_savable_type, image_hash = result
+        return Image.frombytes(mode, size, data), is_savable_type, image_hash
+
+    def __renderer(self) -> FileRenderer:
+        """Return the renderer used in this process while paused."""
+        with self._lock:
+            if self._renderer is None:
+                self._renderer = FileRenderer(Library(), AppSettings())
+            return self._renderer
+
+    def pause(self) -> None:
+        """Render in the calling threads, and stop the worker processes once their jobs finish."""
+        with self._lock:
+            self._resumed.clear()
+            if self._in_flight == 0:
+                self.__stop_executor()
+
+    def resume(self) -> None:
+        """Render in worker processes again after pausing. They're started again when needed."""
+        self._resumed.set()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, and return None for any further jobs."""
+        with self._lock:
+            self._closed = True
+            self.__stop_executor()
+
+    def __stop_when_idle(self) -> None:
+        if self.paused or self._closed:
+            self.__stop_executor()
+        else:
+            self._idle_timer = Timer(self.idle_timeout, self.__stop_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def __stop_if_idle(self) -> None:
+        with self._lock:
+            if self._in_flight == 0:
+                self.__stop_executor()
+
+    def __stop_executor(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self._executor is not None:
+            logger.info("[RenderPool] Stopping render processes")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
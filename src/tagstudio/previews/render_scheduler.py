@@ -0,0 +1,232 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import heapq
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from threading import Condition
+from typing import Any
+
+from tagstudio.core.exceptions import RenderCancelledError
+
+
+class RenderPriority(IntEnum):
+    """The priority classes of render jobs, where lower values are rendered first."""
+
+    PREVIEW = 0
+    VISIBLE = 1
+    PREFETCH = 2
+    BACKGROUND = 3
+
+
+class CancelToken:
+    """A flag that a render job checks between steps to stop early once it's cancelled."""
+
+    __slots__ = ("_cancelled",)
+
+    def __init__(self) -> None:
+        self._cancelled: bool = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def raise_if_cancelled(self) -> None:
+        """Raise a RenderCancelledError if the job has been cancelled."""
+        if self._cancelled:
+            raise RenderCancelledError
+
+
+@dataclass
+class RenderJob:
+    key: Hashable
+    priority: RenderPriority
+    func: Callable[..., Any]
+    token: CancelToken = field(default_factory=CancelToken)
+    seq: int = 0
+
+    def run(self) -> None:
+        """Run the job, passing its token as the cancel_token keyword argument."""
+        self.func(cancel_token=self.token)
+
+
+class RenderScheduler:
+    """A thread-safe priority queue of render jobs, shared by the render threads.
+
+    Jobs are taken highest priority first, and in submission order within a priority class.
+    Submitting a job for a key that is already pending or running doesn't queue it twice, but
+    replaces the function of the pending job, and raises its priority if the new one is more
+    urgent. Cancelling a job sets its token, so a running job can stop between steps, and drops
+    it if it hasn't started yet. A cancelled job keeps running until it's done, even if a new
+    job for its key was submitted and started in the meantime.
+    """
+
+    def __init__(self) -> None:
+        self._condition = Condition()
+        # Entries are (priority, seq, key). Entries whose seq no longer matches the pending job
+        # were reprioritized or cancelled, and are skipped when popped.
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._pending: dict[Hashable, RenderJob] = {}
+        # The running jobs by key. A key can have a cancelled job that is still finishing up
+        # besides the job that replaced it.
+        self._running: dict[Hashable, list[RenderJob]] = {}
+        self._seq = count()
+        self._closed: bool = False
+
+    def __len__(self) -> int:
+        """Return the number of jobs that haven't started yet."""
+        return len(self._pending)
+
+    def has_jobs(self, priorities: Iterable[RenderPriority]) -> bool:
+        """Return whether any jobs in the priority classes are pending or running."""
+        classes = set(priorities)
+        with self._condition:
+            return any(
+                job.priority in classes and not job.token.cancelled
+                for job in (*self._pending.values(), *self.__running_jobs())
+            )
+
+    def submit(
+        self,
+        key: Hashable,
+        priority: RenderPriority,
+        func: Callable[..., Any],
+    ) -> CancelToken:
+        """Queue a job, or update the job already queued for the same key.
+
+        Args:
+            key (Hashable): Identifies the result of the job, e.g. the file and render size.
+            priority (RenderPriority): The priority class of the job.
+            func (Callable): The function to run, e.g. a partial of a render function. It's
+                called with the token of the job as the cancel_token keyword argument.
+
+        Returns:
+            The token of the job that will produce the result.
+        """
+        with self._condition:
+            for job in self._running.get(key, ()):
+                if not job.token.cancelled:
+                    return job.token
+            if (job := self._pending.get(key)) is not None:
+                job.func = func
+                if priority < job.priority:
+                    self.__push(job, priority)
+                return job.token
+
+            job = RenderJob(key, priority, func)
+            self._pending[key] = job
+            self.__push(job, priority)
+            return job.token
+
+    def reprioritize(self, keys: Iterable[Hashable], priority: RenderPriority) -> None:
+        """Move the pending jobs for the keys into another priority class."""
+        with self._condition:
+            for key in keys:
+                if (job := self._pending.get(key)) is not None and job.priority != priority:
+                    self.__push(job, priority)
+
+    def cancel(self, key: Hashable) -> None:
+        """Cancel the pending or running job for a key."""
+        with self._condition:
+            if (job := self._pending.pop(key, None)) is not None:
+                job.token.cancel()
+            for job in self._running.get(key, ()):
+                job.token.cancel()
+
+    def cancel_all(
+        self,
+        priorities: Iterable[RenderPriority] | None = None,
+        keep: Callable[[Hashable], bool] | None = None,
+    ) -> list[Hashable]:
+        """Cancel the pending and running jobs in some or all priority classes.
+
+        Args:
+            priorities (Iterable[RenderPriority] | None): The priority classes to cancel jobs
+                in, or None to cancel jobs in every class.
+            keep (Callable[[Hashable], bool] | None): An optional check for keys of jobs that
+                shouldn't be cancelled.
+
+        Returns:
+            The keys of the cancelled jobs.
+        """
+        classes = set(RenderPriority if priorities is None else priorities)
+        cancelled: list[Hashable] = []
+        with self._condition:
+            for key, job in list(self._pending.items()):
+                if job.priority not in classes or (keep is not None and keep(key)):
+                    continue
+                job.token.cancel()
+                cancelled.append(key)
+                del self._pending[key]
+            for job in self.__running_jobs():
+                if job.priority not in classes or (keep is not None and keep(job.key)):
+                    continue
+                job.token.cancel()
+                cancelled.append(job.key)
+            if not self._pending:
+                self._heap.clear()
+        return cancelled
+
+    def get(self) -> RenderJob | None:
+        """Wait for the next job to run. Returns None once the scheduler is closed."""
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                while self._heap:
+                    _priority, seq, key = heapq.heappop(self._heap)
+                    job = self._pending.get(key)
+                    if job is None or job.seq != seq:
+                        continue
+                    del self._pending[key]
+                    self._running.setdefault(key, []).append(job)
+                    return job
+                self._condition.wait()
+
+    def done(self, job: RenderJob) -> None:
+        """Mark a job taken with get() as finished."""
+        with self._condition:
+            jobs = self._running.get(job.key, [])
+            if any(running is job for running in jobs):
+                jobs[:] = [running for running in jobs if running is not job]
+                if not jobs:
+                    del self._running[job.key]
+                self._condition.notify_all()
+
+    def wait_running(self, timeout: float | None = None) -> bool:
+        """Wait for the running jobs to finish, e.g. after cancelling them.
+
+        Args:
+            timeout (float | None): The maximum number of seconds to wait, or None to wait
+                indefinitely.
+
+        Returns:
+            Whether all running jobs have finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._running, timeout)
+
+    def close(self) -> None:
+        """Cancel every job and wake up all threads waiting for jobs."""
+        with self._condition:
+            self._closed = True
+            for job in (*self._pending.values(), *self.__running_jobs()):
+                job.token.cancel()
+            self._pending.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+    def __running_jobs(self) -> list[RenderJob]:
+        return [job for jobs in self._running.values() for job in jobs]
+
+    def __push(self, job: RenderJob, priority: RenderPriority) -> None:
+        job.priority = priority
+        job.seq = next(self._seq)
+        heapq.heappush(self._heap, (priority, job.seq, job.key))
+        self._condition.notify()
@@ -0,0 +1,403 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from threading import Lock
+
+import structlog
+from PIL import Image
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import (
+    ArchiveCover,
+    AudioWaveform,
+    TextEncoding,
+    VideoProbe,
+)
+from tagstudio.core.media_types import MediaCategories, MediaCategory, MediaType
+from tagstudio.previews.renderers.archive import (
+    apple_embedded_thumb,
+    archive_thumb,
+    cached_archive_cover,
+    krita_thumb,
+    open_doc_thumb,
+    powerpoint_thumb,
+)
+from tagstudio.previews.renderers.audio import (
+    audio_album_thumb,
+    audio_waveform_thumb,
+    cached_audio_waveform,
+)
+from tagstudio.previews.renderers.blender import blender_thumb
+from tagstudio.previews.renderers.clip_studio import clip_studio_thumb
+from tagstudio.previews.renderers.ebook import epub_cover_name, epub_thumb
+from tagstudio.previews.renderers.font import font_full_preview, font_small_thumb
+from tagstudio.previews.renderers.medibang_paint import medibang_paint_thumb
+from tagstudio.previews.renderers.paint_dot_net import paint_dot_net_thumb
+from tagstudio.previews.renderers.pdf import pdf_thumb
+from tagstudio.previews.renderers.raster_image import (
+    exr_image_thumb,
+    raster_image_thumb,
+    raw_image_thumb,
+)
+from tagstudio.previews.renderers.source_engine import vtf_thumb
+from tagstudio.previews.renderers.text import cached_text_encoding, text_thumb
+from tagstudio.previews.renderers.vector_image import vector_image_thumb
+from tagstudio.previews.renderers.video import video_thumb
+from tagstudio.previews.video_tester import cached_video_probe
+from tagstudio.qt.app_settings import Theme
+from tagstudio.qt.views.styles.palette import UiColor
+
+logger = structlog.get_logger(__name__)
+
+# Icon resources for extensions whose media types would pick a less fitting icon.
+ICON_OVERRIDES: dict[str, str] = {
+    ".gif": MediaType.IMAGE,
+    ".vtf": MediaType.IMAGE,
+    ".dll": MediaType.PROGRAM,
+    ".pyc": MediaType.PROGRAM,
+    ".o": MediaType.PROGRAM,
+    ".dylib": MediaType.PROGRAM,
+    ".mscz": MediaType.TEXT,
+}
+
+
+@dataclass(frozen=True)
+class RenderRequest:
+    """The arguments passed to a render function.
+
+    Args:
+        filepath (Path): The path of the file to render.
+        ext (str): The lowercase extension of the file.
+        scaled_size (int): The size to fit the image in, in pixels.
+        dpi_scale (float): The screen pixel ratio.
+        theme (Theme): A theme enum to determine the light/dark theme.
+        probe (object | None): The metadata looked up by the probe of the renderer, if any.
+    """
+
+    filepath: Path
+    ext: str
+    scaled_size: int
+    dpi_scale: float
+    theme: Theme = Theme.DARK
+    probe: object | None = None
+
+
+@dataclass(frozen=True, eq=False)
+class Renderer:
+    """A render function, the file types it handles, and what its images depend on.
+
+    Args:
+        name (str): A unique name for the renderer.
+        render (Callable[[RenderRequest], Image.Image | None]): The render function. Returns None
+            if the file couldn't be rendered.
+        categories (tuple[MediaCategory, ...]): The media categories handled by the renderer.
+        extensions (frozenset[str]): Extra extensions handled by the renderer.
+        mime_fallback (bool): Whether to guess the MIME type of extensions that aren't in any of
+            the categories.
+        savable (bool): Whether the images can be saved to the thumbnail cache.
+        size_dependent (bool): Whether the images are drawn for the requested size, like text or
+            waveforms, rather than decoded from the file and rescaled. Their thumbnails are
+            drawn again instead of scaled up past the largest cached resolution.
+        theme_dependent (bool): Whether the images change with the theme. Savable images of
+            theme-dependent renderers are cached per theme.
+        overlay_color (UiColor | None): A color overlay applied to the rendered images.
+        hashable (bool): Whether a perceptual hash is computed from the rendered images.
+        needs_qt (bool): Whether the renderer uses Qt, and so only runs in the main process.
+        icon (str | None): The icon resource used for the file types, instead of the icon of
+            their media types.
+        probe (Callable[[Library, Path], object | None] | None): Looks up metadata that the
+            render function needs, like stored probe results. It runs in the process that owns
+            the library, and its result must be picklable. As a fallback, it's only looked up
+            once the renderers before it failed.
+        fallback (Renderer | None): A renderer to use when this one doesn't return an image.
+        preview (Renderer | None): A renderer to use for full previews instead of this one.
+    """
+
+    name: str
+    render: Callable[[RenderRequest], Image.Image | None]
+    categories: tuple[MediaCategory, ...] = ()
+    extensions: frozenset[str] = frozenset()
+    mime_fallback: bool = True
+    savable: bool = True
+    size_dependent: bool = False
+    theme_dependent: bool = False
+    overlay_color: UiColor | None = None
+    hashable: bool = False
+    needs_qt: bool = False
+    icon: str | None = None
+    probe: Callable[[Library, Path], object | None] | None = None
+    fallback: Renderer | None = None
+    preview: Renderer | None = None
+
+    def handles(self, ext: str) -> bool:
+        """Return whether the renderer handles files with an extension."""
+        return ext in self.extensions or any(
+            cat.contains(ext, self.mime_fallback) for cat in self.categories
+        )
+
+
+class RendererRegistry:
+    """An ordered collection of renderers, where the first renderer to handle a file type wins.
+
+    The renderer and icon resource for each extension are resolved once and cached, so looking
+    them up doesn't walk the media categories or guess MIME types again.
+    """
+
+    def __init__(self, renderers: Iterable[Renderer] = ()) -> None:
+        self._renderers: list[Renderer] = list(renderers)
+        self._builtin: frozenset[Renderer] = frozenset(self._renderers)
+        self._resolved: dict[str, tuple[Renderer | None, str]] = {}
+        self._lock = Lock()
+
+    def register(self, renderer: Renderer, before: str | None = None) -> None:
+        """Add a renderer, replacing any renderer with the same name.
+
+        Renderers registered at runtime only exist in this process, so their files are never
+        sent to the render pool.
+
+        Args:
+            renderer (Renderer): The renderer to add.
+            before (str | None): The name of a renderer to take precedence over. Renderers are
+                added in front of all others by default.
+        """
+        with self._lock:
+            renderers = [r for r in self._renderers if r.name != renderer.name]
+            names = [r.name for r in renderers]
+            index = names.index(before) if before in names else 0
+            renderers.insert(index, renderer)
+            self._renderers = renderers
+            self._resolved.clear()
+        logger.info("[RendererRegistry] Registered renderer", name=renderer.name)
+
+    def unregister(self, name: str) -> None:
+        """Remove the renderer with a name, if there is one."""
+        with self._lock:
+            self._renderers = [r for r in self._renderers if r.name != name]
+            self._resolved.clear()
+
+    def get(self, ext: str) -> Renderer | None:
+        """Return the renderer for files with an extension, or None if there is none."""
+        return self.__resolve(ext)[0]
+
+    def resource_id(self, ext: str) -> str:
+        """Return the name of the icon resource for files with an extension."""
+        return self.__resolve(ext)[1]
+
+    def is_builtin(self, renderer: Renderer) -> bool:
+        """Return whether a renderer is one of the renderers the registry was created with."""
+        return renderer in self._builtin
+
+    def __resolve(self, ext: str) -> tuple[Renderer | None, str]:
+        resolved = self._resolved.get(ext)
+        if resolved is None:
+            renderers = self._renderers
+            renderer = next((r for r in renderers if r.handles(ext)), None)
+            icon = renderer.icon if renderer is not None and renderer.icon else _media_icon(ext)
+            resolved = (renderer, icon)
+            with self._lock:
+                # Don't cache a result resolved against a registry that changed meanwhile.
+                if renderers is self._renderers:
+                    self._resolved[ext] = resolved
+        return resolved
+
+
+def _media_icon(ext: str) -> str:
+    """Return the name of the icon resource for the media types of an extension."""
+    if (icon := ICON_OVERRIDES.get(ext)) is not None:
+        return icon
+
+    types: set[MediaType] = MediaCategories.get_types(ext, mime_fallback=True)
+
+    # Loop though the specific (non-IANA) categories and return the string
+    # name of the first matching category found.
+    for cat in MediaCategories.ALL_CATEGORIES:
+        if not cat.is_iana and cat.media_type in types:
+            return cat.media_type.value
+
+    # If the type is broader (IANA registered) then search those types.
+    for cat in MediaCategories.ALL_CATEGORIES:
+        if cat.is_iana and cat.media_type in types:
+            return cat.media_type.value
+
+    return "file_generic"
+
+
+# The built-in renderers, in the order they're tried.
+BUILTIN_RENDERERS: list[Renderer] = [
+    Renderer(
+        name="ebook",
+        render=lambda r: epub_thumb(
+            r.filepath, r.ext, r.scaled_size, r.probe if isinstance(r.probe, ArchiveCover) else None
+        ),
+        categories=(MediaCategories.EBOOK_TYPES,),
+        probe=partial(cached_archive_cover, find=epub_cover_name),
+    ),
+    Renderer(
+        name="krita",
+        render=lambda r: krita_thumb(r.filepath),
+        categories=(MediaCategories.KRITA_TYPES,),
+    ),
+    Renderer(
+        name="clip_studio_paint",
+        render=lambda r: clip_studio_thumb(r.filepath),
+        categories=(MediaCategories.CLIP_STUDIO_PAINT_TYPES,),
+        mime_fallback=False,
+    ),
+    Renderer(
+        name="source_engine",
+        render=lambda r: vtf_thumb(r.filepath),
+        categories=(MediaCategories.SOURCE_ENGINE_TYPES,),
+    ),
+    Renderer(
+        name="image_raw",
+        render=lambda r: raw_image_thumb(r.filepath, r.scaled_size),
+        categories=(MediaCategories.IMAGE_RAW_TYPES,),
+        hashable=True,
+    ),
+    Renderer(
+        name="image_vector",
+        render=lambda r: vector_image_thumb(r.filepath, r.scaled_size),
+        categories=(MediaCategories.IMAGE_VECTOR_TYPES,),
+        size_dependent=True,
+        needs_qt=True,
+    ),
+    Renderer(
+        name="image_exr",
+        render=lambda r: exr_image_thumb(r.filepath),
+        extensions=frozenset({".exr"}),
+        hashable=True,
+    ),
+    Renderer(
+        name="image",
+        render=lambda r: raster_image_thumb(r.filepath, r.scaled_size),
+        categories=(MediaCategories.IMAGE_TYPES,),
+        hashable=True,
+    ),
+    Renderer(
+        name="video",
+        render=lambda r: video_thumb(
+            r.filepath, r.scaled_size, r.probe if isinstance(r.probe, VideoProbe) else None
+        ),
+        categories=(MediaCategories.VIDEO_TYPES,),
+        probe=cached_video_probe,
+    ),
+    Renderer(
+        name="powerpoint",
+        render=lambda r: powerpoint_thumb(r.filepath),
+        extensions=frozenset({".pptx"}),
+    ),
+    Renderer(
+        name="open_document",
+        render=lambda r: open_doc_thumb(r.filepath),
+        categories=(MediaCategories.OPEN_DOCUMENT_TYPES,),
+    ),
+    Renderer(
+        name="apple_embedded",
+        render=lambda r: apple_embedded_thumb(r.filepath),
+        categories=(MediaCategories.IWORK_TYPES,),
+        extensions=frozenset({".pxd"}),
+        mime_fallback=False,
+    ),
+    Renderer(
+        name="plaintext",
+        render=lambda r: text_thumb(
+            r.filepath, r.probe if isinstance(r.probe, TextEncoding) else None
+        ),
+        categories=(MediaCategories.PLAINTEXT_TYPES,),
+        theme_dependent=True,
+        needs_qt=True,
+        probe=cached_text_encoding,
+    ),
+    Renderer(
+        name="font",
+        # Short (Aa) Preview
+        render=lambda r: font_small_thumb(r.filepath, r.scaled_size),
+        categories=(MediaCategories.FONT_TYPES,),
+        size_dependent=True,
+        theme_dependent=True,
+        overlay_color=UiColor.BLUE,
+        needs_qt=True,
+        # Large (Full Alphabet) Preview
+        preview=Renderer(
+            name="font_preview",
+            render=lambda r: font_full_preview(r.filepath, r.scaled_size),
+            size_dependent=True,
+            needs_qt=True,
+        ),
+    ),
+    Renderer(
+        name="audio",
+        render=lambda r: audio_album_thumb(r.filepath, r.ext),
+        categories=(MediaCategories.AUDIO_TYPES,),
+        fallback=Renderer(
+            name="audio_waveform",
+            render=lambda r: audio_waveform_thumb(
+                r.filepath,
+                r.ext,
+                r.scaled_size,
+                r.dpi_scale,
+                r.probe if isinstance(r.probe, AudioWaveform) else None,
+            ),
+            savable=False,
+            size_dependent=True,
+            theme_dependent=True,
+            overlay_color=UiColor.GREEN,
+            probe=cached_audio_waveform,
+        ),
+    ),
+    Renderer(
+        name="blender",
+        render=lambda r: blender_thumb(r.filepath),
+        categories=(MediaCategories.BLENDER_TYPES,),
+        needs_qt=True,
+    ),
+    Renderer(
+        name="pdf",
+        render=lambda r: pdf_thumb(r.filepath, r.scaled_size, r.ext),
+        categories=(MediaCategories.PDF_TYPES,),
+        size_dependent=True,
+        needs_qt=True,
+    ),
+    Renderer(
+        name="archive",
+        render=lambda r: archive_thumb(
+            r.filepath,
+            ext=r.ext,
+            size=r.scaled_size,
+            cover=r.probe if isinstance(r.probe, ArchiveCover) else None,
+        ),
+        categories=(MediaCategories.ARCHIVE_TYPES,),
+        probe=cached_archive_cover,
+        mime_fallback=False,
+    ),
+    Renderer(
+        name="medibang_paint",
+        render=lambda r: medibang_paint_thumb(r.filepath),
+        categories=(MediaCategories.MDIPACK_TYPES,),
+        mime_fallback=False,
+    ),
+    Renderer(
+        name="paint_dot_net",
+        render=lambda r: paint_dot_net_thumb(r.filepath),
+        categories=(MediaCategories.PAINT_DOT_NET_TYPES,),
+        mime_fallback=False,
+    ),
+]
+
+renderers = RendererRegistry(BUILTIN_RENDERERS)
+
+
+def register_renderer(renderer: Renderer, before: str | None = None) -> None:
+    """Add a renderer to the shared registry used by the file renderers.
+
+    Args:
+        renderer (Renderer): The renderer to add.
+        before (str | None): The name of a renderer to take precedence over. Renderers are
+            added in front of all others by default.
+    """
+    renderers.register(renderer, before)
@@ -4,6 +4,7 @@
 
 import tarfile
 import zipfile
+from collections.abc import Callable, Iterable, Iterator
 from io import BytesIO
 from pathlib import Path
 from typing import Literal
@@ -14,6 +15,8 @@ import rarfile
 import structlog
 from PIL import Image
 
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import ArchiveCover
 from tagstudio.core.media_types import MediaCategories
 from tagstudio.core.utils.types import unwrap
 from tagstudio.previews.renderers.raster_image import image_from_bytes
@@ -28,18 +31,27 @@ class SevenZipFile(py7zr.SevenZipFile):
 
     def __init__(self, filepath: Path, mode: Literal["r"]) -> None:
         super().__init__(filepath, mode)
+        self._extracted: bool = False
 
     def read(self, name: str) -> bytes:
         # SevenZipFile must be reset after every extraction
         # See https://py7zr.readthedocs.io/en/stable/api.html#py7zr.SevenZipFile.extract
-        self.reset()
+        if self._extracted:
+            self.reset()
+        self._extracted = True
+        # NOTE: Only the members before the target in its solid block are decompressed, and
+        # nothing after it.
         factory = py7zr.io.BytesIOFactory(limit=10485760)  # 10 MiB
         self.extract(targets=[name], factory=factory)
         return factory.get(name).read()
 
 
 class TarFile:
-    """Wrapper around tarfile.TarFile to mimic zipfile.ZipFile's API."""
+    """Wrapper around tarfile.TarFile to mimic zipfile.ZipFile's API.
+
+    Tar archives have no index, so members are read lazily up to the one that's needed, instead
+    of scanning (and for compressed archives, decompressing) the whole archive.
+    """
 
     def __init__(self, filepath: Path, mode: Literal["r"]) -> None:
         self.tar: tarfile.TarFile
@@ -49,8 +61,16 @@ class TarFile:
     def namelist(self) -> list[str]:
         return self.tar.getnames()
 
+    def iter_names(self) -> Iterator[str]:
+        """Yield the names of the members, reading the archive only as far as needed."""
+        for member in self.tar:
+            yield member.name
+
     def read(self, name: str) -> bytes:
-        return unwrap(self.tar.extractfile(name)).read()
+        member = next((m for m in self.tar if m.name == name), None)
+        if member is None:
+            raise KeyError(name)
+        return unwrap(self.tar.extractfile(member)).read()
 
     def __enter__(self) -> TarFile:
         self.tar = tarfile.open(name=self.filepath, mode=self.mode).__enter__()
@@ -80,28 +100,97 @@ def open_archive(filepath: Path, ext: str = "") -> Archive:
     return archiver(filepath, "r")
 
 
-def first_image_in_archive(archive: Archive) -> Image.Image | None:
-    """Find and extract the first renderable image in the archive.
+def first_image_name(archive: Archive) -> str | None:
+    """Return the name of the first renderable image in the archive, if any.
 
     Args:
         archive (Archive): The current archive.
+    """
+    names: Iterable[str] = (
+        archive.iter_names() if isinstance(archive, TarFile) else archive.namelist()  # pyright: ignore[reportUnknownMemberType]
+    )
+    for file_name in names:
+        if MediaCategories.IMAGE_RASTER_TYPES.contains(Path(file_name).suffix):
+            return file_name
+    return None
 
-    Returns:
-        Image: The first renderable image in the archive.
+
+def find_cover(archive: Archive, image_names: list[Path] | list[str] | None = None) -> str | None:
+    """Return the name of the member to use as the cover of an archive.
+
+    Args:
+        archive (Archive): The current archive.
+        image_names: (list[Path] | list[str] | None): List of embedded image names to search
+            for, in order of preference. Defaults to the first image in the archive.
     """
-    for file_name in archive.namelist():  # pyright: ignore[reportUnknownVariableType]
-        ext = Path(file_name).suffix
-        if MediaCategories.IMAGE_RASTER_TYPES.contains(ext):
-            image_data = archive.read(file_name)  # pyright: ignore[reportUnknownVariableType]
-            return image_from_bytes(BytesIO(image_data))
+    if not image_names:
+        return first_image_name(archive)
 
+    names = set(archive.namelist())  # pyright: ignore[reportUnknownArgumentType]
+    for image_name in image_names:
+        if str(image_name) in names:
+            return str(image_name)
     return None
 
 
+def read_cover(
+    filepath: Path, member: str, ext: str = "", size: int | None = None
+) -> Image.Image | None:
+    """Extract and render a known member of an archive, without listing the archive.
+
+    Args:
+        filepath (Path): The path to the archive.
+        member (str): The name of the member to render.
+        ext (str): The file extension. Used to help determine more specific archive type.
+        size (int | None): The size of the square the image has to fit in, if any.
+    """
+    try:
+        with open_archive(filepath, ext) as archive:
+            return image_from_bytes(BytesIO(archive.read(member)), size)  # pyright: ignore[reportUnknownArgumentType]
+    except Exception as e:
+        logger.error("Couldn't render thumbnail", filepath=filepath, error=type(e).__name__)
+        return None
+
+
+def cached_archive_cover(
+    library: Library, filepath: Path, find: Callable[[Archive], str | None] = find_cover
+) -> ArchiveCover | None:
+    """Return the stored cover of an archive, finding and storing it if needed.
+
+    Files outside of the library, or that aren't entries, are searched every time.
+
+    Args:
+        library (Library): The library to store the cover in.
+        filepath (Path): The absolute path of the archive.
+        find (Callable[[Archive], str | None]): Returns the name of the cover in an archive.
+
+    Returns:
+        The cover, or None if the archive couldn't be read.
+    """
+    try:
+        path: Path | None = filepath.relative_to(unwrap(library.library_dir))
+    except TypeError, ValueError:
+        path = None
+
+    if path is not None and (cover := library.get_archive_cover(path)) is not None:
+        return cover
+    try:
+        with open_archive(filepath, filepath.suffix.lower()) as archive:
+            cover = ArchiveCover(find(archive))
+    except Exception as e:
+        logger.error("Couldn't read archive", filepath=filepath, error=type(e).__name__)
+        return None
+    if path is not None:
+        library.save_archive_cover(path, cover)
+    return cover
+
+
 def archive_thumb(
     filepath: Path,
     image_names: list[Path] | list[str] | None = None,
     ext: str = "",
+    size: int | None = None,
+    cover: ArchiveCover | None = None,
 ) -> Image.Image | None:
     """Extract an embedded preview image from an archive.
 
@@ -109,24 +198,23 @@ def archive_thumb(
         filepath (Path): The path to the archive.
         image_names: (list[Path] | list[str] | None): List of embedded image names to search for.
         ext (str): The file extension. Used to help determine more specific archive type.
+        size (int | None): The size of the square the image has to fit in, if any. Used to
+            decode the image at a reduced resolution.
+        cover (ArchiveCover | None): The stored cover of the archive. The archive is searched
+            for the cover if it isn't given.
 
     Returns:
         Image: The first image found in the archive.
     """
+    if cover is not None:
+        return read_cover(filepath, cover.member, ext, size) if cover.member else None
+
     try:
         with open_archive(filepath, ext) as archive:
-            # If no list of image names to search for was provided, default to the first image.
-            if not image_names:
-                return first_image_in_archive(archive)
-
-            for image_name in image_names:
-                if image_name in archive.namelist():
-                    file_data = archive.read(str(image_name))  # pyright: ignore[reportUnknownVariableType]
-                    return image_from_bytes(BytesIO(file_data))
-
-            # If no images were found with the given names, fallback to the first image found.
-            if not image_names:
-                return first_image_in_archive(archive)
+            if (member := find_cover(archive, image_names)) is None:
+                return None
+            file_data = archive.read(member)  # pyright: ignore[reportUnknownVariableType]
+            return image_from_bytes(BytesIO(file_data), size)  # pyright: ignore[reportUnknownArgumentType]
 
     except Exception as e:
         logger.error("Couldn't render thumbnail", filepath=filepath, error=type(e).__name__)
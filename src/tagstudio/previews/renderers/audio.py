@@ -2,10 +2,13 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import contextlib
 import math
+import subprocess
+import wave
+from collections.abc import Iterator
 from io import BytesIO
 from pathlib import Path
-from warnings import catch_warnings
 
 import numpy as np
 import structlog
@@ -13,12 +16,23 @@ from mutagen import flac, id3, mp4
 from mutagen._util import MutagenError
 from PIL import Image, ImageDraw
 
-from tagstudio.previews.vendored.pydub.audio_segment import (
-    _AudioSegment as AudioSegment,  # pyright: ignore[reportPrivateUsage]
-)
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import AudioWaveform
+from tagstudio.core.utils.ffmpeg_status import FfmpegStatus
+from tagstudio.core.utils.silent_subprocess import silent_popen
+from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger(__name__)
 
+# The number of peak levels stored per file, enough for the widest waveform.
+PEAK_COUNT: int = 256
+PEAK_DTYPE = np.dtype("<u2")
+# Audio is reduced to one peak per block as it's decoded, with blocks this many per second.
+BLOCKS_PER_SECOND: int = 100
+# The number of blocks decoded at a time.
+CHUNK_BLOCKS: int = 512
+DECODE_SAMPLE_RATE: int = 8000
+
 
 def audio_album_thumb(filepath: Path, ext: str) -> Image.Image | None:
     """Return an album cover thumb from an audio file if a cover is present.
@@ -62,7 +76,11 @@ def audio_album_thumb(filepath: Path, ext: str) -> Image.Image | None:
 
 
 def audio_waveform_thumb(
-    filepath: Path, ext: str, size: int, pixel_ratio: float
+    filepath: Path,
+    ext: str,
+    size: int,
+    pixel_ratio: float,
+    waveform: AudioWaveform | None = None,
 ) -> Image.Image | None:
     """Render a waveform image from an audio file.
 
@@ -71,59 +89,42 @@ def audio_waveform_thumb(
         ext (str): The file extension (with leading ".").
         size (tuple[int,int]): The size of the thumbnail.
         pixel_ratio (float): The screen pixel ratio.
+        waveform (AudioWaveform | None): The stored peaks of the file. The file is decoded if
+            they aren't given.
     """
     # BASE_SCALE used for drawing on a larger image and resampling down
     # to provide an antialiased effect.
     base_scale: int = 2
-    samples_per_bar: int = 3
     size_scaled: int = size * base_scale
     allow_small_min: bool = False
     im: Image.Image | None = None
 
     try:
+        peaks = (
+            np.frombuffer(waveform.peaks, dtype=PEAK_DTYPE)
+            if waveform is not None
+            else audio_peaks(filepath, ext)
+        )
+        if peaks is None or len(peaks) == 0:
+            return None
         bar_count: int = min(math.floor((size // pixel_ratio) / 5), 64)
-        audio = AudioSegment.from_file(filepath, ext[1:])  # pyright: ignore[reportUnknownVariableType]
-        data = np.frombuffer(buffer=audio._data, dtype=np.int16)
-        data_indices = np.linspace(1, len(data), num=bar_count * samples_per_bar)
+        bar_peaks = _reduce_peaks(peaks, bar_count)
         bar_margin: float = ((size_scaled / (bar_count * 3)) * base_scale) / 2
         line_width: float = ((size_scaled - bar_margin) / (bar_count * 3)) * base_scale
         bar_height: float = (size_scaled) - (size_scaled // bar_margin)
 
-        count: int = 0
-        maximum_item: int = 0
-        max_array: list[int] = []
-        highest_line: int = 0
-
-        for i in range(-1, len(data_indices)):
-            d = data[math.ceil(data_indices[i]) - 1]
-            if count < samples_per_bar:
-                count = count + 1
-                with catch_warnings(record=True):
-                    if abs(d) > maximum_item:
-                        maximum_item = int(abs(d))
-            else:
-                max_array.append(maximum_item)
-
-                if maximum_item > highest_line:
-                    highest_line = maximum_item
-
-                maximum_item = 0
-                count = 1
-
-        line_ratio = max(highest_line / bar_height, 1)
+        line_ratio = max(int(bar_peaks.max(initial=0)) / bar_height, 1)
+        item_heights = bar_peaks / line_ratio
+        # If small minimums are not allowed, raise all values
+        # smaller than the line width to the same value.
+        if not allow_small_min:
+            item_heights = np.maximum(item_heights, line_width)
 
         im = Image.new("RGB", (size_scaled, size_scaled), color="#000000")
         draw = ImageDraw.Draw(im)
 
         current_x = bar_margin
-        for item in max_array:
-            item_height = item / line_ratio
-
-            # If small minimums are not allowed, raise all values
-            # smaller than the line width to the same value.
-            if not allow_small_min:
-                item_height = max(item_height, line_width)
-
+        for item_height in item_heights.tolist():
             current_y = (bar_height - item_height + (size_scaled // bar_margin)) // 2
 
             draw.rounded_rectangle(
@@ -141,9 +142,141 @@ def audio_waveform_thumb(
 
             current_x = current_x + line_width + bar_margin
 
-        im.resize((size, size), Image.Resampling.BILINEAR)
+        im = im.resize((size, size), Image.Resampling.BILINEAR)
 
     except Exception as e:
         logger.error("Couldn't render waveform", path=filepath.name, error=type(e).__name__)
 
     return im
+
+
+def audio_peaks(filepath: Path, ext: str) -> np.ndarray | None:
+    """Decode an audio file and return the peak levels of evenly sized spans of it.
+
+    The audio is streamed in small chunks and reduced to one peak per 10 ms block as it's
+    decoded, so memory use doesn't depend on the length or sample rate of the track. WAV files
+    are read directly, while other formats are decoded by FFmpeg to mono PCM at a low sample
+    rate.
+
+    Args:
+        filepath (Path): The path of the file.
+        ext (str): The file extension (with leading ".").
+
+    Returns:
+        PEAK_COUNT absolute 16-bit peak levels, no levels if the file has no audio, or None if
+        FFmpeg isn't available to decode it.
+
+    Raises:
+        ChildProcessError: If FFmpeg couldn't decode the file.
+    """
+    blocks: list[np.ndarray] | None = None
+    if ext == ".wav":
+        with contextlib.suppress(wave.Error, EOFError):
+            blocks = list(_wav_block_peaks(filepath))
+    if blocks is None:
+        blocks = _ffmpeg_block_peaks(filepath)
+    if blocks is None:
+        return None
+    if not blocks:
+        return np.empty(0, dtype=PEAK_DTYPE)
+    return _reduce_peaks(np.concatenate(blocks), PEAK_COUNT)
+
+
+def cached_audio_waveform(library: Library, filepath: Path) -> AudioWaveform | None:
+    """Return the stored peaks of an audio file, decoding it and storing them if needed.
+
+    Files outside of the library, or that aren't entries, are decoded every time. Files that
+    can't be decoded are stored without peaks, so they aren't decoded again until they change.
+
+    Args:
+        library (Library): The library to store the peaks in.
+        filepath (Path): The absolute path of the audio file.
+
+    Returns:
+        The peaks, or None if FFmpeg isn't available to decode the file.
+    """
+    try:
+        path: Path | None = filepath.relative_to(unwrap(library.library_dir))
+    except TypeError, ValueError:
+        path = None
+
+    if path is not None and (waveform := library.get_audio_waveform(path)) is not None:
+        return waveform
+    try:
+        peaks = audio_peaks(filepath, filepath.suffix.lower())
+    except (ChildProcessError, OSError, ValueError) as e:
+        logger.error("Couldn't decode audio", path=filepath.name, error=type(e).__name__)
+        peaks = np.empty(0, dtype=PEAK_DTYPE)
+    if peaks is None:
+        return None
+    waveform = AudioWaveform(peaks.astype(PEAK_DTYPE).tobytes())
+    if path is not None:
+        library.save_audio_waveform(path, waveform)
+    return waveform
+
+
+def _reduce_peaks(peaks: np.ndarray, count: int) -> np.ndarray:
+    """Reduce peak levels to the maximum of each of count evenly sized spans."""
+    starts = np.linspace(0, len(peaks), num=count, endpoint=False).astype(np.intp)
+    return np.maximum.reduceat(peaks, starts)
+
+
+def _block_peaks(samples: np.ndarray, block_size: int) -> np.ndarray:
+    """Return the absolute peak of each block of block_size samples, as 16-bit levels."""
+    blocks = len(samples) // block_size
+    if blocks * block_size < len(samples):
+        samples = np.pad(samples, (0, blocks * block_size + block_size - len(samples)))
+        blocks += 1
+    samples = samples.reshape(blocks, block_size)
+    # Negating -32768 doesn't fit in 16 bits, so the minima are widened first.
+    peaks = np.maximum(samples.max(axis=1), -samples.min(axis=1).astype(np.int32))
+    return np.minimum(peaks, 32767).astype(PEAK_DTYPE)
+
+
+def _wav_block_peaks(filepath: Path) -> Iterator[np.ndarray]:
+    with wave.open(str(filepath), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        block_size = max(rate // BLOCKS_PER_SECOND, 1) * channels
+        chunk_frames = max(rate // BLOCKS_PER_SECOND, 1) * CHUNK_BLOCKS
+        while data := wav.readframes(chunk_frames):
+            yield _block_peaks(_pcm_to_int16(data, width), block_size)
+
+
+def _ffmpeg_block_peaks(filepath: Path) -> list[np.ndarray] | None:
+    ffmpeg_cmd = FfmpegStatus.which()
+    if not ffmpeg_cmd:
+        return None
+
+    # Decode to mono 16-bit PCM at a low sample rate, which is plenty for peak levels.
+    args = [ffmpeg_cmd, "-v", "error", "-i", str(filepath), "-vn", "-ac", "1"]
+    args += ["-ar", str(DECODE_SAMPLE_RATE), "-f", "s16le", "-"]
+    block_size = DECODE_SAMPLE_RATE // BLOCKS_PER_SECOND
+    chunk_bytes = block_size * CHUNK_BLOCKS * 2
+
+    blocks: list[np.ndarray] = []
+    p = silent_popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    with p:
+        assert p.stdout is not None
+        while data := p.stdout.read(chunk_bytes):
+            if len(data) % 2:
+                data = data[:-1]
+            blocks.append(_block_peaks(np.frombuffer(data, dtype="<i2"), block_size))
+    if p.returncode != 0:
+        raise ChildProcessError(f"FFmpeg returned error code {p.returncode}")
+    return blocks
+
+
+def _pcm_to_int16(data: bytes, width: int) -> np.ndarray:
+    """Convert little-endian PCM samples of any width to 16-bit samples."""
+    if width == 1:
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.int16) - 128) << 8
+    if width == 2:
+        return np.frombuffer(data, dtype="<i2")
+    if width == 3:
+        # Keep the two most significant bytes of each sample.
+        return np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)[:, 1:].copy().view("<i2")[:, 0]
+    if width == 4:
+        return (np.frombuffer(data, dtype="<i4") >> 16).astype(np.int16)
+    raise wave.Error(f"Unsupported sample width: {width}")
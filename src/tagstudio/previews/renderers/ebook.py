@@ -10,46 +10,70 @@ from xml.etree.ElementTree import Element
 import structlog
 from PIL import Image
 
+from tagstudio.core.library.alchemy.models import ArchiveCover
 from tagstudio.core.media_types import MediaCategories
 from tagstudio.core.utils.types import unwrap
-from tagstudio.previews.renderers.archive import Archive, first_image_in_archive, open_archive
+from tagstudio.previews.renderers.archive import (
+    Archive,
+    first_image_name,
+    open_archive,
+    read_cover,
+)
 from tagstudio.previews.renderers.raster_image import image_from_bytes
 
 logger = structlog.get_logger(__name__)
 
 
-def epub_thumb(filepath: Path, ext: str) -> Image.Image | None:
+def epub_thumb(
+    filepath: Path, ext: str, size: int | None = None, cover: ArchiveCover | None = None
+) -> Image.Image | None:
     """Extracts the cover specified by ComicInfo.xml or first image found in the ePub file.
 
     Args:
         filepath (Path): The path to the ePub file.
         ext (str): The file extension.
+        size (int | None): The size of the square the cover has to fit in, if any. Used to
+            decode the cover at a reduced resolution.
+        cover (ArchiveCover | None): The stored cover of the file. The file is searched for the
+            cover if it isn't given.
 
     Returns:
         Image: The cover specified in ComicInfo.xml,
         the first image found in the ePub file, or None by default.
     """
+    if cover is not None:
+        return read_cover(filepath, cover.member, ext, size) if cover.member else None
+
     im: Image.Image | None = None
     try:
         with open_archive(filepath, ext) as archive:
-            if "ComicInfo.xml" in archive.namelist():
-                comic_info = ET.fromstring(archive.read("ComicInfo.xml"))
-                im = _cover_from_comic_info(archive, comic_info, "FrontCover")
-                if not im:
-                    im = _cover_from_comic_info(archive, comic_info, "InnerCover")
-
-            if not im:
-                im = first_image_in_archive(archive)
+            if (page_name := epub_cover_name(archive)) is not None:
+                image_data = archive.read(page_name)  # pyright: ignore[reportUnknownVariableType]
+                im = image_from_bytes(BytesIO(image_data), size)  # pyright: ignore[reportUnknownArgumentType]
     except Exception as e:
         logger.error("Couldn't render thumbnail", filepath=filepath, error=type(e).__name__)
 
     return im
 
 
-def _cover_from_comic_info(
-    archive: Archive, comic_info: Element, cover_type: str
-) -> Image.Image | None:
-    """Extract the cover specified in ComicInfo.xml.
+def epub_cover_name(archive: Archive) -> str | None:
+    """Return the name of the cover specified by ComicInfo.xml, or else the first image.
+
+    Args:
+        archive (Archive): The current ePub file.
+    """
+    page_name: str | None = None
+    if "ComicInfo.xml" in archive.namelist():
+        comic_info = ET.fromstring(archive.read("ComicInfo.xml"))
+        page_name = _cover_from_comic_info(archive, comic_info, "FrontCover")
+        if not page_name:
+            page_name = _cover_from_comic_info(archive, comic_info, "InnerCover")
+
+    return page_name or first_image_name(archive)
+
+
+def _cover_from_comic_info(archive: Archive, comic_info: Element, cover_type: str) -> str | None:
+    """Find the cover specified in ComicInfo.xml.
 
     Args:
         archive (Archive): The current ePub file.
@@ -57,17 +81,14 @@ def _cover_from_comic_info(
         cover_type (str): The type of cover to load.
 
     Returns:
-        Image: The cover specified in ComicInfo.xml.
+        The name of the cover specified in ComicInfo.xml, if it's a renderable image.
     """
-    im: Image.Image | None = None
-
     cover = comic_info.find(f"./*Page[@Type='{cover_type}']")
     if cover is not None:
         pages = [f for f in archive.namelist() if f != "ComicInfo.xml"]  # pyright: ignore[reportUnknownVariableType]
         page_name = pages[int(unwrap(cover.get("Image")))]  # pyright: ignore[reportUnknownVariableType]
         ext = Path(page_name).suffix
         if MediaCategories.IMAGE_RASTER_TYPES.contains(ext):
-            image_data = archive.read(page_name)  # pyright: ignore[reportUnknownVariableType]
-            im = image_from_bytes(BytesIO(image_data))
+            return page_name
 
-    return im
+    return None
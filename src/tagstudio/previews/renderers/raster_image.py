@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import math
 import os
 from io import BytesIO
 from pathlib import Path
@@ -10,14 +11,19 @@ import cv2
 import numpy as np
 import rawpy
 import structlog
-from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
 from PIL.Image import DecompressionBombError
+from PIL.Jpeg2KImagePlugin import Jpeg2KImageFile
 from pillow_heif import register_heif_opener  # pyright: ignore[reportUnknownVariableType]
 from rawpy import (
     LibRawFileUnsupportedError,  # pyright: ignore[reportPrivateImportUsage]
     LibRawIOError,  # pyright: ignore[reportPrivateImportUsage]
+    LibRawNoThumbnailError,  # pyright: ignore[reportPrivateImportUsage]
+    LibRawUnsupportedThumbnailError,  # pyright: ignore[reportPrivateImportUsage]
+    ThumbFormat,  # pyright: ignore[reportPrivateImportUsage]
 )
 
+from tagstudio.core.utils.image_hash import flatten_image
 from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger(__name__)
@@ -30,17 +36,50 @@ except ImportError as e:
 register_heif_opener()
 os.environ["OPENCV_IO_ENABLE_OPENEXR"] = "1"
 
+# The transpositions that undo each EXIF orientation.
+ORIENTATION_TRANSPOSE: dict[int, Image.Transpose] = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
 
-def raster_image_thumb(filepath: Path) -> Image.Image | None:
+# The EXIF orientations matching the "flip" values of LibRaw.
+RAW_FLIP_ORIENTATION: dict[int, int] = {3: 3, 5: 8, 6: 6}
+
+# How far the aspect ratio of an embedded preview may be off from the image before the preview
+# is assumed to be letterboxed, and isn't used.
+MAX_PREVIEW_ASPECT_ERROR: float = 0.02
+
+
+def raster_image_thumb(filepath: Path, size: int | None = None) -> Image.Image | None:
     """Render a thumbnail for a standard image type.
 
+    The file is read by the decoder directly instead of being copied into memory first. The
+    thumbnail embedded in the EXIF data is used instead when it covers the size.
+
     Args:
         filepath (Path): The path of the file.
+        size (int | None): The size the thumbnail will be fit in. JPEG and JPEG 2000 images are
+            decoded at the smallest scale that still covers it. None decodes at full size.
     """
     im: Image.Image | None = None
     try:
-        with filepath.open("rb") as file:
-            im = image_from_bytes(BytesIO(file.read()))
+        with Image.open(filepath) as file_im:
+            if size is not None and (im := exif_thumb(file_im, size)) is not None:
+                return im
+            is_reduced = size is not None and isinstance(file_im, Jpeg2KImageFile)
+            try:
+                im = image_from_file(file_im, size)
+            except OSError:
+                if not is_reduced:
+                    raise
+                # Some JPEG 2000 files have fewer resolution levels than the reduction needs.
+                with Image.open(filepath) as full_im:
+                    im = image_from_file(full_im)
     except (
         FileNotFoundError,
         UnidentifiedImageError,
@@ -82,16 +121,27 @@ def exr_image_thumb(filepath: Path) -> Image.Image | None:
     return im
 
 
-def raw_image_thumb(filepath: Path) -> Image.Image | None:
+def raw_image_thumb(filepath: Path, size: int | None = None) -> Image.Image | None:
     """Render a thumbnail for a RAW image type.
 
+    The preview embedded by the camera is used when it covers the size, and the sensor data is
+    only demosaiced when it doesn't.
+
     Args:
         filepath (Path): The path of the file.
+        size (int | None): The size the thumbnail will be fit in. The sensor data is demosaiced
+            at half size when that still covers it. None decodes at full size.
     """
     im: Image.Image | None = None
     try:
         with rawpy.imread(str(filepath)) as raw:
-            rgb = raw.postprocess(use_camera_wb=True)
+            if size is not None and (im := raw_embedded_thumb(raw, size)) is not None:
+                return im
+            half_size = False
+            if size is not None:
+                box = fit_size((raw.sizes.width, raw.sizes.height), size)
+                half_size = raw.sizes.width // 2 >= box[0] and raw.sizes.height // 2 >= box[1]
+            rgb = raw.postprocess(use_camera_wb=True, half_size=half_size)
             im = Image.frombytes(
                 "RGB",
                 (rgb.shape[1], rgb.shape[0]),
@@ -107,20 +157,149 @@ def raw_image_thumb(filepath: Path) -> Image.Image | None:
     return im
 
 
-def image_from_bytes(image_data: BytesIO) -> Image.Image:
+def raw_image_size(filepath: Path) -> tuple[int, int] | None:
+    """Return the width and height of a RAW image, read from its metadata.
+
+    Args:
+        filepath (Path): The path of the file.
+    """
+    try:
+        with rawpy.imread(str(filepath)) as raw:
+            width, height = raw.sizes.width, raw.sizes.height
+            if raw.sizes.flip in (5, 6):
+                width, height = height, width
+            return width, height
+    except FileNotFoundError, LibRawIOError, LibRawFileUnsupportedError:
+        return None
+
+
+def raw_embedded_thumb(raw: rawpy.RawPy, size: int) -> Image.Image | None:
+    """Return the preview embedded in a RAW image if it covers the size.
+
+    Args:
+        raw (rawpy.RawPy): The opened RAW image.
+        size (int): The size the thumbnail will be fit in.
+    """
+    try:
+        thumb = raw.extract_thumb()
+    except LibRawNoThumbnailError, LibRawUnsupportedThumbnailError:
+        return None
+
+    try:
+        if thumb.format == ThumbFormat.JPEG:
+            im = Image.open(BytesIO(thumb.data))  # pyright: ignore[reportArgumentType]
+        else:
+            im = Image.fromarray(thumb.data)  # pyright: ignore[reportArgumentType]
+        if max(im.size) < size or not _same_aspect(im.size, (raw.sizes.width, raw.sizes.height)):
+            return None
+        # Previews that carry their own orientation are rotated when they're decoded.
+        orientation = im.getexif().get(ExifTags.Base.Orientation, 1)
+        im = image_from_file(im, size)
+        if orientation == 1:
+            im = _apply_orientation(im, RAW_FLIP_ORIENTATION.get(raw.sizes.flip, 1))
+    except (OSError, ValueError, DecompressionBombError) as e:
+        logger.warning("Couldn't read embedded RAW preview", error=type(e).__name__)
+        return None
+    return im
+
+
+def exif_thumb(im: Image.Image, size: int) -> Image.Image | None:
+    """Return the thumbnail stored in the EXIF data (IFD1) of an image if it covers the size.
+
+    Args:
+        im (Image.Image): The opened image, not loaded yet.
+        size (int): The size the thumbnail will be fit in.
+    """
+    exif_data = im.info.get("exif")
+    if not isinstance(exif_data, bytes):
+        return None
+    exif_data = exif_data.removeprefix(b"Exif\x00\x00")
+
+    try:
+        exif = Image.Exif()
+        exif.load(exif_data)
+        ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(ExifTags.Base.JpegIFOffset)
+        length = ifd1.get(ExifTags.Base.JpegIFByteCount)
+        if not offset or not length:
+            return None
+        thumb = Image.open(BytesIO(exif_data[offset : offset + length]))
+        if max(thumb.size) < size or not _same_aspect(thumb.size, im.size):
+            return None
+        thumb = image_from_file(thumb, size)
+    except (OSError, SyntaxError, ValueError, DecompressionBombError) as e:
+        logger.warning("Couldn't read EXIF thumbnail", error=type(e).__name__)
+        return None
+    return _apply_orientation(thumb, exif.get(ExifTags.Base.Orientation, 1))
+
+
+def _same_aspect(size_a: tuple[int, int], size_b: tuple[int, int]) -> bool:
+    """Return whether two sizes have the same aspect ratio, in either orientation."""
+    aspect_a = max(size_a) / max(1, min(size_a))
+    aspect_b = max(size_b) / max(1, min(size_b))
+    return abs(aspect_a - aspect_b) <= aspect_b * MAX_PREVIEW_ASPECT_ERROR
+
+
+def _apply_orientation(im: Image.Image, orientation: int) -> Image.Image:
+    """Rotate and flip an image to undo an EXIF orientation."""
+    transpose = ORIENTATION_TRANSPOSE.get(orientation)
+    return im if transpose is None else im.transpose(transpose)
+
+
+def image_from_bytes(image_data: BytesIO, size: int | None = None) -> Image.Image:
     """Load a raster image and add a background if it's transparent.
 
     Args:
         image_data (BytesIO): The binary image data.
+        size (int | None): The size the image will be fit in, used to decode at a reduced scale.
+
+    Returns:
+        Image.Image: The loaded raster image, with a background if needed.
+    """
+    return image_from_file(Image.open(image_data), size)
+
+
+def image_from_file(im: Image.Image, size: int | None = None) -> Image.Image:
+    """Decode an opened raster image and add a background if it's transparent.
+
+    When a size is given, the image is decoded at the smallest scale that still covers it:
+    JPEGs use the DCT scaling of the decoder (draft) and JPEG 2000 images skip resolution
+    levels (reduce). Other formats are decoded in full and then shrunk by an integer factor, so
+    the mode conversion, background and EXIF rotation don't work on the full-size image.
+
+    Args:
+        im (Image.Image): The opened image, not loaded yet.
+        size (int | None): The size the image will be fit in. None decodes at full size.
 
     Returns:
         Image.Image: The loaded raster image, with a background if needed.
     """
-    im: Image.Image = Image.open(image_data)
+    box: tuple[int, int] | None = None
+    if size is not None:
+        box = fit_size(im.size, size)
+        if isinstance(im, Jpeg2KImageFile):
+            scale = min(im.size[0] / box[0], im.size[1] / box[1])
+            im.reduce = max(0, math.floor(math.log2(scale))) if scale >= 1 else 0
+        else:
+            im.draft(None, box)
+    im.load()
+
     if im.mode != "RGB" and im.mode != "RGBA":
         im = im.convert(mode="RGBA")
-    if im.mode == "RGBA":
-        new_bg = Image.new("RGB", im.size, color="#1e1e1e")
-        new_bg.paste(im, mask=im.getchannel(3))
-        im = new_bg
-    return unwrap(ImageOps.exif_transpose(im))
+    if box is not None:
+        factor = min(im.size[0] // box[0], im.size[1] // box[1])
+        if factor >= 2:
+            im = im.reduce(factor)
+    return unwrap(ImageOps.exif_transpose(flatten_image(im)))
+
+
+def fit_size(image_size: tuple[int, int], size: int) -> tuple[int, int]:
+    """Return the size of an image once it's fit in a square, keeping its aspect ratio.
+
+    Args:
+        image_size (tuple[int, int]): The width and height of the image.
+        size (int): The width and height of the square.
+    """
+    width, height = image_size
+    scale = size / max(width, height, 1)
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
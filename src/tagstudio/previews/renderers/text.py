@@ -11,16 +11,21 @@ from PIL.Image import DecompressionBombError
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QGuiApplication
 
-from tagstudio.core.utils.encoding import detect_char_encoding
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import TextEncoding
+from tagstudio.core.utils.encoding import detect_char_encoding, read_text_prefix
+from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger(__name__)
 
 
-def text_thumb(filepath: Path) -> Image.Image | None:
-    """Render a thumbnail for a plaintext file.
+def text_thumb(filepath: Path, encoding: TextEncoding | None = None) -> Image.Image | None:
+    """Render a thumbnail for a plaintext file from the start of it.
 
     Args:
         filepath (Path): The path of the file.
+        encoding (TextEncoding | None): The stored encoding of the file. The encoding is detected
+            if it isn't given.
     """
     im: Image.Image | None = None
 
@@ -36,9 +41,8 @@ def text_thumb(filepath: Path) -> Image.Image | None:
     )
 
     try:
-        encoding = detect_char_encoding(filepath)
-        with open(filepath, encoding=encoding) as text_file:
-            text = text_file.read(256)
+        text, _ = read_text_prefix(filepath, encoding.encoding if encoding else None)
+        text = text[:256]
         bg = Image.new("RGB", (256, 256), color=bg_color)
         draw = ImageDraw.Draw(bg)
         draw.text((16, 16), text, fill=fg_color)
@@ -48,8 +52,35 @@ def text_thumb(filepath: Path) -> Image.Image | None:
         cv2.error,
         DecompressionBombError,
         UnicodeDecodeError,
+        LookupError,
         OSError,
         FileNotFoundError,
     ) as e:
         logger.error("Couldn't render thumbnail", filepath=filepath, error=type(e).__name__)
     return im
+
+
+def cached_text_encoding(library: Library, filepath: Path) -> TextEncoding | None:
+    """Return the stored encoding of a text file, detecting and storing it if needed.
+
+    Files outside of the library, or that aren't entries, are detected every time.
+
+    Args:
+        library (Library): The library to store the encoding in.
+        filepath (Path): The absolute path of the text file.
+    """
+    try:
+        path: Path | None = filepath.relative_to(unwrap(library.library_dir))
+    except TypeError, ValueError:
+        path = None
+
+    if path is not None and (encoding := library.get_text_encoding(path)) is not None:
+        return encoding
+    try:
+        encoding = TextEncoding(detect_char_encoding(filepath))
+    except OSError as e:
+        logger.error("Couldn't detect encoding", filepath=filepath, error=type(e).__name__)
+        return None
+    if path is not None:
+        library.save_text_encoding(path, encoding)
+    return encoding
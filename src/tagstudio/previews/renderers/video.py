@@ -2,7 +2,6 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
-import math
 from pathlib import Path
 
 import cv2
@@ -11,45 +10,59 @@ from cv2.typing import MatLike
 from PIL import Image, UnidentifiedImageError
 from PIL.Image import DecompressionBombError
 
-from tagstudio.previews.video_tester import is_readable_video
+from tagstudio.core.library.alchemy.models import VideoProbe
+from tagstudio.previews.renderers.raster_image import fit_size
+from tagstudio.previews.video_tester import probe_video
 
 logger = structlog.get_logger(__name__)
 
 
-def video_thumb(filepath: Path) -> Image.Image | None:
+def video_thumb(
+    filepath: Path, size: int | None = None, probe: VideoProbe | None = None
+) -> Image.Image | None:
     """Render a thumbnail for a video file.
 
     Args:
         filepath (Path): The path of the file.
+        size (int | None): The size of the square the thumbnail has to fit in. If given, the
+            frame is downscaled to it right after it's decoded.
+        probe (VideoProbe | None): The stored probe results of the video. The video is probed
+            if they aren't given.
     """
+    if probe is None:
+        probe = probe_video(filepath)
+    if probe is None or not probe.is_readable:
+        return None
+
     im: Image.Image | None = None
-    frame: MatLike | None = None
+    video: cv2.VideoCapture | None = None
     try:
-        if is_readable_video(filepath):
-            video = cv2.VideoCapture(str(filepath), cv2.CAP_FFMPEG)
-            # TODO: Move this check to is_readable_video()
-            if video.get(cv2.CAP_PROP_FRAME_COUNT) <= 0:
-                raise cv2.error("File is invalid or has 0 frames")
-            video.set(
-                cv2.CAP_PROP_POS_FRAMES,
-                (video.get(cv2.CAP_PROP_FRAME_COUNT) // 2),
-            )
-            # NOTE: Depending on the video format, compression, and
-            # frame count, seeking halfway does not work and the thumb
-            # must be pulled from the earliest available frame.
-            max_frame_seek: int = 10
-            for i in range(
-                0,
-                min(max_frame_seek, math.floor(video.get(cv2.CAP_PROP_FRAME_COUNT))),
-            ):
-                success, frame = video.read()
-                if not success:
-                    video.set(cv2.CAP_PROP_POS_FRAMES, i)
-                else:
-                    break
-            if frame is not None:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                im = Image.fromarray(frame)
+        video = cv2.VideoCapture(str(filepath), cv2.CAP_FFMPEG)
+        frame_count = video.get(cv2.CAP_PROP_FRAME_COUNT)
+        if frame_count <= 0:
+            raise cv2.error("File is invalid or has 0 frames")
+
+        video.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 2)
+        success, frame = video.read()
+        if not success and frame_count > 1:
+            # NOTE: Depending on the video format, seeking halfway doesn't always work, in
+            # which case the thumbnail is pulled from the first frame instead.
+            video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = video.read()
+        if success:
+            im = _frame_to_image(frame, size)
     except (UnidentifiedImageError, cv2.error, DecompressionBombError, OSError) as e:
         logger.error("Couldn't render thumbnail", filepath=filepath, error=type(e).__name__)
+    finally:
+        if video is not None:
+            video.release()
     return im
+
+
+def _frame_to_image(frame: MatLike, size: int | None) -> Image.Image:
+    height, width = frame.shape[:2]
+    if size is not None:
+        box = fit_size((width, height), size)
+        if box[0] < width and box[1] < height:
+            frame = cv2.resize(frame, box, interpolation=cv2.INTER_AREA)
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
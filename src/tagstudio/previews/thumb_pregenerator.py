@@ -0,0 +1,288 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import contextlib
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from threading import Event, Lock
+
+import structlog
+
+from tagstudio.core.constants import THUMB_PREGENERATION_NAME, TS_FOLDER_NAME
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.utils.power_status import on_battery
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.previews.render_scheduler import CancelToken, RenderPriority, RenderScheduler
+from tagstudio.qt.app_settings import Theme
+from tagstudio.qt.cache_manager import CacheManager
+
+logger = structlog.get_logger(__name__)
+
+# The number of entries read from the library and sorted by disk locality at a time.
+BATCH_SIZE: int = 1000
+# The maximum number of thumbnails queued for rendering at a time, leaving some render threads
+# free for the grid.
+MAX_QUEUED: int = max(1, (os.cpu_count() or 1) // 2)
+# The number of seconds after the user last scrolled before more thumbnails are queued.
+ACTIVITY_COOLDOWN: float = 2.0
+# The number of seconds between checks whether more thumbnails can be queued.
+POLL_INTERVAL: float = 0.1
+# The number of seconds between checks whether the machine is running on battery.
+BATTERY_CHECK_INTERVAL: float = 30.0
+
+CHECKPOINT_VERSION: int = 1
+
+# The priority classes that pause the job while they have jobs.
+URGENT_PRIORITIES = (RenderPriority.PREVIEW, RenderPriority.VISIBLE, RenderPriority.PREFETCH)
+
+
+class ThumbPregenerator:
+    """A background job that renders the thumbnails of every entry into the cache.
+
+    Entries are read BATCH_SIZE at a time in order of their IDs, which follows the order the
+    library refresh found their files in. Each batch is then sorted by directory and inode, so
+    that files are read in roughly the order they're stored on disk.
+
+    Thumbnails are rendered by the render threads as BACKGROUND jobs, behind any other render
+    job. No more than MAX_QUEUED are queued at a time, and none are queued while other render
+    jobs are waiting, shortly after the user scrolled, while the machine is on battery, or
+    while the job is paused.
+
+    Progress is saved after each batch, so a job that was stopped or interrupted resumes where
+    it left off.
+    """
+
+    def __init__(
+        self,
+        library: Library,
+        renderer: FileRenderer,
+        cache: CacheManager,
+        scheduler: RenderScheduler,
+        theme: Theme = Theme.DARK,
+    ) -> None:
+        self.library = library
+        self.renderer = renderer
+        self.cache = cache
+        self.scheduler = scheduler
+        self.theme = theme
+        self.checkpoint_path = ThumbPregenerator.get_checkpoint_path(unwrap(library.library_dir))
+
+        self.total: int = 0
+        self.done: int = 0
+        self.rendered: int = 0
+        self._started_at: float = 0.0
+        self._started_done: int = 0
+        self._last_activity: float = 0.0
+        self._on_battery: bool = False
+        self._battery_checked_at: float | None = None
+
+        self._lock = Lock()
+        # Held while the job runs, so that the library isn't closed under it.
+        self._run_lock = Lock()
+        self._cancel_event = Event()
+        self._paused_event = Event()
+        # The tokens of the thumbnails that are queued or being rendered, by job key.
+        self._queued: dict[tuple[str, int], CancelToken] = {}
+
+    @staticmethod
+    def get_checkpoint_path(library_dir: Path) -> Path:
+        return library_dir / TS_FOLDER_NAME / THUMB_PREGENERATION_NAME
+
+    @staticmethod
+    def can_resume(library_dir: Path) -> bool:
+        """Return whether a job for the library was stopped before it finished."""
+        return ThumbPregenerator.get_checkpoint_path(library_dir).is_file()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def eta(self) -> float | None:
+        """The estimated number of seconds until the job is done, if it can be told yet."""
+        processed = self.done - self._started_done
+        if processed <= 0:
+            return None
+        elapsed = time.monotonic() - self._started_at
+        return elapsed / processed * max(self.total - self.done, 0)
+
+    @property
+    def paused(self) -> bool:
+        return self._paused_event.is_set()
+
+    def pause(self) -> None:
+        """Stop queueing thumbnails until resumed, e.g. while the window is hidden. Thread-safe."""
+        self._paused_event.set()
+
+    def resume(self) -> None:
+        """Continue queueing thumbnails after pausing. Thread-safe."""
+        self._paused_event.clear()
+
+    def cancel(self) -> None:
+        """Stop the job, keeping its progress to resume from later. Thread-safe."""
+        self._cancel_event.set()
+
+    def wait(self) -> None:
+        """Wait until a cancelled job stops using the library."""
+        with self._run_lock:
+            pass
+
+    def notify_activity(self) -> None:
+        """Hold off on queueing thumbnails for a while, e.g. because the user is scrolling."""
+        self._last_activity = time.monotonic()
+
+    def run(self) -> Iterator[int]:
+        """Render the thumbnails that aren't cached yet, yielding the number of entries done."""
+        with self._run_lock:
+            if not self.cancelled:
+                yield from self.__run()
+
+    def __run(self) -> Iterator[int]:
+        after_id, self.done = self.__load_checkpoint()
+        self.total = self.library.entries_count
+        self._started_at = time.monotonic()
+        self._started_done = self.done
+        logger.info("[ThumbPregenerator] Starting", done=self.done, total=self.total)
+
+        while not self.cancelled:
+            rows = self.library.get_modified_dates(after_id, BATCH_SIZE)
+            if not rows:
+                self.checkpoint_path.unlink(missing_ok=True)
+                logger.info("[ThumbPregenerator] Done", rendered=self.rendered)
+                return
+
+            for entry_id, filepath, date_modified in self.__uncached_by_locality(rows):
+                if not self.__wait(self.__can_queue):
+                    break
+                key = ("pregenerate", entry_id)
+                with self._lock:
+                    self._queued[key] = self.scheduler.submit(
+                        key,
+                        RenderPriority.BACKGROUND,
+                        partial(self.__render, key, filepath, entry_id, date_modified),
+                    )
+                yield self.done
+
+            # Only finished batches are saved, so none of their thumbnails are skipped later.
+            if not self.__wait(lambda: self.__queued_count() == 0):
+                break
+            after_id = rows[-1][0]
+            self.__save_checkpoint(after_id)
+            yield self.done
+
+        with self._lock:
+            keys = list(self._queued)
+        for key in keys:
+            self.scheduler.cancel(key)
+        logger.info("[ThumbPregenerator] Stopped", done=self.done, total=self.total)
+
+    def __uncached_by_locality(
+        self, rows: list[tuple[int, Path, datetime | None]]
+    ) -> list[tuple[int, Path, datetime | None]]:
+        """Sort the entries of a batch without cached thumbnails by directory and inode.
+
+        Entries whose thumbnails are cached or whose files are missing are counted as done.
+        """
+        library_dir = unwrap(self.library.library_dir)
+        located: list[tuple[str, int, int, Path, datetime | None]] = []
+        for entry_id, path, date_modified in rows:
+            if self.cancelled:
+                break
+            filepath = library_dir / path
+            inode: int | None = None
+            cache_key = FileRenderer.thumb_cache_key(filepath, entry_id, date_modified)
+            if not self.renderer.is_thumb_cached(self.cache, cache_key):
+                with contextlib.suppress(OSError):
+                    inode = filepath.stat().st_ino
+            if inode is None:
+                with self._lock:
+                    self.done += 1
+                continue
+            located.append((path.parent.as_posix(), inode, entry_id, filepath, date_modified))
+        located.sort(key=lambda row: (row[0], row[1]))
+        return [(entry_id, filepath, date) for _dir, _inode, entry_id, filepath, date in located]
+
+    def __render(
+        self,
+        key: tuple[str, int],
+        filepath: Path,
+        entry_id: int,
+        date_modified: datetime | None,
+        cancel_token: CancelToken,
+    ) -> None:
+        try:
+            if self.renderer.pregenerate_thumb(
+                self.cache, filepath, entry_id, date_modified, self.theme, cancel_token
+            ):
+                with self._lock:
+                    self.rendered += 1
+        finally:
+            with self._lock:
+                self._queued.pop(key, None)
+                self.done += 1
+
+    def __queued_count(self) -> int:
+        with self._lock:
+            # Jobs cancelled before they started never run, so they're dropped here instead.
+            for key in [k for k, token in self._queued.items() if token.cancelled]:
+                del self._queued[key]
+            return len(self._queued)
+
+    def __can_queue(self) -> bool:
+        return (
+            not self.paused
+            and self.__queued_count() < MAX_QUEUED
+            and time.monotonic() - self._last_activity >= ACTIVITY_COOLDOWN
+            and not self.scheduler.has_jobs(URGENT_PRIORITIES)
+            and not self.__is_on_battery()
+        )
+
+    def __is_on_battery(self) -> bool:
+        now = time.monotonic()
+        if self._battery_checked_at is None or now - self._battery_checked_at >= (
+            BATTERY_CHECK_INTERVAL
+        ):
+            self._on_battery = on_battery()
+            self._battery_checked_at = now
+        return self._on_battery
+
+    def __wait(self, condition: Callable[[], bool]) -> bool:
+        """Wait until the condition is met. Returns False if the job was cancelled first."""
+        while not self.cancelled:
+            if condition():
+                return True
+            self._cancel_event.wait(POLL_INTERVAL)
+        return False
+
+    def __load_checkpoint(self) -> tuple[int, int]:
+        """Load the ID of the last entry and the number of entries done by a previous job."""
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == CHECKPOINT_VERSION:
+                logger.info("[ThumbPregenerator] Resuming", after_id=state["after_id"])
+                return int(state["after_id"]), int(state["done"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("[ThumbPregenerator] Couldn't load checkpoint", error=e)
+        return 0, 0
+
+    def __save_checkpoint(self, after_id: int) -> None:
+        state = {"version": CHECKPOINT_VERSION, "after_id": after_id, "done": self.done}
+        try:
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            # Replace the state in one step, so that it's never left half written.
+            temp_path = self.checkpoint_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.checkpoint_path)
+        except OSError as e:
+            logger.warning("[ThumbPregenerator] Couldn't save checkpoint", error=e)
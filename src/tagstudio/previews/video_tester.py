@@ -2,12 +2,77 @@
 # SPDX-License-Identifier: MIT
 
 
+import contextlib
 from pathlib import Path
 
 import ffmpeg
 
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import VideoProbe
+from tagstudio.core.utils.types import unwrap
 from tagstudio.previews.vendored.probe import probe
 
+DRM_CODEC_TAGS: set[str] = {"drma", "drms", "drmi"}
+
+
+def probe_video(filepath: Path | str) -> VideoProbe | None:
+    """Run FFprobe on a video and return the results that matter for rendering it.
+
+    Args:
+        filepath (Path | str): The filepath of the video to probe.
+
+    Returns:
+        The probe results, or None if FFprobe isn't available.
+    """
+    try:
+        result = probe(Path(filepath))
+    except ffmpeg.Error:
+        return VideoProbe(is_readable=False)
+    if not result:
+        return None
+
+    streams: list[dict[str, object]] = result.get("streams", [])
+    is_drm = any(stream.get("codec_tag_string") in DRM_CODEC_TAGS for stream in streams)
+    video_stream = next((s for s in streams if s.get("codec_type") == "video"), {})
+
+    duration: float | None = None
+    with contextlib.suppress(TypeError, ValueError):
+        duration = float(result.get("format", {}).get("duration"))  # pyright: ignore[reportArgumentType]
+
+    return VideoProbe(
+        is_readable=not is_drm,
+        is_drm=is_drm,
+        codec=video_stream.get("codec_name"),  # pyright: ignore[reportArgumentType]
+        duration=duration,
+        width=video_stream.get("width"),  # pyright: ignore[reportArgumentType]
+        height=video_stream.get("height"),  # pyright: ignore[reportArgumentType]
+    )
+
+
+def cached_video_probe(library: Library, filepath: Path) -> VideoProbe | None:
+    """Return the stored probe of a video, probing it and storing the result if needed.
+
+    Files outside of the library, or that aren't entries, are probed every time.
+
+    Args:
+        library (Library): The library to store the probe results in.
+        filepath (Path): The absolute path of the video.
+
+    Returns:
+        The probe results, or None if FFprobe isn't available.
+    """
+    try:
+        path = filepath.relative_to(unwrap(library.library_dir))
+    except TypeError, ValueError:
+        return probe_video(filepath)
+
+    video_probe = library.get_video_probe(path)
+    if video_probe is None:
+        video_probe = probe_video(filepath)
+        if video_probe is not None:
+            library.save_video_probe(path, video_probe)
+    return video_probe
+
 
 def is_readable_video(filepath: Path | str):
     """Test if a video is in a readable format.
@@ -17,14 +82,5 @@ def is_readable_video(filepath: Path | str):
     Args:
         filepath (Path | str): The filepath of the video to check.
     """
-    try:
-        result = probe(Path(filepath))
-        if not result:
-            return False
-        for stream in result["streams"]:
-            # DRM check
-            if stream.get("codec_tag_string") in ["drma", "drms", "drmi"]:
-                return False
-    except ffmpeg.Error:
-        return False
-    return True
+    video_probe = probe_video(filepath)
+    return video_probe is not None and video_probe.is_readable
@@ -24,6 +24,7 @@ DEFAULT_GLOBAL_SETTINGS_PATH = (
 
 DEFAULT_THUMB_CACHE_SIZE = 500  # Number in MiB
 MIN_THUMB_CACHE_SIZE = 10  # Number in MiB
+DEFAULT_PIXMAP_CACHE_SIZE = 256  # Number in MiB, for thumbnails kept in memory
 
 # See: https://pillow.readthedocs.io/en/stable/handbook/image-file-formats.html#webp-saving
 DEFAULT_CACHED_THUMB_QUALITY = 80  # WebP Compression Quality
@@ -63,7 +64,9 @@ class AppSettings(BaseModel):
     language: str = Field(default="en")
     open_last_loaded_on_startup: bool = Field(default=True)
     generate_thumbs: bool = Field(default=True)
+    render_in_processes: bool = Field(default=False)
     thumb_cache_size: float = Field(default=DEFAULT_THUMB_CACHE_SIZE)
+    pixmap_cache_size: float = Field(default=DEFAULT_PIXMAP_CACHE_SIZE)
     cached_thumb_quality: int = Field(default=DEFAULT_CACHED_THUMB_QUALITY)
     cached_thumb_resolution: int = Field(default=DEFAULT_CACHED_THUMB_RES)
     autoplay: bool = Field(default=True)
@@ -3,13 +3,16 @@
 
 
 import math
-from collections.abc import Iterable
-from datetime import datetime as dt
+import shutil
+import sqlite3
+import time
+from collections import OrderedDict
+from io import BytesIO
 from pathlib import Path
-from threading import RLock
+from threading import Lock, local
 
 import structlog
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 
 from tagstudio.core.constants import THUMB_CACHE_NAME, TS_FOLDER_NAME
 from tagstudio.qt.app_settings import DEFAULT_CACHED_THUMB_QUALITY, DEFAULT_THUMB_CACHE_SIZE
@@ -17,15 +20,27 @@ from tagstudio.qt.app_settings import DEFAULT_CACHED_THUMB_QUALITY, DEFAULT_THUM
 logger = structlog.get_logger(__name__)
 
 
-class CacheFolder:
-    def __init__(self, path: Path, size: int):
-        self.path: Path = path
-        self.size: int = size
+class CacheManager:
+    """A cache of thumbnail images, packed into a single SQLite file.
 
+    The keys and sizes of all cached images are kept in memory, ordered from least to most
+    recently used. Lookups for images that aren't cached never touch the disk, and the least
+    recently used images are evicted one by one once the cache grows past its maximum size.
 
-class CacheManager:
-    MAX_FOLDER_SIZE = 10  # Absolute maximum size of a folder, number in MiB
+    Each thread uses its own connection to the pack file, which is in WAL mode. Reads don't
+    block each other or writes, and images are encoded before a write transaction is started,
+    so render threads only wait on each other for the insert itself. Evictions and compaction
+    run in transactions, so a crash never leaves the pack file half-written.
+    """
+
+    MIN_SIZE = 10  # Minimum size of the cache, number in MiB
     STAT_MULTIPLIER = 1_000_000  # Multiplier to apply to file stats (bytes) to get user units (MiB)
+    PACK_FILE_NAME = "thumbs.sqlite"
+    # The share of the maximum size the cache is trimmed to once it's full, so that not every
+    # save after that has to evict images.
+    EVICTION_TARGET = 0.9
+    # The number of cache hits kept in memory before their recency is written to the pack file.
+    TOUCH_BATCH_SIZE = 256
 
     def __init__(
         self,
@@ -40,155 +55,215 @@ class CacheManager:
             max_size: (int | float) The maximum size of the cache, in MiB.
             img_quality: (int) The image quality value to save PIL images (0-100, default=80)
         """
-        self._lock = RLock()
         self.cache_path = library_dir / TS_FOLDER_NAME / THUMB_CACHE_NAME
+        self.pack_path = self.cache_path / CacheManager.PACK_FILE_NAME
         self.max_size: int = max(
             math.floor(max_size * CacheManager.STAT_MULTIPLIER),
-            math.floor(CacheManager.MAX_FOLDER_SIZE * CacheManager.STAT_MULTIPLIER),
+            math.floor(CacheManager.MIN_SIZE * CacheManager.STAT_MULTIPLIER),
         )
         self.img_quality = (
             img_quality if img_quality >= 0 and img_quality <= 100 else DEFAULT_CACHED_THUMB_QUALITY
         )
 
-        self.folders: list[CacheFolder] = []
+        # Guards the in-memory index, not the pack file.
+        self._lock = Lock()
+        self._local = local()
+        self._connections: list[sqlite3.Connection] = []
+        # Set once the cache is closed, so late calls from render threads don't reopen it.
+        self._closed: bool = False
+        # The sizes of the cached images by key, least recently used first.
+        self._index: OrderedDict[str, int] = OrderedDict()
+        # Cache hits whose recency hasn't been written to the pack file yet.
+        self._touched: dict[str, int] = {}
         self.current_size = 0
-        if self.cache_path.exists():
-            for folder in self.cache_path.iterdir():
-                if not folder.is_dir():
-                    continue
-                folder_size = 0
-                for file in folder.iterdir():
-                    folder_size += file.stat().st_size
-                self.folders.append(CacheFolder(folder, folder_size))
-                self.current_size += folder_size
-
-    def _set_most_recent_folder(self, index: int):
-        """Move CacheFolder at index so it's considered the most recently used folder."""
-        with self._lock as _lock:
-            if index == (len(self.folders) - 1):
-                return
-            cache_folder = self.folders.pop(index)
-            self.folders.append(cache_folder)
 
-    def _get_most_recent_folder(self) -> Iterable[int]:
-        """Get each folders index sorted most recently used first."""
-        with self._lock as _lock:
-            return reversed(range(len(self.folders)))
+        self._remove_legacy_folders()
+        try:
+            self._open()
+        except sqlite3.DatabaseError as e:
+            logger.warning("[CacheManager] Recreating unreadable cache", error=e)
+            self._close_connections()
+            self.pack_path.unlink(missing_ok=True)
+            self._open()
+
+    def _open(self) -> None:
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        # Freed pages can only be returned to the file system if this is set before the table
+        # is created.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS thumbs ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS thumbs_last_used ON thumbs (last_used)")
+        for key, size in conn.execute("SELECT key, size FROM thumbs ORDER BY last_used"):
+            self._index[key] = size
+            self.current_size += size
 
-    def _least_recent_folder(self) -> Iterable[int]:
-        """Get each folder's index sorted least recently used first."""
-        with self._lock as _lock:
-            return range(len(self.folders))
+    def _connection(self) -> sqlite3.Connection:
+        """Return the pack file connection of the current thread.
+
+        Raises:
+            sqlite3.ProgrammingError: If the cache is closed.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("The cache is closed")
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.pack_path, timeout=30, check_same_thread=False)
+            # Transactions are still atomic, but a crash may lose the latest of them.
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _remove_legacy_folders(self) -> None:
+        """Remove the folders of loose thumbnail files used by older versions."""
+        if not self.cache_path.is_dir():
+            return
+        for folder in self.cache_path.iterdir():
+            if folder.is_dir():
+                logger.info("[CacheManager] Removing legacy cache folder", folder=folder)
+                shutil.rmtree(folder, ignore_errors=True)
+
+    def close(self) -> None:
+        """Write pending cache hits and close the connections to the pack file.
+
+        Images can't be loaded or saved once the cache is closed.
+        """
+        if self._closed:
+            return
+        try:
+            self._flush_touched()
+        except sqlite3.Error as e:
+            logger.warning("[CacheManager] Couldn't save cache usage", error=e)
+        with self._lock:
+            self._closed = True
+            self._index.clear()
+            self._touched.clear()
+            self.current_size = 0
+        self._close_connections()
+
+    def _close_connections(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = local()
 
     def clear_cache(self):
-        """Clear all files and folders within the cached folder."""
-        with self._lock as _lock:
-            folders = []
-            for folder in self.folders:
-                if not self._remove_folder(folder):
-                    folders.append(folders)
-                    logger.warn("[CacheManager] Failed to remove folder", folder=folder)
-            self.folders = folders
+        """Remove all cached images."""
+        if self._closed:
+            return
+        with self._lock:
+            self._index.clear()
+            self._touched.clear()
+            self.current_size = 0
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM thumbs")
+            conn.execute("PRAGMA incremental_vacuum")
+        except sqlite3.Error as e:
+            logger.warning("[CacheManager] Failed to clear cache", error=e)
+            return
         logger.info("[CacheManager] Cleared cache!")
 
-    def _remove_folder(self, cache_folder: CacheFolder) -> bool:
-        with self._lock as _lock:
-            self.current_size -= cache_folder.size
-            if not cache_folder.path.is_dir():
-                return True
-
-            is_empty = True
-            for file in cache_folder.path.iterdir():
-                assert file.is_file() and file.suffix == ".webp"
-                try:
-                    file.unlink(missing_ok=True)
-                except BaseException as e:
-                    is_empty = False
-                    logger.warn("[CacheManager] Failed to remove file", file=file, error=e)
-
-            if is_empty:
-                cache_folder.path.rmdir()
-                return True
-            else:
-                size = 0
-                for file in cache_folder.path.iterdir():
-                    size += file.stat().st_size
-                cache_folder.size = size
-                self.current_size += size
-            return False
-
-    def get_file_path(self, file_name: Path) -> Path | None:
-        with self._lock as _lock:
-            for i in self._get_most_recent_folder():
-                cache_folder = self.folders[i]
-                file_path = cache_folder.path / file_name
-                if file_path.exists():
-                    self._set_most_recent_folder(i)
-                    return file_path
-        return None
-
-    def save_image(self, image: Image.Image, file_name: Path, mode: str = "RGBA"):
-        """Save an image to the cache."""
-        with self._lock as _lock:
-            cache_folder: CacheFolder = self._get_current_folder()
-            file_path = cache_folder.path / file_name
-            try:
-                image.save(file_path, mode=mode, quality=self.img_quality)
-
-                size = file_path.stat().st_size
-                cache_folder.size += size
-                self.current_size += size
-                self._cull_folders()
-            except FileNotFoundError:
-                logger.warn(
-                    "[CacheManager] Failed to save cached image, was the folder deleted on disk?",
-                    folder=file_path,
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def get_image(self, key: str) -> Image.Image | None:
+        """Load a cached image, if there is one for the key and the cache isn't closed."""
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+            self._touched[key] = time.time_ns()
+            flush = len(self._touched) >= CacheManager.TOUCH_BATCH_SIZE
+
+        try:
+            row = (
+                self._connection()
+                .execute("SELECT data FROM thumbs WHERE key = ?", (key,))
+                .fetchone()
+            )
+            if flush:
+                self._flush_touched()
+        except sqlite3.Error as e:
+            logger.error("[CacheManager] Couldn't read cached image", key=key, error=e)
+            return None
+        if row is None:
+            # Evicted by another thread in the meantime.
+            return None
+
+        try:
+            return Image.open(BytesIO(row[0]))
+        except UnidentifiedImageError as e:
+            logger.error("[CacheManager] Couldn't open cached image", key=key, error=e)
+            return None
+
+    def save_image(self, image: Image.Image, key: str):
+        """Save an image to the cache. Does nothing once the cache is closed."""
+        if self._closed:
+            return
+        data = BytesIO()
+        image.save(data, format="WEBP", quality=self.img_quality)
+        blob = data.getvalue()
+
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO thumbs (key, data, size, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time_ns()),
                 )
-                if not cache_folder.path.exists():
-                    self.folders.remove(cache_folder)
-
-    def _create_folder(self) -> CacheFolder:
-        with self._lock as _lock:
-            folder = self.cache_path / Path(str(math.floor(dt.timestamp(dt.now()))))
-            try:
-                folder.mkdir(parents=True)
-            except FileExistsError:
-                for cache_folder in self.folders:
-                    if cache_folder.path == folder:
-                        return cache_folder
-            cache_folder = CacheFolder(folder, 0)
-            self.folders.append(cache_folder)
-            return cache_folder
-
-    def _get_current_folder(self) -> CacheFolder:
-        with self._lock as _lock:
-            if len(self.folders) == 0:
-                return self._create_folder()
-
-            for i in self._get_most_recent_folder():
-                cache_folder: CacheFolder = self.folders[i]
-                if cache_folder.size < CacheManager.MAX_FOLDER_SIZE * CacheManager.STAT_MULTIPLIER:
-                    self._set_most_recent_folder(i)
-                    return cache_folder
-
-            return self._create_folder()
-
-    def _cull_folders(self):
-        """Remove folders and their cached context based on size or age limits."""
-        with self._lock as _lock:
-            if self.current_size < self.max_size:
+        except sqlite3.Error as e:
+            logger.warning("[CacheManager] Failed to save cached image", key=key, error=e)
+            return
+
+        evicted: list[str] = []
+        with self._lock:
+            if self._closed:
                 return
+            self.current_size += len(blob) - self._index.pop(key, 0)
+            self._index[key] = len(blob)
+            if self.current_size > self.max_size:
+                target = self.max_size * CacheManager.EVICTION_TARGET
+                while self.current_size > target and len(self._index) > 1:
+                    evicted_key, size = self._index.popitem(last=False)
+                    self._touched.pop(evicted_key, None)
+                    self.current_size -= size
+                    evicted.append(evicted_key)
+        if evicted:
+            self._evict(evicted)
 
-            removed: list[int] = []
-            for i in self._least_recent_folder():
-                cache_folder: CacheFolder = self.folders[i]
-                logger.info(
-                    "[CacheManager] Removing folder due to size limit", folder=cache_folder.path
-                )
-                if self._remove_folder(cache_folder):
-                    removed.append(i)
-                if self.current_size < self.max_size:
-                    break
+    def _evict(self, keys: list[str]) -> None:
+        """Remove images from the pack file and return the freed space to the file system."""
+        logger.info("[CacheManager] Evicting images due to size limit", count=len(keys))
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM thumbs WHERE key = ?", ((key,) for key in keys))
+            conn.execute("PRAGMA incremental_vacuum")
+        except sqlite3.Error as e:
+            logger.warning("[CacheManager] Failed to evict cached images", error=e)
 
-            for index in sorted(removed, reverse=True):
-                self.folders.pop(index)
+    def _flush_touched(self) -> None:
+        """Write the recency of cache hits to the pack file, so it's kept across sessions."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE thumbs SET last_used = ? WHERE key = ?",
+                ((last_used, key) for key, last_used in touched.items()),
+            )
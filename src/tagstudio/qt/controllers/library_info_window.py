@@ -8,16 +8,17 @@ from typing import TYPE_CHECKING, override
 from warnings import catch_warnings
 
 import structlog
-from humanfriendly import format_size  # pyright: ignore[reportUnknownVariableType]
+from humanfriendly import format_size, format_timespan  # pyright: ignore[reportUnknownVariableType]
 from PySide6 import QtGui
 
-from tagstudio.core.constants import BACKUP_FOLDER_NAME, TS_FOLDER_NAME
+from tagstudio.core.constants import BACKUP_FOLDER_NAME, REFRESH_REPORTS_NAME, TS_FOLDER_NAME
 from tagstudio.core.library.alchemy.constants import (
     DB_VERSION,
     DB_VERSION_CURRENT_KEY,
     JSON_FILENAME,
 )
 from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.refresh_report import load_refresh_reports
 from tagstudio.core.utils.types import unwrap
 from tagstudio.i18n.translations import Translations
 from tagstudio.qt.utils import file_opener
@@ -109,10 +110,22 @@ class LibraryInfoWindow(LibraryInfoWindowView):
             f"<b>{self.__backups_count}</b> ({format_size(self.__backups_size)})"
         )
 
+        # Last Refresh
+        reports = load_refresh_reports(unwrap(self.lib.library_dir))
+        if reports:
+            report = reports[-1]
+            duration = format_timespan(report.total_seconds)
+            self.refresh_report_status_label.setText(
+                f"<b>{report.files_scanned}</b> ({duration}, {report.backend})"
+            )
+        else:
+            self.refresh_report_status_label.setText("<b>—</b>")
+
         # Buttons
         with catch_warnings(record=True):
             self.view_legacy_json_file.clicked.disconnect()
             self.open_backups_folder.clicked.disconnect()
+            self.view_refresh_report_file.clicked.disconnect()
 
         if self.__is_json_library_present:
             self.view_legacy_json_file.setEnabled(True)
@@ -130,6 +143,17 @@ class LibraryInfoWindow(LibraryInfoWindowView):
             )
         )
 
+        if reports:
+            self.view_refresh_report_file.setEnabled(True)
+            self.view_refresh_report_file.clicked.connect(
+                lambda: file_opener.open_file(
+                    unwrap(self.lib.library_dir) / TS_FOLDER_NAME / REFRESH_REPORTS_NAME,
+                    file_manager=True,
+                )
+            )
+        else:
+            self.view_refresh_report_file.setEnabled(False)
+
     def update_version(self):
         version_text: str = f"<b>{self.lib.get_version(DB_VERSION_CURRENT_KEY)}</b> / {DB_VERSION}"
         self.version_label.setText(
@@ -88,6 +88,7 @@ class MainMenuBar(QMenuBar):
     fix_unlinked_entries_action: QAction
     fix_ignored_entries_action: QAction
     fix_dupe_files_action: QAction
+    pregenerate_thumbs_action: QAction
     clear_thumb_cache_action: QAction
 
     macros_menu: QMenu
@@ -379,6 +380,13 @@ class MainMenuBar(QMenuBar):
 
         self.tools_menu.addSeparator()
 
+        # Generate All Thumbnails
+        self.pregenerate_thumbs_action = QAction(
+            Translations["menu.tools.pregenerate_thumbs"], self
+        )
+        self.pregenerate_thumbs_action.setEnabled(False)
+        self.tools_menu.addAction(self.pregenerate_thumbs_action)
+
         # Clear Thumbnail Cache
         self.clear_thumb_cache_action = QAction(
             Translations["settings.clear_thumb_cache.title"], self
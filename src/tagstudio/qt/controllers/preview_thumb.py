@@ -7,19 +7,16 @@ from pathlib import Path
 from typing import TYPE_CHECKING, override
 
 import cv2
-import rawpy
 import structlog
 from PIL import Image, UnidentifiedImageError
 from PIL.Image import DecompressionBombError
 from PySide6.QtCore import QSize
-from rawpy import (
-    LibRawFileUnsupportedError,  # pyright: ignore[reportPrivateImportUsage]
-    LibRawIOError,  # pyright: ignore[reportPrivateImportUsage]
-)
 
 from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import VideoProbe
 from tagstudio.core.media_types import MediaCategories
-from tagstudio.previews.video_tester import is_readable_video
+from tagstudio.previews.renderers.raster_image import raw_image_size
+from tagstudio.previews.video_tester import cached_video_probe
 from tagstudio.qt.mixed.file_attributes import FileAttributeData
 from tagstudio.qt.utils.file_opener import open_file
 from tagstudio.qt.views.preview_thumb_view import PreviewThumbView
@@ -46,23 +43,15 @@ class PreviewThumb(PreviewThumbView):
         if filepath.is_dir():
             pass
         elif MediaCategories.IMAGE_RAW_TYPES.contains(ext, mime_fallback=True):
+            # Read from the metadata, without demosaicing the sensor data.
+            if (size := raw_image_size(filepath)) is not None:
+                stats.width, stats.height = size
+        elif MediaCategories.IMAGE_RASTER_TYPES.contains(ext, mime_fallback=True):
             try:
-                with rawpy.imread(str(filepath)) as raw:
-                    rgb = raw.postprocess()
-                    image = Image.new("L", (rgb.shape[1], rgb.shape[0]), color="black")
+                # Only the header is read until the image is loaded.
+                with Image.open(filepath) as image:
                     stats.width = image.width
                     stats.height = image.height
-            except (
-                LibRawIOError,
-                LibRawFileUnsupportedError,
-                FileNotFoundError,
-            ):
-                pass
-        elif MediaCategories.IMAGE_RASTER_TYPES.contains(ext, mime_fallback=True):
-            try:
-                image = Image.open(str(filepath))
-                stats.width = image.width
-                stats.height = image.height
             except (
                 DecompressionBombError,
                 FileNotFoundError,
@@ -104,12 +93,19 @@ class PreviewThumb(PreviewThumbView):
             logger.error("[PreviewThumb] Could not load animated image", filepath=filepath, error=e)
             return None
 
-    def __get_video_res(self, filepath: str) -> tuple[bool, QSize]:
-        video = cv2.VideoCapture(filepath, cv2.CAP_FFMPEG)
-        success, frame = video.read()
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        image = Image.fromarray(frame)
-        return (success, QSize(image.width, image.height))
+    def __get_video_res(self, filepath: Path, probe: VideoProbe) -> QSize | None:
+        """Return the size of a video, read from its probe results or its header."""
+        if probe.width and probe.height:
+            return QSize(probe.width, probe.height)
+
+        # Only the container and stream headers are read, without decoding a frame.
+        video = cv2.VideoCapture(str(filepath), cv2.CAP_FFMPEG)
+        try:
+            width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        finally:
+            video.release()
+        return QSize(width, height) if width > 0 and height > 0 else None
 
     def display_file(self, filepath: Path) -> FileAttributeData:
         """Render a single file preview."""
@@ -118,14 +114,13 @@ class PreviewThumb(PreviewThumbView):
         ext = filepath.suffix.lower()
 
         # Video
-        if MediaCategories.VIDEO_TYPES.contains(ext, mime_fallback=True) and is_readable_video(
-            filepath
+        if MediaCategories.VIDEO_TYPES.contains(ext, mime_fallback=True) and (
+            (probe := cached_video_probe(self.__driver.lib, filepath)) is not None
+            and probe.is_readable
         ):
             size: QSize | None = None
             try:
-                success, size = self.__get_video_res(str(filepath))
-                if not success:
-                    size = None
+                size = self.__get_video_res(filepath, probe)
             except cv2.error as e:
                 logger.error("[PreviewThumb] Could not play video", filepath=filepath, error=e)
 
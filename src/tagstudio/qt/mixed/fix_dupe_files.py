@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, override
 from PySide6 import QtCore, QtGui
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
+    QComboBox,
     QFileDialog,
     QHBoxLayout,
     QLabel,
@@ -18,6 +19,7 @@ from PySide6.QtWidgets import (
 from tagstudio.core.library.alchemy.library import Library
 from tagstudio.core.library.alchemy.registries.dupe_files_registry import DupeFilesRegistry
 from tagstudio.i18n.translations import Translations
+from tagstudio.qt.controllers.progress_bar import ProgressWidget
 from tagstudio.qt.mixed.mirror_entries_modal import MirrorEntriesModal
 from tagstudio.qt.views.styles.stylesheets import header
 
@@ -52,6 +54,13 @@ class FixDupeFilesModal(QWidget):
         self.dupe_count.setObjectName("dupeCountLabel")
         self.dupe_count.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        self.mode_combobox = QComboBox()
+        self.mode_combobox.addItem(Translations["file.duplicates.mode.identical"])
+        self.mode_combobox.addItem(Translations["file.duplicates.mode.similar"])
+
+        self.scan_button = QPushButton(Translations["file.duplicates.scan"])
+        self.scan_button.clicked.connect(self.scan_dupes)
+
         self.file_label = QLabel(Translations["file.duplicates.dupeguru.no_file"])
         self.file_label.setObjectName("fileLabel")
 
@@ -81,6 +90,8 @@ class FixDupeFilesModal(QWidget):
 
         self.root_layout.addWidget(self.desc_widget)
         self.root_layout.addWidget(self.dupe_count)
+        self.root_layout.addWidget(self.mode_combobox)
+        self.root_layout.addWidget(self.scan_button)
         self.root_layout.addWidget(self.file_label)
         self.root_layout.addWidget(self.open_button)
 
@@ -112,8 +123,34 @@ class FixDupeFilesModal(QWidget):
         self.refresh_dupes()
         self.mirror_modal.refresh_list()
 
+    def scan_dupes(self):
+        # Native scan results replace any previously loaded DupeGuru results
+        self.filename = ""
+        self.file_label.setText(Translations["file.duplicates.dupeguru.no_file"])
+
+        pw = ProgressWidget(
+            cancel_button_text=None,
+            minimum=0,
+            maximum=0,
+        )
+        pw.setWindowTitle(Translations["file.duplicates.scan.title"])
+        if self.mode_combobox.currentIndex() == 1:
+            pw.update_label(Translations["file.duplicates.scan.similar_label"])
+            scan_function = self.tracker.scan_similar_images
+        else:
+            pw.update_label(Translations["file.duplicates.scan.label"])
+            scan_function = self.tracker.scan_dupe_files
+        pw.from_iterable_function(
+            scan_function,
+            None,
+            self.refresh_dupes,
+            self.mirror_modal.refresh_list,
+        )
+
     def refresh_dupes(self):
-        self.tracker.refresh_dupe_files(self.filename)
+        if self.filename:
+            self.tracker.refresh_dupe_files(self.filename)
+        self.lib.dupe_files_count = self.tracker.groups_count
         self.set_dupe_count(self.tracker.groups_count)
 
     def set_dupe_count(self, count: int):
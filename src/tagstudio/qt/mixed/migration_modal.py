@@ -8,7 +8,6 @@ from typing import cast
 from warnings import deprecated
 
 import structlog
-import wcmatch.fnmatch as fnmatch
 from PySide6.QtCore import QObject, Qt, QThreadPool, Signal
 from PySide6.QtWidgets import (
     QApplication,
@@ -39,7 +38,7 @@ from tagstudio.core.library.alchemy.fields import LEGACY_FIELD_MAP
 from tagstudio.core.library.alchemy.joins import TagParent
 from tagstudio.core.library.alchemy.library import Library as SqliteLibrary
 from tagstudio.core.library.alchemy.models import Entry, TagAlias
-from tagstudio.core.library.ignore import PATH_GLOB_FLAGS, Ignore, ignore_to_glob
+from tagstudio.core.library.ignore import Ignore
 from tagstudio.core.library.json.library import Library as JsonLibrary
 from tagstudio.core.library.json.library import Tag as JsonTag
 from tagstudio.core.utils.types import unwrap
@@ -512,18 +511,15 @@ class JsonMigrationModal(QObject):
         return str(f"<b><a style='color: {color}'>{new_value}</a></b>")
 
     def assert_ignore_parity(self) -> None:
-        compiled_pats = fnmatch.compile(
-            ignore_to_glob(
-                Ignore._load_ignore_file(  # pyright: ignore[reportPrivateUsage]
-                    unwrap(self.json_lib.library_dir) / TS_FOLDER_NAME / IGNORE_NAME
-                )
-            ),
-            PATH_GLOB_FLAGS,
+        compiled_pats = Ignore.compile(
+            Ignore._load_ignore_file(  # pyright: ignore[reportPrivateUsage]
+                unwrap(self.json_lib.library_dir) / TS_FOLDER_NAME / IGNORE_NAME
+            )
         )  # copied from Ignore.get_patterns since that method modifies singleton state
-        path = self.json_lib.library_dir / "filename"
+        path = Path("filename")
         for ext in self.json_lib.ext_list:
-            assert compiled_pats.match(str(path / ext)) == self.json_lib.is_exclude_list
-        assert compiled_pats.match(str(path / ".not_a_real_ext")) != self.json_lib.is_exclude_list
+            assert compiled_pats.match(path / ext) == self.json_lib.is_exclude_list
+        assert compiled_pats.match(path / ".not_a_real_ext") != self.json_lib.is_exclude_list
 
     def check_ignore_parity(self) -> bool:
         try:
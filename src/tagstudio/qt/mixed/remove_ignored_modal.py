@@ -71,8 +71,8 @@ class RemoveIgnoredModal(QWidget):
         )
 
         self.model.clear()
-        for i in self.tracker.ignored_entries:
-            item = QStandardItem(str(i.path))
+        for _, path in self.tracker.ignored_entries:
+            item = QStandardItem(str(path))
             item.setEditable(False)
             self.model.appendRow(item)
 
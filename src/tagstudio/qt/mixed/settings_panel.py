@@ -142,6 +142,8 @@ class SettingsPanel(ModalContent):
         show_label = (
             self.language_combobox.currentData() != Translations.current_language
             or self.theme_combobox.currentData() != self.driver.applied_theme
+            or self.render_in_processes_checkbox.isChecked()
+            != (self.driver.render_pool is not None)
         )
         self.restart_label.setHidden(not show_label)
 
@@ -263,6 +265,14 @@ class SettingsPanel(ModalContent):
         self.generate_thumbs.setChecked(self.driver.settings.generate_thumbs)
         form_layout.addRow(Translations["settings.generate_thumbs"], self.generate_thumbs)
 
+        # Render Thumbnails in Separate Processes
+        self.render_in_processes_checkbox = QCheckBox()
+        self.render_in_processes_checkbox.setChecked(self.driver.settings.render_in_processes)
+        self.render_in_processes_checkbox.stateChanged.connect(self.__update_restart_label)
+        form_layout.addRow(
+            Translations["settings.render_in_processes"], self.render_in_processes_checkbox
+        )
+
         # Thumbnail Cache Size
         self.thumb_cache_size_container = QWidget()
         self.thumb_cache_size_layout = QHBoxLayout(self.thumb_cache_size_container)
@@ -372,6 +382,7 @@ class SettingsPanel(ModalContent):
             "language": self.language_combobox.currentData(),
             "open_last_loaded_on_startup": self.open_last_lib_checkbox.isChecked(),
             "generate_thumbs": self.generate_thumbs.isChecked(),
+            "render_in_processes": self.render_in_processes_checkbox.isChecked(),
             "thumb_cache_size": max(
                 float(self.thumb_cache_size.text() or DEFAULT_THUMB_CACHE_SIZE),
                 MIN_THUMB_CACHE_SIZE,
@@ -408,6 +419,7 @@ class SettingsPanel(ModalContent):
         driver.settings.autoplay = settings["autoplay"]
         driver.settings.scan_files_on_open = settings["scan_files_on_open"]
         driver.settings.generate_thumbs = settings["generate_thumbs"]
+        driver.settings.render_in_processes = settings["render_in_processes"]
         driver.settings.thumb_cache_size = settings["thumb_cache_size"]
         driver.settings.cached_thumb_resolution = settings["cached_thumb_resolution"]
         driver.settings.show_filenames_in_grid = settings["show_filenames_in_grid"]
@@ -0,0 +1,96 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import math
+from collections import OrderedDict
+from collections.abc import Hashable
+
+import structlog
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QPixmap
+
+from tagstudio.qt.app_settings import DEFAULT_PIXMAP_CACHE_SIZE
+
+logger = structlog.get_logger(__name__)
+
+
+class PixmapCache:
+    """An in-memory cache of rendered thumbnails, limited by the memory their pixels take up.
+
+    Thumbnails are kept in least recently used order, and the least recently used ones are
+    evicted once the cache grows past its maximum size. Only used from the GUI thread.
+    """
+
+    STAT_MULTIPLIER = 1_000_000  # Multiplier to apply to sizes (bytes) to get user units (MiB)
+
+    def __init__(self, max_size: int | float = DEFAULT_PIXMAP_CACHE_SIZE):
+        """A cache of rendered thumbnails.
+
+        Args:
+            max_size: (int | float) The maximum size of the cache, in MiB.
+        """
+        self.max_size: int = max(math.floor(max_size * PixmapCache.STAT_MULTIPLIER), 0)
+        self.current_size = 0
+        self._items: OrderedDict[Hashable, tuple[QPixmap, QSize]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_size = 0
+
+    @staticmethod
+    def pixmap_size(pixmap: QPixmap) -> int:
+        """Return the number of bytes the pixels of a pixmap take up."""
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> tuple[QPixmap, QSize] | None:
+        """Return the cached thumbnail and its size, if there is one for the key."""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return item
+
+    def put(self, key: Hashable, pixmap: QPixmap, size: QSize) -> None:
+        """Cache a thumbnail, evicting the least recently used ones if the cache is full."""
+        item_size = PixmapCache.pixmap_size(pixmap)
+        if old := self._items.pop(key, None):
+            self.current_size -= PixmapCache.pixmap_size(old[0])
+        if item_size > self.max_size:
+            return
+
+        self._items[key] = (pixmap, size)
+        self.current_size += item_size
+        while self.current_size > self.max_size:
+            _key, (evicted, _size) = self._items.popitem(last=False)
+            evicted_size = PixmapCache.pixmap_size(evicted)
+            self.current_size -= evicted_size
+            self.evictions += 1
+            self.evicted_size += evicted_size
+
+    def clear(self) -> None:
+        """Remove all cached thumbnails."""
+        self._items.clear()
+        self.current_size = 0
+
+    def log_stats(self) -> None:
+        """Log the usage of the cache since it was created."""
+        logger.info(
+            "[PixmapCache] Stats",
+            items=len(self._items),
+            size=self.current_size,
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            evicted_size=self.evicted_size,
+        )
@@ -19,7 +19,6 @@ from argparse import Namespace
 from collections import OrderedDict
 from functools import partial
 from pathlib import Path
-from queue import Queue
 from typing import TypeVar
 from warnings import catch_warnings
 
@@ -36,6 +35,7 @@ from PySide6.QtGui import (
     QIcon,
     QMouseEvent,
     QPalette,
+    QWindow,
 )
 from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox, QPushButton, QScrollArea
 
@@ -43,6 +43,7 @@ import tagstudio.qt.resources_rc  # noqa: F401  # pyright: ignore[reportUnusedIm
 from tagstudio.core.constants import BUILD_TYPE, TAG_ARCHIVED, TAG_FAVORITE, VERSION
 from tagstudio.core.driver import DriverMixin
 from tagstudio.core.enums import AppCacheItems, MacroID, ShowFilepathOption
+from tagstudio.core.exceptions import RenderCancelledError
 from tagstudio.core.library.alchemy.enums import BrowsingState, SortingModeEnum
 from tagstudio.core.library.alchemy.library import Library, LibraryStatus
 from tagstudio.core.library.alchemy.models import Entry
@@ -58,6 +59,9 @@ from tagstudio.core.utils.str_formatting import is_version_outdated
 from tagstudio.core.utils.types import unwrap
 from tagstudio.i18n.platform_strings import trash_term
 from tagstudio.i18n.translations import Translations
+from tagstudio.previews.render_pool import RenderPool
+from tagstudio.previews.render_scheduler import RenderPriority, RenderScheduler
+from tagstudio.previews.thumb_pregenerator import ThumbPregenerator
 from tagstudio.qt.app_settings import DEFAULT_GLOBAL_SETTINGS_PATH, AppSettings, Theme
 from tagstudio.qt.cache_manager import CacheManager
 from tagstudio.qt.controllers.field_template_search_panel import FieldTemplateSearchPanel
@@ -80,6 +84,7 @@ from tagstudio.qt.mixed.item_thumb import BadgeType
 from tagstudio.qt.mixed.migration_modal import JsonMigrationModal
 from tagstudio.qt.mixed.settings_panel import SettingsPanel
 from tagstudio.qt.mixed.tag_color_manager import TagColorManager
+from tagstudio.qt.qt_file_renderer import QtFileRenderer
 from tagstudio.qt.resource_manager import ResourceManager
 from tagstudio.qt.utils.custom_runnable import CustomRunnable
 from tagstudio.qt.utils.file_deleter import delete_file
@@ -110,21 +115,21 @@ def clamp(value, lower_bound, upper_bound):
 
 
 class Consumer(QThread):
-    MARKER_QUIT = "MARKER_QUIT"
-
-    def __init__(self, queue) -> None:
-        self.queue = queue
+    def __init__(self, scheduler: RenderScheduler) -> None:
+        self.scheduler = scheduler
         QThread.__init__(self)
 
     def run(self):
         while True:
+            job = self.scheduler.get()
+            if job is None:
+                break
             try:
-                job = self.queue.get()
-                if job == self.MARKER_QUIT:
-                    break
-                job[0](*job[1])
-            except RuntimeError:
+                job.run()
+            except RenderCancelledError, RuntimeError:
                 pass
+            finally:
+                self.scheduler.done(job)
 
 
 T = TypeVar("T")
@@ -186,6 +191,9 @@ class QtDriver(DriverMixin, QObject):
 
     lib: Library
     cache_manager: CacheManager | None = None
+    thumb_pregenerator: ThumbPregenerator | None = None
+    # Whether the main window is hidden or minimized, holding back background work.
+    window_hidden: bool = False
 
     browsing_history: History[BrowsingState]
 
@@ -207,7 +215,7 @@ class QtDriver(DriverMixin, QObject):
         self.base_title: str = f"TagStudio Alpha {VERSION}{self.branch}"
         # self.title_text: str = self.base_title
         # self.buffer = {}
-        self.thumb_job_queue: Queue = Queue()
+        self.thumb_scheduler: RenderScheduler = RenderScheduler()
         self.thumb_threads: list[Consumer] = []
 
         self.SIGTERM.connect(self.handle_sigterm)
@@ -224,6 +232,9 @@ class QtDriver(DriverMixin, QObject):
                 path=self.global_settings_path,
             )
         self.applied_theme = self.settings.theme
+        self.render_pool: RenderPool | None = (
+            RenderPool() if self.settings.render_in_processes else None
+        )
 
         self.__reset_navigation()
 
@@ -265,7 +276,7 @@ class QtDriver(DriverMixin, QObject):
         if not self.thumb_threads:
             max_threads = os.cpu_count() or 1
             for i in range(max_threads):
-                thread = Consumer(self.thumb_job_queue)
+                thread = Consumer(self.thumb_scheduler)
                 thread.setObjectName(f"ThumbRenderer_{i}")
                 self.thumb_threads.append(thread)
                 thread.start()
@@ -576,6 +587,10 @@ class QtDriver(DriverMixin, QObject):
 
         self.main_window.menu_bar.fix_dupe_files_action.triggered.connect(create_dupe_files_modal)
 
+        self.main_window.menu_bar.pregenerate_thumbs_action.triggered.connect(
+            self.toggle_thumb_pregeneration
+        )
+
         # TODO: Move this to a settings screen.
         self.main_window.menu_bar.clear_thumb_cache_action.triggered.connect(
             lambda: unwrap(self.cache_manager).clear_cache()
@@ -729,6 +744,9 @@ class QtDriver(DriverMixin, QObject):
         # or implementing some clever loading tricks.
         self.main_window.show()
         self.main_window.activateWindow()
+        unwrap(self.main_window.windowHandle()).visibilityChanged.connect(
+            self.main_window_visibility_callback
+        )
         self.main_window.toggle_landing_page(enabled=True)
 
         self.main_window.pagination.index.connect(lambda i: self.page_move(i, absolute=True))
@@ -769,8 +787,9 @@ class QtDriver(DriverMixin, QObject):
         """Save Library on Application Exit."""
         self.close_library(is_shutdown=True)
         logger.info("[SHUTDOWN] Ending Thumbnail Threads...")
-        for _ in self.thumb_threads:
-            self.thumb_job_queue.put(Consumer.MARKER_QUIT)
+        if self.render_pool is not None:
+            self.render_pool.shutdown()
+        self.thumb_scheduler.close()
 
         # wait for threads to quit
         for thread in self.thumb_threads:
@@ -779,6 +798,28 @@ class QtDriver(DriverMixin, QObject):
 
         QApplication.quit()
 
+    def main_window_visibility_callback(self, visibility: QWindow.Visibility):
+        """Pause background work while the main window is hidden or minimized.
+
+        Thumbnail pregeneration stops queueing thumbnails, and the render processes are stopped.
+        Any other render, like the preview, is still done in the render threads.
+        """
+        self.window_hidden = visibility in (
+            QWindow.Visibility.Hidden,
+            QWindow.Visibility.Minimized,
+        )
+        pregenerator = self.thumb_pregenerator
+        if self.window_hidden:
+            if pregenerator is not None:
+                pregenerator.pause()
+            if self.render_pool is not None:
+                self.render_pool.pause()
+        else:
+            if pregenerator is not None:
+                pregenerator.resume()
+            if self.render_pool is not None:
+                self.render_pool.resume()
+
     def close_library(self, is_shutdown: bool = False):
         if not self.lib.library_dir:
             logger.info("No Library to Close")
@@ -798,10 +839,21 @@ class QtDriver(DriverMixin, QObject):
         scrollbar.verticalScrollBar().setValue(0)
         self.__reset_navigation()
 
+        if self.thumb_pregenerator is not None:
+            self.thumb_pregenerator.cancel()
+            self.thumb_pregenerator.wait()
+            self.thumb_pregenerator = None
+
+        # Running renders still read from and write to the cache, so they have to stop first.
+        self.thumb_scheduler.cancel_all()
+        if not self.thumb_scheduler.wait_running(timeout=5):
+            logger.warning("[QtDriver] Closing library while renders are still running")
+
         self.lib.close()
+        if self.cache_manager is not None:
+            self.cache_manager.close()
         self.cache_manager = None
 
-        self.thumb_job_queue.queue.clear()
         if is_shutdown:
             # no need to do other things on shutdown
             return
@@ -835,6 +887,10 @@ class QtDriver(DriverMixin, QObject):
             self.main_window.menu_bar.fix_unlinked_entries_action.setEnabled(False)
             self.main_window.menu_bar.fix_ignored_entries_action.setEnabled(False)
             self.main_window.menu_bar.fix_dupe_files_action.setEnabled(False)
+            self.main_window.menu_bar.pregenerate_thumbs_action.setText(
+                Translations["menu.tools.pregenerate_thumbs"]
+            )
+            self.main_window.menu_bar.pregenerate_thumbs_action.setEnabled(False)
             self.main_window.menu_bar.clear_thumb_cache_action.setEnabled(False)
             self.main_window.menu_bar.folders_to_tags_action.setEnabled(False)
             self.main_window.menu_bar.library_info_action.setEnabled(False)
@@ -1071,12 +1127,14 @@ class QtDriver(DriverMixin, QObject):
         tracker = RefreshTracker(self.lib)
 
         pw = ProgressWidget(
-            cancel_button_text=None,
+            cancel_button_text=Translations["generic.cancel"],
             minimum=0,
             maximum=0,
         )
         pw.setWindowTitle(Translations["library.refresh.title"])
         pw.update_label(Translations["library.refresh.scanning_preparing"])
+        # A cancelled refresh picks up where it left off the next time it's run.
+        pw.pb.canceled.connect(tracker.cancel)
         pw.show()
 
         iterator = FunctionIterator(lambda lib=self.lib.library_dir: tracker.refresh_dir(lib))
@@ -1099,7 +1157,7 @@ class QtDriver(DriverMixin, QObject):
             lambda: (
                 pw.hide(),
                 pw.deleteLater(),
-                self.add_new_files_runnable(tracker),
+                tracker.cancelled or self.add_new_files_runnable(tracker),
             )
         )
         QThreadPool.globalInstance().start(r)
@@ -1113,10 +1171,11 @@ class QtDriver(DriverMixin, QObject):
 
         iterator = FunctionIterator(tracker.save_new_files)
         pw = ProgressWidget(
-            cancel_button_text=None,
+            cancel_button_text=Translations["generic.cancel"],
             minimum=0,
             maximum=0,
         )
+        pw.pb.canceled.connect(tracker.cancel)
         pw.setWindowTitle(Translations["entries.running.dialog.title"])
         pw.update_label(
             Translations.format("entries.running.dialog.new_entries", total=f"{files_count:n}")
@@ -1137,12 +1196,86 @@ class QtDriver(DriverMixin, QObject):
             lambda: (
                 pw.hide(),
                 pw.deleteLater(),
-                # refresh the library only when new items are added
-                files_count and self.update_browsing_state(),
+                # refresh the library only when items were added or changed
+                (files_count or tracker.modified_entry_ids) and self.update_browsing_state(),
             )
         )
         QThreadPool.globalInstance().start(r)
 
+    def toggle_thumb_pregeneration(self):
+        if self.thumb_pregenerator is None:
+            self.start_thumb_pregeneration()
+        else:
+            self.thumb_pregenerator.cancel()
+
+    def start_thumb_pregeneration(self):
+        """Render the thumbnails of every entry into the cache in the background.
+
+        Threaded method.
+        """
+        if self.thumb_pregenerator is not None or self.cache_manager is None:
+            return
+
+        qt_renderer = QtFileRenderer(self.lib, self.settings, self.render_pool)
+        pregenerator = ThumbPregenerator(
+            self.lib,
+            qt_renderer.renderer,
+            self.cache_manager,
+            self.thumb_scheduler,
+            qt_renderer.theme,
+        )
+        if self.window_hidden:
+            pregenerator.pause()
+        self.thumb_pregenerator = pregenerator
+        self.main_window.menu_bar.pregenerate_thumbs_action.setText(
+            Translations["menu.tools.pregenerate_thumbs.stop"]
+        )
+
+        def show_progress(done: int):
+            if self.thumb_pregenerator is not pregenerator:
+                return
+            eta = pregenerator.eta
+            self.main_window.status_bar.showMessage(
+                Translations.format(
+                    "status.thumb_pregeneration.progress",
+                    done=f"{done:n}",
+                    total=f"{pregenerator.total:n}",
+                )
+                if eta is None
+                else Translations.format(
+                    "status.thumb_pregeneration.progress_eta",
+                    done=f"{done:n}",
+                    total=f"{pregenerator.total:n}",
+                    time_span=format_timespan(eta),
+                )
+            )
+
+        def finish():
+            # A job stopped by closing the library resumes when it's opened again.
+            if self.thumb_pregenerator is not pregenerator:
+                return
+            self.thumb_pregenerator = None
+            self.main_window.menu_bar.pregenerate_thumbs_action.setText(
+                Translations["menu.tools.pregenerate_thumbs"]
+            )
+            self.main_window.status_bar.showMessage(
+                Translations.format(
+                    "status.thumb_pregeneration.stopped",
+                    done=f"{pregenerator.done:n}",
+                    total=f"{pregenerator.total:n}",
+                )
+                if pregenerator.cancelled
+                else Translations.format(
+                    "status.thumb_pregeneration.done", count=f"{pregenerator.rendered:n}"
+                )
+            )
+
+        iterator = FunctionIterator(pregenerator.run)
+        iterator.value.connect(show_progress)
+        r = CustomRunnable(iterator.run)
+        r.done.connect(finish)
+        QThreadPool.globalInstance().start(r)
+
     def new_file_macros_runnable(self, new_ids):
         """Threaded method that runs macros on a set of Entry IDs."""
         # for i, id in enumerate(new_ids):
@@ -1407,11 +1540,8 @@ class QtDriver(DriverMixin, QObject):
 
     def update_thumbs(self):
         """Update search thumbnails."""
-        with self.thumb_job_queue.mutex:
-            # Cancels all thumb jobs waiting to be started
-            self.thumb_job_queue.queue.clear()
-            self.thumb_job_queue.all_tasks_done.notify_all()
-            self.thumb_job_queue.not_full.notify_all()
+        # Cancel the thumbnails of the previous results, but not the preview or background jobs
+        self.thumb_scheduler.cancel_all((RenderPriority.VISIBLE, RenderPriority.PREFETCH))
 
         page_size = (
             len(self.frame_content) if self.settings.infinite_scroll else self.settings.page_size
@@ -1707,6 +1837,7 @@ class QtDriver(DriverMixin, QObject):
         self.main_window.menu_bar.fix_unlinked_entries_action.setEnabled(True)
         self.main_window.menu_bar.fix_ignored_entries_action.setEnabled(True)
         self.main_window.menu_bar.fix_dupe_files_action.setEnabled(True)
+        self.main_window.menu_bar.pregenerate_thumbs_action.setEnabled(True)
         self.main_window.menu_bar.clear_thumb_cache_action.setEnabled(True)
         self.main_window.menu_bar.folders_to_tags_action.setEnabled(True)
         self.main_window.menu_bar.library_info_action.setEnabled(True)
@@ -1722,6 +1853,10 @@ class QtDriver(DriverMixin, QObject):
         self.update_browsing_state(initial_state)
 
         self.main_window.toggle_landing_page(enabled=False)
+
+        # Continue generating thumbnails if that was stopped by closing the library.
+        if ThumbPregenerator.can_resume(path):
+            self.start_thumb_pregeneration()
         return open_status
 
     def drop_event(self, event: QDropEvent):
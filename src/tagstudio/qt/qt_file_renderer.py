@@ -8,7 +8,10 @@ from PySide6.QtCore import QObject, QSize, Signal
 from PySide6.QtGui import QGuiApplication, QPixmap, Qt
 
 from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.previews.render_pool import RenderPool
+from tagstudio.previews.render_scheduler import CancelToken
 from tagstudio.qt.app_settings import AppSettings, Theme
 from tagstudio.qt.cache_manager import CacheManager
 
@@ -19,9 +22,11 @@ class QtFileRenderer(QObject):
     updated = Signal(float, QPixmap, QSize, Path)
     updated_ratio = Signal(float)
 
-    def __init__(self, library: Library, settings: AppSettings) -> None:
+    def __init__(
+        self, library: Library, settings: AppSettings, render_pool: RenderPool | None = None
+    ) -> None:
         super().__init__()
-        self.renderer = FileRenderer(library, settings)
+        self.renderer = FileRenderer(library, settings, render_pool)
         self.theme = (
             Theme.DARK
             if QGuiApplication.styleHints().colorScheme() is Qt.ColorScheme.Dark
@@ -37,8 +42,10 @@ class QtFileRenderer(QObject):
         pixel_ratio: float,
         is_loading: bool = False,
         is_thumb: bool = False,
+        cancel_token: CancelToken | None = None,
+        entry: Entry | None = None,
     ):
-
+        token = cancel_token or CancelToken()
         image, size, timestamp = self.renderer.render(
             cache=cache,
             timestamp=timestamp,
@@ -48,7 +55,10 @@ class QtFileRenderer(QObject):
             theme=self.theme,
             is_loading=is_loading,
             is_thumb=is_thumb,
+            cancel_token=token,
+            entry=entry,
         )
+        token.raise_if_cancelled()
         qim = ImageQt.ImageQt(image)
         pixmap = QPixmap.fromImage(qim)
         pixmap.setDevicePixelRatio(pixel_ratio)
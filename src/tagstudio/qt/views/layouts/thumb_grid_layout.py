@@ -5,8 +5,9 @@
 import math
 import time
 from collections.abc import Iterable
+from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, override
+from typing import TYPE_CHECKING, override
 
 from PySide6.QtCore import QPoint, QRect, QSize, Signal
 from PySide6.QtGui import QPixmap
@@ -16,12 +17,18 @@ from tagstudio.core.constants import TAG_ARCHIVED, TAG_FAVORITE
 from tagstudio.core.library.alchemy.enums import ItemType
 from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.core.utils.types import unwrap
+from tagstudio.previews.render_scheduler import RenderPriority
+from tagstudio.qt.app_settings import Theme
 from tagstudio.qt.mixed.item_thumb import BadgeType, ItemThumb
+from tagstudio.qt.pixmap_cache import PixmapCache
 from tagstudio.qt.qt_file_renderer import QtFileRenderer
 
 if TYPE_CHECKING:
     from tagstudio.qt.qt_driver import QtDriver
 
+# Path, modification time, base size, pixel ratio, theme
+type ThumbKey = tuple[Path, float | None, tuple[int, int], float, Theme]
+
 
 class ThumbGridLayout(QLayout):
     # Id of first visible entry
@@ -43,8 +50,14 @@ class ThumbGridLayout(QLayout):
         # Entry.id -> _items[index]
         self._entry_items: dict[int, int] = {}
 
-        self._render_results: dict[Path, Any] = {}
-        self._renderer: QtFileRenderer = QtFileRenderer(self.driver.lib, self.driver.settings)
+        # Rendered thumbnails, kept across searches.
+        self._thumbs: PixmapCache = PixmapCache(self.driver.settings.pixmap_cache_size)
+        # Thumbnails being rendered, and the key to cache them with.
+        self._pending: dict[Path, ThumbKey] = {}
+        self._loading_thumb: tuple[QPixmap, QSize] | None = None
+        self._renderer: QtFileRenderer = QtFileRenderer(
+            self.driver.lib, self.driver.settings, self.driver.render_pool
+        )
         self._renderer.updated.connect(self._on_rendered)
         self._render_cutoff: float = 0.0
 
@@ -65,27 +78,31 @@ class ThumbGridLayout(QLayout):
         self._entry_paths.clear()
 
         self._entry_items.clear()
-        self._render_results.clear()
-        self.driver.thumb_job_queue.queue.clear()
+        self._pending.clear()
+        self._loading_thumb = None
+        if getattr(self.driver.args, "debug", False):
+            self._thumbs.log_stats()
+        self.driver.thumb_scheduler.cancel_all((RenderPriority.VISIBLE, RenderPriority.PREFETCH))
         self._render_cutoff = time.time()
 
         base_size: tuple[int, int] = (
             self.driver.main_window.thumb_size,
             self.driver.main_window.thumb_size,
         )
-        self.driver.thumb_job_queue.put(
-            (
+        ratio = self.driver.main_window.devicePixelRatio()
+        self.driver.thumb_scheduler.submit(
+            (Path(), base_size, ratio),
+            RenderPriority.VISIBLE,
+            partial(
                 self._renderer.render,
-                (
-                    self.driver.cache_manager,
-                    self._render_cutoff,
-                    Path(),
-                    base_size,
-                    self.driver.main_window.devicePixelRatio(),
-                    True,
-                    True,
-                ),
-            )
+                self.driver.cache_manager,
+                self._render_cutoff,
+                Path(),
+                base_size,
+                ratio,
+                is_loading=True,
+                is_thumb=True,
+            ),
         )
 
         self._last_page_update = None
@@ -115,18 +132,28 @@ class ThumbGridLayout(QLayout):
         for tag_id, entries in tag_entries.items():
             self._tag_entries.setdefault(tag_id, set()).update(entries)
 
+    def _thumb_key(
+        self, entry: Entry, file_path: Path, base_size: tuple[int, int], ratio: float
+    ) -> ThumbKey:
+        mod_time = entry.date_modified.timestamp() if entry.date_modified else None
+        return (file_path, mod_time, base_size, ratio, self._renderer.theme)
+
     def _on_rendered(self, timestamp: float, image: QPixmap, size: QSize, file_path: Path):
         if timestamp < self._render_cutoff:
             return
-        self._render_results[file_path] = (timestamp, image, size, file_path)
 
         # If this is the loading image update all item_thumbs with pending thumbnails
         if file_path == Path():
+            self._loading_thumb = (image, size)
             for path, entry_id in self._entry_paths.items():
-                if self._render_results.get(path, None) is None:
+                if path in self._pending:
                     self._update_thumb(entry_id, image, size, file_path)
             return
 
+        key = self._pending.pop(file_path, None)
+        if key is None:
+            return
+        self._thumbs.put(key, image, size)
         if file_path not in self._entry_paths:
             return
         entry_id = self._entry_paths[file_path]
@@ -218,6 +245,7 @@ class ThumbGridLayout(QLayout):
 
         first_visible = self._entry_ids[start] if 0 <= start < len(self._entry_ids) else None
         self.visible_changed.emit(first_visible)
+        visible_start, visible_end = start, end
 
         # Load closest off screen rows
         start -= per_row * 3
@@ -228,16 +256,9 @@ class ThumbGridLayout(QLayout):
         if (start, end, per_row) == self._last_page_update:
             return
         self._last_page_update = (start, end, per_row)
-
-        # Clear render queue if len > 2 pages
-        if len(self.driver.thumb_job_queue.queue) > (per_row * visible_rows * 2):
-            self.driver.thumb_job_queue.queue.clear()
-            pending = []
-            for k, v in self._render_results.items():
-                if v is None and k != Path():
-                    pending.append(k)
-            for k in pending:
-                self._render_results.pop(k)
+        # Keep background thumbnail generation from competing with the grid while scrolling.
+        if self.driver.thumb_pregenerator is not None:
+            self.driver.thumb_pregenerator.notify_activity()
 
         # Reorder items so previously rendered rows will reuse same item_thumbs
         # When scrolling down top row gets moved to end of list
@@ -268,6 +289,8 @@ class ThumbGridLayout(QLayout):
             self.driver.main_window.thumb_size,
         )
         timestamp = time.time()
+        # Render jobs for the thumbnails in range, keyed by what they render.
+        render_keys: set[tuple[Path, tuple[int, int], float]] = {(Path(), base_size, ratio)}
         for item_index, i in enumerate(range(start, end)):
             entry_id = self._entry_ids[i]
             if entry_id not in self._entries:
@@ -286,32 +309,43 @@ class ThumbGridLayout(QLayout):
             file_path = unwrap(self.driver.lib.library_dir) / entry.path
             item_thumb.set_item(entry)
 
-            if result := self._render_results.get(file_path):
-                _t, im, s, p = result
-                if item_thumb.rendered_path == p:
+            key = self._thumb_key(entry, file_path, base_size, ratio)
+            if result := self._thumbs.get(key):
+                im, s = result
+                if item_thumb.rendered_path == file_path:
                     continue
-                self._update_thumb(entry_id, im, s, p)
+                self._update_thumb(entry_id, im, s, file_path)
             else:
-                if Path() in self._render_results:
-                    _t, im, s, p = self._render_results[Path()]
-                    self._update_thumb(entry_id, im, s, p)
-
-                if file_path not in self._render_results:
-                    self._render_results[file_path] = None
-                    self.driver.thumb_job_queue.put(
-                        (
-                            self._renderer.render,
-                            (
-                                self.driver.cache_manager,
-                                timestamp,
-                                file_path,
-                                base_size,
-                                ratio,
-                                False,
-                                True,
-                            ),
-                        )
-                    )
+                if self._loading_thumb is not None:
+                    im, s = self._loading_thumb
+                    self._update_thumb(entry_id, im, s, Path())
+
+                # Queue the thumbnail, or move it ahead if it was queued for prefetching
+                self._pending[file_path] = key
+                render_keys.add((file_path, base_size, ratio))
+                self.driver.thumb_scheduler.submit(
+                    (file_path, base_size, ratio),
+                    RenderPriority.VISIBLE
+                    if visible_start <= i < visible_end
+                    else RenderPriority.PREFETCH,
+                    partial(
+                        self._renderer.render,
+                        self.driver.cache_manager,
+                        timestamp,
+                        file_path,
+                        base_size,
+                        ratio,
+                        is_thumb=True,
+                        entry=entry,
+                    ),
+                )
+
+        # Cancel the thumbnails that were scrolled out of range, including ones being rendered
+        cancelled = self.driver.thumb_scheduler.cancel_all(
+            (RenderPriority.VISIBLE, RenderPriority.PREFETCH), keep=render_keys.__contains__
+        )
+        for render_key in cancelled:
+            self._pending.pop(render_key[0], None)  # pyright: ignore[reportIndexIssue]
 
         # set_selected causes stutters making thumbs after selected not show for a frame
         # setting it after positioning thumbs fixes this
@@ -245,6 +245,7 @@ class LibraryInfoWindowView(QWidget):
         self.cleanup_section_break_row: int = 3
         self.cleanup_legacy_json_row: int = 4
         self.cleanup_backups_row: int = 5
+        self.cleanup_refresh_report_row: int = 6
 
         # NOTE: Alternating rows for visual padding
         self.cleanup_labels_col: int = 0
@@ -327,6 +328,10 @@ class LibraryInfoWindowView(QWidget):
         self.legacy_json_label.setAlignment(cell_alignment)
         self.backups_label: QLabel = QLabel(Translations["library_info.cleanup.backups"])
         self.backups_label.setAlignment(cell_alignment)
+        self.refresh_report_label: QLabel = QLabel(
+            Translations["library_info.cleanup.refresh_report"]
+        )
+        self.refresh_report_label.setAlignment(cell_alignment)
 
         self.cleanup_grid_layout.addWidget(
             self.unlinked_label,
@@ -353,12 +358,18 @@ class LibraryInfoWindowView(QWidget):
             self.cleanup_backups_row,
             self.cleanup_labels_col,
         )
+        self.cleanup_grid_layout.addWidget(
+            self.refresh_report_label,
+            self.cleanup_refresh_report_row,
+            self.cleanup_labels_col,
+        )
 
         self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_unlinked_row, row_height)
         self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_ignored_row, row_height)
         self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_dupe_files_row, row_height)
         self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_legacy_json_row, row_height)
         self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_backups_row, row_height)
+        self.cleanup_grid_layout.setRowMinimumHeight(self.cleanup_refresh_report_row, row_height)
 
         self.unlinked_count_label: QLabel = QLabel()
         self.unlinked_count_label.setAlignment(cell_alignment)
@@ -370,6 +381,8 @@ class LibraryInfoWindowView(QWidget):
         self.legacy_json_status_label.setAlignment(cell_alignment)
         self.backups_count_label: QLabel = QLabel()
         self.backups_count_label.setAlignment(cell_alignment)
+        self.refresh_report_status_label: QLabel = QLabel()
+        self.refresh_report_status_label.setAlignment(cell_alignment)
 
         self.cleanup_grid_layout.addWidget(
             self.unlinked_count_label,
@@ -396,12 +409,18 @@ class LibraryInfoWindowView(QWidget):
             self.cleanup_backups_row,
             self.cleanup_values_col,
         )
+        self.cleanup_grid_layout.addWidget(
+            self.refresh_report_status_label,
+            self.cleanup_refresh_report_row,
+            self.cleanup_values_col,
+        )
 
         self.fix_unlinked_entries = QPushButton(Translations["menu.tools.fix_unlinked_entries"])
         self.fix_ignored_entries = QPushButton(Translations["menu.tools.fix_ignored_entries"])
         self.fix_dupe_files = QPushButton(Translations["menu.tools.fix_duplicate_files"])
         self.view_legacy_json_file = QPushButton(open_file_str())
         self.open_backups_folder = QPushButton(Translations["menu.file.open_backups_folder"])
+        self.view_refresh_report_file = QPushButton(open_file_str())
 
         self.cleanup_grid_layout.addWidget(
             self.fix_unlinked_entries,
@@ -428,6 +447,11 @@ class LibraryInfoWindowView(QWidget):
             self.cleanup_backups_row,
             self.cleanup_buttons_col,
         )
+        self.cleanup_grid_layout.addWidget(
+            self.view_refresh_report_file,
+            self.cleanup_refresh_report_row,
+            self.cleanup_buttons_col,
+        )
 
         self.body_layout.addSpacerItem(
             QSpacerItem(0, 0, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
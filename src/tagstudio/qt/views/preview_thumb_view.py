@@ -4,6 +4,7 @@
 
 import math
 import time
+from functools import partial
 from pathlib import Path
 from typing import TYPE_CHECKING, override
 
@@ -16,6 +17,7 @@ from tagstudio.core.library.alchemy.library import Library
 from tagstudio.core.media_types import MediaType
 from tagstudio.i18n.platform_strings import open_file_str, trash_term
 from tagstudio.i18n.translations import Translations
+from tagstudio.previews.render_scheduler import RenderPriority
 from tagstudio.qt.mixed.file_attributes import FileAttributeData
 from tagstudio.qt.mixed.media_player import MediaPlayer
 from tagstudio.qt.qt_file_renderer import QtFileRenderer
@@ -235,13 +237,21 @@ class PreviewThumbView(QWidget):
             math.ceil(self.__img_button_size[1] * THUMB_SIZE_FACTOR),
         )
 
+        # Only the latest preview is rendered, ahead of any grid thumbnails.
+        ratio = self.devicePixelRatio()
+        self._driver.thumb_scheduler.cancel_all((RenderPriority.PREVIEW,))
         # TODO: Make driver update the cache manager reference here instead of passing the driver.
-        self.__thumb_renderer.render(
-            self._driver.cache_manager,
-            time.time(),
-            filepath,
-            self.__rendered_res,
-            self.devicePixelRatio(),
+        self._driver.thumb_scheduler.submit(
+            (filepath, self.__rendered_res, ratio),
+            RenderPriority.PREVIEW,
+            partial(
+                self.__thumb_renderer.render,
+                self._driver.cache_manager,
+                time.time(),
+                filepath,
+                self.__rendered_res,
+                ratio,
+            ),
         )
 
     def __update_media_player(self, filepath: Path) -> None:
@@ -0,0 +1,283 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import itertools
+import os
+import shutil
+import sqlite3
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from tagstudio.core.constants import IGNORE_NAME, TS_FOLDER_NAME
+from tagstudio.core.library.ignore import Ignore, migrate_ext_list
+from tagstudio.core.library.ignore_matcher import IgnoreMatcher, sql_globs
+from tagstudio.core.utils.types import unwrap
+
+# Patterns paired with the paths they're tested against. Paths ending in "/" are directories.
+# The expected results follow Git's .gitignore semantics (see CONFORMANCE_EXPECTED).
+CONFORMANCE_CASES: list[tuple[list[str], list[str]]] = [
+    (["*.jpg"], ["a.jpg", "b/a.jpg", "a.png", "x.jpg/y.png", "b/c/d.JPG"]),
+    (["*", "!*.jpg"], ["a.jpg", "b/a.jpg", "a.png"]),
+    (["*", "!*/", "!*.jpg"], ["a.jpg", "b/a.jpg", "a.png", "b/c/a.png"]),
+    (["foo/"], ["foo/", "foo/a", "a/foo/b", "foo.txt", "bar/foo"]),
+    (["/foo"], ["foo/", "foo/a", "a/foo/", "a/foo/b"]),
+    (["doc/frotz/"], ["doc/frotz/a", "a/doc/frotz/a", "doc/frotz/"]),
+    (["a/**/b"], ["a/b", "a/x/b", "a/x/y/b", "a/xb", "b", "a/b/c"]),
+    (["**/foo"], ["foo", "x/foo", "x/y/foo/z"]),
+    (["**/foo/bar"], ["foo/bar", "x/foo/bar", "bar", "x/foo/bar/z"]),
+    (["abc/**"], ["abc/", "abc/x", "abc/x/y", "xabc/y"]),
+    (["Images/*"], ["Images/a.jpg", "Images/Mario/cat.jpg", "Images/"]),
+    (["IMG_????.png"], ["IMG_0001.png", "Photos/IMG_1234.png", "IMG_1.png"]),
+    (["Photos/20??/"], ["Photos/2000/a", "Photos/1995/a", "Photos/2000/"]),
+    (["IMG_[0-9]", "draft_[!abc]"], ["IMG_0", "IMG_a", "draft_a", "draft_d", "x/IMG_7"]),
+    (["\\#hash.jpg", "\\!wow.jpg", "#comment"], ["#hash.jpg", "!wow.jpg", "#comment"]),
+    (["*.jpg", "!Photos/*.jpg"], ["a.jpg", "Photos/a.jpg", "Photos/x/a.jpg"]),
+    (
+        ["Minecraft/**/Metadata", "Minecraft/Website", "!Minecraft/Website/*.png"],
+        [
+            "Minecraft/a/Metadata",
+            "Minecraft/Metadata/x",
+            "Minecraft/Website/a.png",
+            "Minecraft/Website/a.css",
+        ],
+    ),
+    (["build", "!build/keep"], ["build/keep", "build/x"]),
+    (
+        ["*.txt", "!important.txt", "dir/important.txt"],
+        ["a.txt", "important.txt", "dir/important.txt", "x/dir/important.txt"],
+    ),
+    (["a**b", "***/c", "d/***"], ["axyb", "a/b", "ab", "x/c", "c", "d/e", "d/e/f", "d/"]),
+    (["[]a]x", "[!]a]y"], ["]x", "ax", "bx", "]y", "by"]),
+    (["foo/*/bar"], ["foo/x/bar", "foo/x/y/bar", "foo/bar"]),
+    (["/*.c"], ["cat-file.c", "mozilla-sha1/sha1.c"]),
+    (
+        [".Trash-*", "._*", "$RECYCLE.BIN"],
+        [".Trash-1000/x", "._foo.jpg", "a/._b", "$RECYCLE.BIN/y"],
+    ),
+]
+
+# Results from `git check-ignore` for each path in CONFORMANCE_CASES.
+CONFORMANCE_EXPECTED: list[list[bool]] = [
+    [True, True, False, True, False],
+    [False, True, True],
+    [False, False, True, True],
+    [True, True, True, False, False],
+    [True, True, False, False],
+    [True, False, True],
+    [True, True, True, False, False, True],
+    [True, True, True],
+    [True, True, False, True],
+    [False, True, True, False],
+    [True, True, False],
+    [True, True, False],
+    [True, False, True],
+    [True, False, False, True, True],
+    [True, True, False],
+    [True, False, True],
+    [True, True, True, True],
+    [True, True],
+    [True, False, True, False],
+    [True, False, True, True, True, True, True, False],
+    [True, True, False, False, True],
+    [True, False, False],
+    [True, False],
+    [True, True, True, True],
+]
+
+
+def _iter_cases():
+    for (patterns, paths), expected in zip(CONFORMANCE_CASES, CONFORMANCE_EXPECTED, strict=True):
+        for path, is_ignored in zip(paths, expected, strict=True):
+            yield patterns, path, is_ignored
+
+
+@pytest.mark.parametrize(["patterns", "path", "is_ignored"], list(_iter_cases()))
+def test_matcher_conformance(patterns: list[str], path: str, is_ignored: bool):
+    matcher = IgnoreMatcher(patterns)
+    assert matcher.match(path.rstrip("/"), is_dir=path.endswith("/")) == is_ignored
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="Git is not installed")
+@pytest.mark.parametrize(["patterns", "paths"], CONFORMANCE_CASES)
+def test_matcher_matches_git(patterns: list[str], paths: list[str]):
+    with TemporaryDirectory() as tmp_dir:
+        repo = Path(tmp_dir)
+        subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+        (repo / ".gitignore").write_text("\n".join(patterns) + "\n")
+
+        # Create every path, along with its parent directories.
+        kinds: dict[str, bool] = {}
+        for path in paths:
+            parts = path.rstrip("/").split("/")
+            for i in range(1, len(parts)):
+                kinds["/".join(parts[:i])] = True
+            kinds.setdefault(path.rstrip("/"), path.endswith("/"))
+        for path, is_dir in kinds.items():
+            if is_dir:
+                (repo / path).mkdir(parents=True, exist_ok=True)
+            else:
+                (repo / path).parent.mkdir(parents=True, exist_ok=True)
+                (repo / path).touch()
+
+        result = subprocess.run(
+            ["git", "check-ignore", "--no-index", "--verbose", "--non-matching", "--stdin"],
+            cwd=repo,
+            input="\n".join(kinds) + "\n",
+            capture_output=True,
+            text=True,
+        )
+
+        matcher = IgnoreMatcher(patterns)
+        for line in result.stdout.splitlines():
+            info, path = line.split("\t")
+            pattern = info.split(":", 2)[2]
+            git_ignored = pattern != "" and not pattern.startswith("!")
+            assert matcher.match(path, is_dir=kinds[path]) == git_ignored, (patterns, path)
+
+
+def test_matcher_walk_prunes_ignored_dirs():
+    with TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        (root / "keep" / "nested").mkdir(parents=True)
+        (root / "skip").mkdir()
+        (root / "keep" / "a.png").touch()
+        (root / "keep" / "nested" / "b.png").touch()
+        (root / "keep" / "c.txt").touch()
+        (root / "skip" / "d.png").touch()
+
+        matcher = IgnoreMatcher(["skip/", "*.txt"])
+        os.chmod(root / "skip", 0)
+        try:
+            # The ignored directory is never read, so its permissions don't matter.
+            assert set(matcher.walk(root)) == {Path("keep/a.png"), Path("keep/nested/b.png")}
+        finally:
+            os.chmod(root / "skip", 0o755)
+
+
+def test_matcher_walk_dirs_resume():
+    with TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        for rel_dir in ["b/y", "b/x", "b", "a", "c"]:
+            (root / rel_dir).mkdir(parents=True, exist_ok=True)
+            (root / rel_dir / "file.txt").touch()
+        (root / "file.txt").touch()
+
+        matcher = IgnoreMatcher([])
+        walked = [rel_dir for rel_dir, _ in matcher.walk_dirs(root)]
+        assert walked == ["", "a", "b", "b/x", "b/y", "c"]
+
+        for i, rel_dir in enumerate(walked):
+            resumed = list(matcher.walk_dirs(root, after=rel_dir))
+            assert [d for d, _ in resumed] == walked[i + 1 :]
+            for d, files in resumed:
+                assert files == [Path(d) / "file.txt"]
+
+
+@pytest.mark.parametrize(
+    ["pattern", "is_simple"],
+    [
+        ("*.jpg", True),
+        ("*.jpg/", True),
+        ("._*", True),
+        ("._*/", True),
+        (".DS_Store", True),
+        ("cache/", True),
+        ("/foo", True),
+        ("/foo/", True),
+        ("foo/bar", True),
+        ("x[1]", False),
+        ("a?c", False),
+        ("*a*", False),
+        ("foo*bar", False),
+        ("/a*", False),
+        ("!*.jpg", False),
+    ],
+)
+def test_sql_globs_match_matcher(pattern: str, is_simple: bool):
+    globs = sql_globs(pattern)
+    assert (globs is not None) == is_simple
+    if globs is None:
+        return
+
+    names = ["a", "ab", ".jpg", "x.jpg", "._x", "cache", ".DS_Store", "foo", "bar", "[*]"]
+    matcher = IgnoreMatcher([pattern])
+    with sqlite3.connect(":memory:") as db:
+        for depth in range(1, 4):
+            for parts in itertools.product(names, repeat=depth):
+                path = "/".join(parts)
+                sql_match = any(
+                    db.execute("SELECT ? GLOB ?", (path, glob)).fetchone()[0] for glob in globs
+                )
+                assert sql_match == matcher.match(path), path
+
+
+def test_split_sql_globs_keeps_complex_patterns():
+    split = IgnoreMatcher(["*.jpg", "foo*bar"]).split_sql_globs()
+    assert split is not None
+    globs, remaining = split
+    assert globs == ["*.jpg", "*.jpg/*"]
+    assert remaining is not None
+    assert remaining.match("fooXbar")
+    assert not remaining.match("a.jpg")
+
+
+@pytest.mark.parametrize("is_exclude_list", [True, False])
+def test_migrated_ext_list(is_exclude_list: bool):
+    matcher = IgnoreMatcher(migrate_ext_list([".jpg", "png"], is_exclude_list).splitlines())
+    assert matcher.match(Path("a/b/c.jpg")) == is_exclude_list
+    assert matcher.match(Path("a/c.png")) == is_exclude_list
+    assert matcher.match(Path("a/c.txt")) != is_exclude_list
+    assert not matcher.match(Path("a/b"), is_dir=True)
+
+
+def test_ignore_patterns_cached_by_mtime():
+    with TemporaryDirectory() as tmp_dir:
+        library_dir = Path(tmp_dir)
+        (library_dir / TS_FOLDER_NAME).mkdir()
+        ts_ignore = library_dir / TS_FOLDER_NAME / IGNORE_NAME
+        ts_ignore.write_text("*.jpg\n")
+
+        Ignore.get_patterns(library_dir)
+        matcher = Ignore.compiled_patterns
+        assert matcher is not None
+        assert matcher.match(Path("a.jpg"))
+        assert matcher.match(Path(TS_FOLDER_NAME), is_dir=True)
+
+        # The same matcher is reused while the file is unchanged.
+        Ignore.get_patterns(library_dir)
+        assert Ignore.compiled_patterns is matcher
+
+        ts_ignore.write_text("*.png\n")
+        st = ts_ignore.stat()
+        os.utime(ts_ignore, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        Ignore.get_patterns(library_dir)
+        assert Ignore.compiled_patterns is not matcher
+        assert not Ignore.compiled_patterns.match(Path("a.jpg"))
+        assert Ignore.compiled_patterns.match(Path("a.png"))
+
+
+def test_legacy_include_list_is_translated():
+    with TemporaryDirectory() as tmp_dir:
+        library_dir = Path(tmp_dir)
+        (library_dir / TS_FOLDER_NAME).mkdir()
+        ts_ignore = library_dir / TS_FOLDER_NAME / IGNORE_NAME
+        ts_ignore.write_text("# Include list\n*\n!*.jpg\n")
+
+        # Files in subfolders are kept, like in older versions, without changing the file.
+        Ignore.get_patterns(library_dir)
+        matcher = unwrap(Ignore.compiled_patterns)
+        assert not matcher.match(Path("a/b.jpg"))
+        assert matcher.match(Path("a/b.png"))
+        assert ts_ignore.read_text() == "# Include list\n*\n!*.jpg\n"
+
+        # Subfolders can still be ignored explicitly.
+        ts_ignore.write_text("*\n!*.jpg\n*/\n")
+        st = ts_ignore.stat()
+        os.utime(ts_ignore, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        Ignore.get_patterns(library_dir)
+        assert unwrap(Ignore.compiled_patterns).match(Path("a/b.jpg"))
+        assert not unwrap(Ignore.compiled_patterns).match(Path("b.jpg"))
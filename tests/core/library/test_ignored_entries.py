@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from tagstudio.core.constants import IGNORE_NAME, TS_FOLDER_NAME
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.library.alchemy.registries import ignored_registry
+from tagstudio.core.library.alchemy.registries.ignored_registry import IgnoredRegistry
+from tagstudio.core.library.ignore import Ignore
+from tagstudio.core.utils.types import unwrap
+
+PATHS = [
+    "photo.jpg",
+    "album/photo.jpg",
+    "album/notes.txt",
+    "._photo.png",
+    "cache/thumb.png",
+    "album/cache/thumb.png",
+    "raw/IMG_0001.cr2",
+    "raw/IMG_0002.cr2",
+]
+
+
+@pytest.mark.parametrize(
+    ["ts_ignore", "ignored"],
+    [
+        # Only simple patterns, matched entirely in SQL
+        (
+            "*.jpg\ncache/\n/raw\n",
+            {
+                "photo.jpg",
+                "album/photo.jpg",
+                "cache/thumb.png",
+                "album/cache/thumb.png",
+                "raw/IMG_0001.cr2",
+                "raw/IMG_0002.cr2",
+            },
+        ),
+        # A mix of simple and complex patterns
+        ("*.jpg\nIMG_???1.*\n", {"photo.jpg", "album/photo.jpg", "raw/IMG_0001.cr2"}),
+        # Negated patterns, matched entirely in Python
+        ("*.jpg\n!album/*.jpg\n", {"photo.jpg"}),
+    ],
+)
+@pytest.mark.parametrize("use_pool", [False, True])
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_refresh_ignored_entries(
+    library: Library,
+    ts_ignore: str,
+    ignored: set[str],
+    use_pool: bool,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / TS_FOLDER_NAME).mkdir(exist_ok=True)
+    (library_dir / TS_FOLDER_NAME / IGNORE_NAME).write_text(ts_ignore)
+    # The library directory is shared between cases, so don't rely on the mtime changing.
+    monkeypatch.setattr(Ignore, "_last_loaded", None)
+    library.remove_entries([entry.id for entry in library.all_entries()])
+    library.add_entries([Entry(path=Path(path), fields=[]) for path in PATHS])
+    if use_pool:
+        monkeypatch.setattr(ignored_registry, "MIN_POOL_ENTRIES", 0)
+        monkeypatch.setattr(ignored_registry, "CHUNK_SIZE", 3)
+
+    registry = IgnoredRegistry(lib=library)
+    list(registry.refresh_ignored_entries(max_workers=None if use_pool else 1))
+
+    # Global patterns (e.g. "._*") always apply
+    assert {path.as_posix() for _, path in registry.ignored_entries} == ignored | {"._photo.png"}
+
+    registry.remove_ignored_entries()
+    assert {entry.path.as_posix() for entry in library.all_entries()} == set(PATHS) - ignored - {
+        "._photo.png"
+    }
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_refresh_ignored_entries_streams_chunks(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / TS_FOLDER_NAME).mkdir(exist_ok=True)
+    (library_dir / TS_FOLDER_NAME / IGNORE_NAME).write_text("*.jpg\n!keep.jpg\n")
+    monkeypatch.setattr(Ignore, "_last_loaded", None)
+    monkeypatch.setattr(ignored_registry, "MIN_POOL_ENTRIES", 0)
+    monkeypatch.setattr(ignored_registry, "CHUNK_SIZE", 2)
+
+    read: list[int] = []
+
+    def all_entry_paths():
+        for i in range(100):
+            read.append(i)
+            yield i, Path(f"{i}.jpg")
+
+    monkeypatch.setattr(library, "all_entry_paths", all_entry_paths)
+    registry = IgnoredRegistry(lib=library)
+    progress = registry.refresh_ignored_entries(max_workers=2)
+
+    # Progress starts before the whole library has been read.
+    assert next(progress) == 2
+    max_in_flight = 2 * ignored_registry.MAX_PENDING_CHUNKS_PER_WORKER
+    assert len(read) <= max_in_flight * 2
+    assert list(progress)[-1] == 100
+    assert registry.ignored_count == 100
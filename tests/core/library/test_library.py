@@ -8,14 +8,23 @@ from tempfile import TemporaryDirectory
 
 import pytest
 import structlog
+from sqlalchemy.exc import OperationalError
 
+from tagstudio.core.library.alchemy import library as library_module
 from tagstudio.core.library.alchemy.enums import BrowsingState
 from tagstudio.core.library.alchemy.fields import (
     DatetimeField,
     TextField,
 )
 from tagstudio.core.library.alchemy.library import Library
-from tagstudio.core.library.alchemy.models import Entry, Tag, TagAlias
+from tagstudio.core.library.alchemy.models import (
+    Entry,
+    EntryHash,
+    Tag,
+    TagAlias,
+    TextEncoding,
+    VideoProbe,
+)
 from tagstudio.core.utils.types import unwrap
 
 logger = structlog.get_logger()
@@ -85,6 +94,112 @@ def test_library_add_file(library: Library):
     assert library.has_entry_with_path(entry.path)
 
 
+def test_library_video_probe(library: Library):
+    library_dir = unwrap(library.library_dir)
+    video_path = library_dir / "clip.mp4"
+    video_path.write_bytes(b"abc")
+    (entry_id,) = library.add_entries([Entry(path=Path("clip.mp4"), fields=[])])
+
+    assert library.get_video_probe(Path("clip.mp4")) is None
+    library.save_video_probe(
+        Path("clip.mp4"), VideoProbe(is_readable=True, codec="h264", width=640, height=360)
+    )
+    probe = unwrap(library.get_video_probe(Path("clip.mp4")))
+    assert probe.entry_id == entry_id
+    assert (probe.codec, probe.width, probe.height) == ("h264", 640, 360)
+
+    # Probes of files that changed since they were probed are stale.
+    video_path.write_bytes(b"abcdef")
+    assert library.get_video_probe(Path("clip.mp4")) is None
+
+    # Files that aren't entries aren't stored.
+    (library_dir / "other.mp4").write_bytes(b"abc")
+    library.save_video_probe(Path("other.mp4"), VideoProbe(is_readable=False))
+    assert library.get_video_probe(Path("other.mp4")) is None
+
+
+def test_library_video_probe_locked(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "locked.mp4").write_bytes(b"abc")
+    library.add_entries([Entry(path=Path("locked.mp4"), fields=[])])
+
+    class LockedSession:
+        def __init__(self, *args: object, **kwargs: object) -> None:
+            raise OperationalError("SELECT", None, Exception("database is locked"))
+
+    # Render threads treat a locked database like a stale probe, instead of dying.
+    monkeypatch.setattr(library_module, "Session", LockedSession)
+    assert library.get_video_probe(Path("locked.mp4")) is None
+    library.save_video_probe(Path("locked.mp4"), VideoProbe(is_readable=False))
+
+
+def test_library_text_encoding(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "notes.txt").write_text("abc")
+    library.add_entries([Entry(path=Path("notes.txt"), fields=[])])
+
+    library.save_text_encoding(Path("notes.txt"), TextEncoding("ascii"))
+    assert unwrap(library.get_text_encoding(Path("notes.txt"))).encoding == "ascii"
+
+    (library_dir / "notes.txt").write_text("abcdef")
+    assert library.get_text_encoding(Path("notes.txt")) is None
+
+
+def test_library_perceptual_hash_batches(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    paths = [Path(f"image_{i}.png") for i in range(3)]
+    for path in paths:
+        (library_dir / path).write_bytes(b"abc")
+    ids = library.add_entries([Entry(path=path, fields=[]) for path in paths])
+
+    commits: list[int] = []
+    write = library._Library__write_perceptual_hashes  # pyright: ignore[reportAttributeAccessIssue]
+
+    def spy(pending: dict[Path, tuple[str, int, int]]) -> None:
+        commits.append(len(pending))
+        write(pending)
+
+    monkeypatch.setattr(library, "_Library__write_perceptual_hashes", spy)
+    monkeypatch.setattr(library_module, "PERCEPTUAL_HASH_BATCH_SIZE", 2)
+    library.save_perceptual_hash(paths[0], "00000000000000ff")
+    assert commits == []
+    library.save_perceptual_hash(paths[1], "00000000000000fe")
+    assert commits == [2]
+
+    # Pending hashes are written before similar images are looked up.
+    library.save_perceptual_hash(paths[2], "ff00000000000000")
+    assert library.get_similar_entry_ids(ids[0]) == [ids[0], ids[1]]
+    assert commits == [2, 1]
+    assert library.get_similar_entry_ids(ids[2]) == [ids[2]]
+
+
+def test_library_perceptual_hash_upsert(library: Library):
+    library_dir = unwrap(library.library_dir)
+    paths = [Path("same.png"), Path("changed.png")]
+    for path in paths:
+        (library_dir / path).write_bytes(b"abc")
+    same_id, changed_id = library.add_entries([Entry(path=path, fields=[]) for path in paths])
+    library.save_perceptual_hash(paths[0], "00000000000000ff")
+    library.save_perceptual_hash(paths[1], "00000000000000fe")
+
+    # A hash scan stores rows for the same entries before the pending hashes are written.
+    st = (library_dir / paths[0]).stat()
+    library.save_entry_hashes(
+        [
+            EntryHash(same_id, st.st_size, st.st_mtime_ns, "partial", "content"),
+            EntryHash(changed_id, 1, 1, "partial", "content"),
+        ]
+    )
+    library.flush_perceptual_hashes()
+
+    hashes = library.all_entry_hashes()
+    assert hashes[same_id].perceptual_hash == "00000000000000ff"
+    assert hashes[same_id].content_hash == "content"
+    assert hashes[changed_id].perceptual_hash == "00000000000000fe"
+    assert hashes[changed_id].content_hash is None
+    assert hashes[changed_id].size == 3
+
+
 def test_create_tag(library: Library, generate_tag: Callable[..., Tag]):
     # tag already exists
     assert library.add_tag(generate_tag("foo", id=1000)) is None
@@ -323,6 +438,7 @@ def test_merge_entries(library: Library):
         fields=[
             TextField(name="Author", value="Author McAuthorson"),
             TextField(name="Description", value="test description", is_multiline=True),
+            TextField(name="Notes", value="test note", is_multiline=True),
         ],
     )
     entry_b = Entry(
@@ -330,6 +446,7 @@ def test_merge_entries(library: Library):
         fields=[TextField(name="Notes", value="test note", is_multiline=True)],
     )
     entry_a_id, entry_b_id = library.add_entries([entry_a, entry_b])
+    library.save_entry_hashes([EntryHash(entry_a_id, 3, 0, None, None, "00000000000000ff")])
 
     library.add_tags_to_entries(entry_a_id, [tag_0.id, tag_2.id])
     library.add_tags_to_entries(entry_b_id, [tag_1.id])
@@ -346,7 +463,10 @@ def test_merge_entries(library: Library):
     fields = [field.value for field in entry_b_merged.fields]
     assert "Author McAuthorson" in fields
     assert "test description" in fields
-    assert "test note" in fields
+    # Fields both entries have aren't duplicated.
+    assert fields.count("test note") == 1
+    # The stored hashes of the merged entry's file are removed with it.
+    assert entry_a_id not in library.all_entry_hashes()
     b_tags = [t.id for t in entry_b_merged.tags]
     assert tag_0.id in b_tags
     assert tag_1.id in b_tags
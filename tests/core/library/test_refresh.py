@@ -2,14 +2,18 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import os
+from datetime import datetime
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pytest
 
-from tagstudio.core.constants import IGNORE_NAME
+from tagstudio.core.constants import IGNORE_NAME, REFRESH_CHECKPOINT_NAME, TS_FOLDER_NAME
+from tagstudio.core.library import refresh
 from tagstudio.core.library.alchemy.library import Library
 from tagstudio.core.library.refresh import RefreshTracker
+from tagstudio.core.library.refresh_report import load_refresh_reports
 from tagstudio.core.utils.types import unwrap
 
 CWD = Path(__file__).parent
@@ -48,3 +52,161 @@ def test_refresh_multi_byte_filenames(library: Library):
     assert Path("em–dash.txt") in registry.files_not_in_library
     assert Path("apostrophe’.txt") in registry.files_not_in_library
     assert Path("umlaute äöü.txt") in registry.files_not_in_library
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_save_new_files(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "new").mkdir()
+    (library_dir / "new" / "a.PNG").touch()
+
+    registry = RefreshTracker(library=library)
+    # "foo.txt" is already in the library, and "new/missing.jpg" can't be read.
+    registry.files_not_in_library = [Path("new/a.PNG"), Path("foo.txt"), Path("new/missing.jpg")]
+    list(registry.save_new_files())
+
+    assert len(registry.new_entry_ids) == 2
+    assert registry.files_not_in_library == []
+
+    entries = {e.path: e for e in library.get_entries(registry.new_entry_ids)}
+    added = entries[Path("new/a.PNG")]
+    assert added.filename == "a.PNG"
+    assert added.suffix == "png"
+    assert added.date_added is not None
+    assert added.date_modified == datetime.fromtimestamp(
+        (library_dir / "new" / "a.PNG").stat().st_mtime
+    )
+    assert entries[Path("new/missing.jpg")].date_modified is None
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_refresh_resume_after_cancel(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    library.included_files.clear()
+    for rel_dir in ["a", "b", "c"]:
+        (library_dir / rel_dir).mkdir()
+        (library_dir / rel_dir / f"{rel_dir}.png").touch()
+    (library_dir / "b" / "b2.png").touch()
+    # Save a checkpoint after every directory, and yield progress before every file.
+    monkeypatch.setattr(refresh, "CHECKPOINT_INTERVAL", 0)
+    clock = iter(range(1_000_000))
+    monkeypatch.setattr(refresh, "time", lambda: next(clock))
+
+    registry = RefreshTracker(library=library)
+    for count in registry.refresh_dir(library_dir, force_internal_tools=True):
+        # Cancel partway through the second directory.
+        if count == 2:
+            registry.cancel()
+    assert registry.cancelled
+    assert registry.files_not_in_library == [Path("a/a.png")]
+
+    # Files added to directories that were already scanned aren't found again.
+    (library_dir / "a" / "skipped.png").touch()
+
+    # The files of the cancelled directory are found again in the same session.
+    resumed = RefreshTracker(library=library)
+    list(resumed.refresh_dir(library_dir, force_internal_tools=True))
+    assert set(resumed.files_not_in_library) == {
+        Path("a/a.png"),
+        Path("b/b.png"),
+        Path("b/b2.png"),
+        Path("c/c.png"),
+    }
+
+    # Saving is cancelled before the first batch, and resumed without scanning again.
+    resumed.cancel()
+    assert list(resumed.save_new_files()) == []
+    assert resumed.new_entry_ids == []
+
+    saved = RefreshTracker(library=library)
+    list(saved.refresh_dir(library_dir, force_internal_tools=True))
+    assert Path("a/skipped.png") not in saved.files_not_in_library
+    list(saved.save_new_files())
+    assert len(saved.new_entry_ids) == 4
+    assert not (library_dir / TS_FOLDER_NAME / REFRESH_CHECKPOINT_NAME).exists()
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_refresh_report(library: Library):
+    library_dir = unwrap(library.library_dir)
+    library.included_files.clear()
+    (library_dir / TS_FOLDER_NAME).mkdir(exist_ok=True)
+    (library_dir / "new").mkdir()
+    (library_dir / "new" / "a.png").touch()
+    (library_dir / "new" / "b.png").touch()
+
+    registry = RefreshTracker(library=library)
+    list(registry.refresh_dir(library_dir, force_internal_tools=True))
+    # The report is saved once the new files are.
+    assert load_refresh_reports(library_dir) == []
+    list(registry.save_new_files())
+
+    reports = load_refresh_reports(library_dir)
+    assert len(reports) == 1
+    report = reports[0]
+    assert report.backend == "internal"
+    assert not report.cancelled
+    assert report.phases["listing"].files == report.phases["diffing"].files
+    assert report.files_scanned >= 2
+    assert report.phases["stat"].files == 2
+    assert report.phases["inserting"].files == 2
+    assert report.db_round_trips > 0
+    assert report.total_seconds > 0
+    assert "process_peak_memory" in report.to_dict()
+
+    # Reports of later refreshes are added after the earlier ones.
+    registry = RefreshTracker(library=library)
+    list(registry.refresh_dir(library_dir, force_internal_tools=True))
+    list(registry.save_new_files())
+    reports = load_refresh_reports(library_dir)
+    assert len(reports) == 2
+    assert reports[1].phases["inserting"].files == 0
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_update_modified_dates(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "a.txt").write_text("a")
+    (library_dir / "b.txt").write_text("b")
+    registry = RefreshTracker(library=library)
+    registry.files_not_in_library = [Path("a.txt"), Path("b.txt")]
+    list(registry.save_new_files())
+    # New entries already have the current modification dates.
+    assert registry.modified_entry_ids == []
+    a_id, b_id = registry.new_entry_ids
+
+    st = (library_dir / "a.txt").stat()
+    os.utime(library_dir / "a.txt", ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    registry = RefreshTracker(library=library)
+    list(registry.save_new_files())
+
+    assert registry.modified_entry_ids == [a_id]
+    a, b = library.get_entries([a_id, b_id])
+    assert a.date_modified == datetime.fromtimestamp((library_dir / "a.txt").stat().st_mtime)
+    assert b.date_modified == datetime.fromtimestamp((library_dir / "b.txt").stat().st_mtime)
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_update_modified_dates_reuses_scan(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "a.txt").write_text("a")
+    registry = RefreshTracker(library=library)
+    registry.files_not_in_library = [Path("a.txt")]
+    list(registry.save_new_files())
+    (a_id,) = registry.new_entry_ids
+
+    st = (library_dir / "a.txt").stat()
+    os.utime(library_dir / "a.txt", ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    registry = RefreshTracker(library=library)
+    list(registry.refresh_dir(library_dir, force_internal_tools=True))
+
+    # Files that were visited by the scan aren't read again, unlike the missing files of the
+    # fixture's entries.
+    stats: list[Path] = []
+    monkeypatch.setattr(refresh, "_stat", lambda path: stats.append(path))
+    list(registry.save_new_files())
+    assert stats
+    assert library_dir / "a.txt" not in stats
+    assert registry.modified_entry_ids == [a_id]
+    (a,) = library.get_entries([a_id])
+    assert a.date_modified == datetime.fromtimestamp((library_dir / "a.txt").stat().st_mtime)
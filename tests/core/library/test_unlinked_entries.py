@@ -2,13 +2,17 @@
 # SPDX-License-Identifier: GPL-3.0-only
 
 
+import os
+from datetime import datetime
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pytest
 
 from tagstudio.core.library.alchemy.enums import BrowsingState
+from tagstudio.core.library.alchemy.fields import TextField
 from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry, EntryHash
 from tagstudio.core.library.alchemy.registries.unlinked_registry import UnlinkedRegistry
 from tagstudio.core.utils.types import unwrap
 
@@ -36,3 +40,96 @@ def test_refresh_unlinked_entries(library: Library):
     results = library.search_library(BrowsingState.from_path("bar.md"), page_size=500)
     entries = library.get_entries(results.ids)
     assert entries[0].path == Path("bar.md")
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_refresh_unlinked_entries_by_directory(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "linked" / "folder").mkdir(parents=True)
+    (library_dir / "linked" / "a.png").touch()
+    library.add_entries(
+        [
+            Entry(path=Path("linked/a.png"), fields=[]),
+            Entry(path=Path("linked/b.png"), fields=[]),
+            Entry(path=Path("linked/folder"), fields=[]),
+            Entry(path=Path("missing/c.png"), fields=[]),
+            Entry(path=Path("missing/d.png"), fields=[]),
+        ]
+    )
+
+    # Entries in missing directories are unlinked without checking each file.
+    checked: list[Path] = []
+    isfile = os.path.isfile
+    monkeypatch.setattr(os.path, "isfile", lambda p: checked.append(Path(p)) or isfile(p))
+
+    registry = UnlinkedRegistry(lib=library)
+    list(registry.refresh_unlinked_files(max_workers=2))
+
+    unlinked = {entry.path for entry in registry.unlinked_entries}
+    assert Path("linked/a.png") not in unlinked
+    assert {
+        Path("linked/b.png"),
+        Path("linked/folder"),
+        Path("missing/c.png"),
+        Path("missing/d.png"),
+    } <= unlinked
+    assert not any(p.parent.name == "missing" for p in checked)
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_fix_unlinked_entries_in_batch(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "a").mkdir()
+    (library_dir / "b").mkdir()
+    (library_dir / "a" / "x.png").write_bytes(b"abc")
+    (library_dir / "b" / "x.png").write_bytes(b"abcde")
+    (library_dir / "c.png").touch()
+
+    moved_id, merged_id, existing_id = library.add_entries(
+        [
+            Entry(path=Path("old/x.png"), fields=[]),
+            Entry(path=Path("old/c.png"), fields=[TextField(name="Title", value="C")]),
+            Entry(path=Path("c.png"), fields=[]),
+        ]
+    )
+    library.add_tags_to_entries(merged_id, 1000)
+
+    # The file's last known size tells which of the "x.png" files it is.
+    st = (library_dir / "b" / "x.png").stat()
+    library.save_entry_hashes([EntryHash(moved_id, st.st_size, st.st_mtime_ns)])
+
+    registry = UnlinkedRegistry(lib=library)
+    list(registry.refresh_unlinked_files())
+    list(registry.fix_unlinked_entries())
+
+    assert unwrap(library.get_entry(moved_id)).path == Path("b/x.png")
+
+    # The moved entry is merged into the entry that already has its new path.
+    assert library.get_entry(merged_id) is None
+    existing = unwrap(library.get_entry_full(existing_id))
+    assert {tag.id for tag in existing.tags} == {1000}
+    assert [field.value for field in existing.fields] == ["C"]
+    assert registry.files_fixed_count == 2
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_fix_unlinked_entries_by_modified_date(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "a").mkdir()
+    (library_dir / "b").mkdir()
+    (library_dir / "a" / "x.png").write_bytes(b"abc")
+    (library_dir / "b" / "x.png").write_bytes(b"abc")
+    st = (library_dir / "b" / "x.png").stat()
+    os.utime(library_dir / "b" / "x.png", ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+    # Without hashes, the modification date stored with the entry tells the files apart.
+    date_modified = datetime.fromtimestamp((library_dir / "b" / "x.png").stat().st_mtime)
+    (moved_id,) = library.add_entries(
+        [Entry(path=Path("old/x.png"), fields=[], date_modified=date_modified)]
+    )
+
+    registry = UnlinkedRegistry(lib=library)
+    list(registry.refresh_unlinked_files())
+    list(registry.fix_unlinked_entries())
+
+    assert unwrap(library.get_entry(moved_id)).path == Path("b/x.png")
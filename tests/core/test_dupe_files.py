@@ -3,11 +3,17 @@
 
 
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
+import pytest
+from PIL import Image
+
+from tagstudio.core.library.alchemy.enums import BrowsingState
 from tagstudio.core.library.alchemy.fields import BaseField, TextField
 from tagstudio.core.library.alchemy.library import Library
 from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.core.library.alchemy.registries.dupe_files_registry import DupeFilesRegistry
+from tagstudio.core.utils.types import unwrap
 
 CWD = Path(__file__).parent
 
@@ -41,3 +47,81 @@ def test_refresh_dupe_files(library: Library):
         Path("foo.txt"),
         Path("foo/foo.txt"),
     ]
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_scan_dupe_files(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "one" / "two").mkdir(parents=True, exist_ok=True)
+    (library_dir / "foo.txt").write_text("duplicate")
+    (library_dir / "one" / "two" / "bar.md").write_text("duplicate")
+    (library_dir / "baz.txt").write_text("different")
+    (library_dir / "empty.txt").touch()
+    (library_dir / "empty_2.txt").touch()
+    library.add_entries(
+        [
+            Entry(path=Path("baz.txt"), fields=[]),
+            Entry(path=Path("empty.txt"), fields=[]),
+            Entry(path=Path("empty_2.txt"), fields=[]),
+        ]
+    )
+
+    registry = DupeFilesRegistry(library=library)
+    list(registry.scan_dupe_files(max_workers=1))
+
+    # Files of the same size but different contents and empty files aren't duplicates
+    assert len(registry.groups) == 1
+    assert [entry.path for entry in registry.groups[0]] == [
+        Path("foo.txt"),
+        Path("one/two/bar.md"),
+    ]
+
+    # Changed files must be rehashed instead of using the stored hash
+    (library_dir / "foo.txt").write_text("duplicate, but longer")
+    list(registry.scan_dupe_files(max_workers=1))
+    assert registry.groups_count == 0
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_merge_dupe_entries(library: Library):
+    library_dir = unwrap(library.library_dir)
+    (library_dir / "one" / "two").mkdir(parents=True, exist_ok=True)
+    (library_dir / "foo.txt").write_text("duplicate")
+    (library_dir / "one" / "two" / "bar.md").write_text("duplicate")
+
+    registry = DupeFilesRegistry(library=library)
+    list(registry.scan_dupe_files(max_workers=1))
+    list(registry.merge_dupe_entries())
+
+    assert [entry.path for entry in library.all_entries()] == [Path("foo.txt")]
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_scan_similar_images(library: Library):
+    library_dir = unwrap(library.library_dir)
+    gradient = Image.linear_gradient("L").rotate(90).convert("RGB")
+    gradient.save(library_dir / "gradient.png")
+    gradient.resize((64, 64)).save(library_dir / "gradient_small.jpg")
+    gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT).save(library_dir / "flipped.png")
+    ids = library.add_entries(
+        [
+            Entry(path=Path("gradient.png"), fields=[]),
+            Entry(path=Path("gradient_small.jpg"), fields=[]),
+            Entry(path=Path("flipped.png"), fields=[]),
+        ]
+    )
+
+    registry = DupeFilesRegistry(library=library)
+    list(registry.scan_similar_images(max_workers=1))
+
+    assert len(registry.groups) == 1
+    assert {entry.path for entry in registry.groups[0]} == {
+        Path("gradient.png"),
+        Path("gradient_small.jpg"),
+    }
+
+    # The stored hashes are used by the "similar:" search
+    results = library.search_library(
+        BrowsingState.from_search_query(f"similar:{ids[0]}"), page_size=500
+    )
+    assert set(results.ids) == {ids[0], ids[1]}
@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from pathlib import Path
+
+import pytest
+
+from tagstudio.core.utils.encoding import (
+    TEXT_PREFIX_SIZE,
+    detect_char_encoding,
+    read_text_prefix,
+)
+
+
+@pytest.mark.parametrize(
+    ("encoding", "expected"),
+    [("utf-8-sig", "utf-8-sig"), ("utf-16", "utf-16"), ("utf-32", "utf-32")],
+)
+def test_detect_bom_encoding(tmp_path: Path, encoding: str, expected: str):
+    text_path = tmp_path / "bom.txt"
+    text_path.write_text("Grüße, 世界\n" * 10, encoding=encoding)
+
+    assert detect_char_encoding(text_path) == expected
+    text, used_encoding = read_text_prefix(text_path)
+    assert used_encoding == expected
+    assert text.startswith("Grüße, 世界\n")
+
+
+def test_read_text_prefix_is_bounded(tmp_path: Path):
+    text_path = tmp_path / "large.log"
+    # Multi-byte characters that straddle the end of the prefix aren't decoded partially.
+    text_path.write_text("é" * TEXT_PREFIX_SIZE, encoding="utf-8")
+
+    text, encoding = read_text_prefix(text_path, "utf-8")
+    assert encoding == "utf-8"
+    assert text == "é" * (TEXT_PREFIX_SIZE // 2)
+
+    text, _ = read_text_prefix(text_path, "utf-8", size=5)
+    assert text == "éé"
+
+    assert detect_char_encoding(text_path) == "utf-8"
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import random
+
+from PIL import Image
+
+from tagstudio.core.utils.image_hash import BKTree, dhash, hamming_distance
+
+
+def test_dhash_similar_images():
+    gradient = Image.linear_gradient("L").rotate(90)
+    resized = gradient.resize((100, 40))
+    flipped = gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+    assert hamming_distance(int(dhash(gradient), 16), int(dhash(resized), 16)) == 0
+    assert hamming_distance(int(dhash(gradient), 16), int(dhash(flipped), 16)) == 64
+
+
+def test_bk_tree_search():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree[int]()
+    for i, value in enumerate(hashes):
+        tree.add(value, i)
+    assert len(tree) == len(hashes)
+
+    for query in hashes[:20]:
+        for max_distance in (0, 8, 24):
+            expected = {
+                i
+                for i, value in enumerate(hashes)
+                if hamming_distance(query, value) <= max_distance
+            }
+            assert {i for _, i in tree.search(query, max_distance)} == expected
@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from pathlib import Path, PurePosixPath, PureWindowsPath
+
+import pytest
+
+from tagstudio.core.utils.path_set import PathSet
+
+PATHS = [
+    Path("a.jpg"),
+    Path("Photos/a.jpg"),
+    Path("Photos/2024/a.jpg"),
+    Path("Photos/2024/b.jpg"),
+    Path("こんにちは/em–dash.txt"),
+]
+
+
+def test_path_set_membership():
+    paths = PathSet(PATHS)
+    assert len(paths) == len(PATHS)
+    for path in PATHS:
+        assert path in paths
+        assert path.as_posix() in paths
+
+    assert Path("b.jpg") not in paths
+    assert Path("Photos") not in paths
+    assert Path("Photos/2024") not in paths
+    assert Path("Photos/2025/a.jpg") not in paths
+    assert None not in paths
+
+
+def test_path_set_add_discard():
+    paths = PathSet()
+    paths.add(Path("a/b.jpg"))
+    paths.add(Path("a/b.jpg"))
+    paths.add("a/c.jpg")
+    assert len(paths) == 2
+
+    paths.discard(Path("a/b.jpg"))
+    paths.discard(Path("a/missing.jpg"))
+    assert Path("a/b.jpg") not in paths
+    assert len(paths) == 1
+
+    paths.clear()
+    assert Path("a/c.jpg") not in paths
+    assert len(paths) == 0
+
+
+@pytest.mark.parametrize("path_type", [PurePosixPath, PureWindowsPath])
+def test_path_set_matches_set_semantics(path_type: type[PurePosixPath | PureWindowsPath]):
+    stored = [path_type("Photos/IMG.jpg"), path_type("Photos//a/./b.png")]
+    queries = [
+        path_type("Photos/IMG.jpg"),
+        path_type("photos/img.JPG"),
+        path_type("Photos/a/b.png"),
+        path_type("Photos/a/B.png"),
+    ]
+    expected = set(stored)
+    paths = PathSet(stored)
+    for query in queries:
+        assert (query in paths) == (query in expected), query
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import py7zr
+import pytest
+from PIL import Image
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews.renderers import archive
+from tagstudio.previews.renderers.archive import (
+    SevenZipFile,
+    TarFile,
+    archive_thumb,
+    cached_archive_cover,
+    open_archive,
+)
+from tagstudio.previews.renderers.ebook import epub_cover_name, epub_thumb
+
+COMIC_INFO = b"""<?xml version="1.0"?>
+<ComicInfo><Pages><Page Image="0"/><Page Image="1" Type="FrontCover"/></Pages></ComicInfo>
+"""
+
+
+def _png(color: str, size: tuple[int, int] = (400, 300)) -> bytes:
+    data = io.BytesIO()
+    Image.new("RGB", size, color).save(data, "PNG")
+    return data.getvalue()
+
+
+def test_comic_cover_from_comic_info(tmp_path: Path):
+    comic_path = tmp_path / "comic.cbz"
+    with zipfile.ZipFile(comic_path, "w") as comic:
+        comic.writestr("ComicInfo.xml", COMIC_INFO)
+        comic.writestr("001.png", _png("#FF0000"))
+        comic.writestr("002.png", _png("#00FF00"))
+
+    with open_archive(comic_path, ".cbz") as opened:
+        assert epub_cover_name(opened) == "002.png"
+
+    im = epub_thumb(comic_path, ".cbz", size=64)
+    assert im is not None
+    assert im.getpixel((0, 0))[:3] == (0, 255, 0)  # pyright: ignore[reportIndexIssue, reportOptionalSubscript]
+
+
+def test_tar_reads_lazily(tmp_path: Path):
+    tar_path = tmp_path / "pages.tgz"
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for i, data in enumerate([b"notes", _png("#0000FF"), *(_png("#FFFFFF"),) * 20]):
+            info = tarfile.TarInfo(f"{i:03}.{'txt' if i == 0 else 'png'}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    with open_archive(tar_path, ".tgz") as opened:
+        assert isinstance(opened, TarFile)
+        assert archive.first_image_name(opened) == "001.png"
+        assert opened.read("001.png") == _png("#0000FF")
+        # Only the members up to the cover were read.
+        assert len(opened.tar.members) == 2
+
+    im = archive_thumb(tar_path, ext=".tgz")
+    assert im is not None and im.getpixel((0, 0))[:3] == (0, 0, 255)  # pyright: ignore[reportIndexIssue, reportOptionalSubscript]
+
+
+def test_seven_zip_reads_repeatedly(tmp_path: Path):
+    seven_zip_path = tmp_path / "pages.cb7"
+    with py7zr.SevenZipFile(seven_zip_path, "w") as seven_zip:
+        seven_zip.writestr(_png("#FF0000"), "001.png")
+        seven_zip.writestr(_png("#00FF00"), "002.png")
+
+    with open_archive(seven_zip_path, ".cb7") as opened:
+        assert isinstance(opened, SevenZipFile)
+        assert opened.read("002.png") == _png("#00FF00")
+        assert opened.read("001.png") == _png("#FF0000")
+
+
+def test_cached_archive_cover(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    zip_path = library_dir / "pages.zip"
+    with zipfile.ZipFile(zip_path, "w") as pages:
+        pages.writestr("readme.txt", "")
+        pages.writestr("cover.png", _png("#FF0000", (2000, 1000)))
+    library.add_entries([Entry(path=Path("pages.zip"), fields=[])])
+
+    cover = unwrap(cached_archive_cover(library, zip_path))
+    assert cover.member == "cover.png"
+
+    # The stored cover is read without listing the archive again.
+    def fail(*_args: object) -> None:
+        raise AssertionError("The archive was opened")
+
+    with monkeypatch.context() as m:
+        m.setattr(archive, "open_archive", fail)
+        stored = unwrap(cached_archive_cover(library, zip_path))
+    assert stored.member == "cover.png"
+    im = archive_thumb(zip_path, ext=".zip", size=128, cover=stored)
+    assert im is not None
+    # The cover is decoded at a reduced resolution.
+    assert max(im.size) < 2000
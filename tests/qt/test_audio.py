@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews.renderers import audio
+from tagstudio.previews.renderers.audio import (
+    PEAK_COUNT,
+    audio_peaks,
+    audio_waveform_thumb,
+    cached_audio_waveform,
+)
+
+
+def _write_wav(path: Path, sample_width: int, seconds: float = 2.0, rate: int = 44100) -> None:
+    """Write a stereo sine wave that gets louder over time."""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = np.sin(2 * np.pi * 440 * t) * (t / seconds)
+    scale = 2 ** (8 * sample_width - 1) - 1
+    samples = np.repeat((signal * scale).astype(np.int32), 2)
+    data = samples.astype("<i4").tobytes()
+    if sample_width < 4:
+        # Keep the low bytes of each little-endian sample.
+        data = np.frombuffer(data, np.uint8).reshape(-1, 4)[:, :sample_width].tobytes()
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(rate)
+        wav.writeframes(data)
+
+
+@pytest.mark.parametrize("sample_width", [2, 3, 4])
+def test_audio_peaks_wav(tmp_path: Path, sample_width: int):
+    wav_path = tmp_path / "sine.wav"
+    _write_wav(wav_path, sample_width)
+
+    peaks = unwrap(audio_peaks(wav_path, ".wav"))
+    assert len(peaks) == PEAK_COUNT
+    assert peaks[0] < 1000
+    assert peaks[-1] > 32000
+    assert np.all(np.diff(peaks.astype(np.int32)) >= -100)
+
+
+def test_audio_waveform_from_stored_peaks(library: Library, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    _write_wav(library_dir / "sine.wav", 2)
+    library.add_entries([Entry(path=Path("sine.wav"), fields=[])])
+
+    waveform = unwrap(cached_audio_waveform(library, library_dir / "sine.wav"))
+    assert len(waveform.peaks) == PEAK_COUNT * 2
+
+    # Stored peaks are drawn at any size without decoding the file again.
+    def fail(*_args: object) -> None:
+        raise AssertionError("The file was decoded")
+
+    monkeypatch.setattr(audio, "audio_peaks", fail)
+    stored = unwrap(cached_audio_waveform(library, library_dir / "sine.wav"))
+    assert stored.peaks == waveform.peaks
+    for size in (64, 256):
+        im = audio_waveform_thumb(library_dir / "sine.wav", ".wav", size, 1, stored)
+        assert im is not None and im.size == (size, size)
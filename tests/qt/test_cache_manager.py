@@ -0,0 +1,239 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from tagstudio.core.constants import THUMB_CACHE_NAME, TS_FOLDER_NAME
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.qt.app_settings import AppSettings, Theme
+from tagstudio.qt.cache_manager import CacheManager
+
+
+def _noise(size: int = 512) -> Image.Image:
+    """Return an image that doesn't compress well."""
+    return Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+
+
+def test_save_and_get_image(tmp_path: Path):
+    cache = CacheManager(tmp_path)
+    assert cache.get_image("missing") is None
+
+    cache.save_image(Image.new("RGBA", (64, 64), "#FF0000"), "red")
+    assert "red" in cache
+    im = unwrap(cache.get_image("red"))
+    assert im.size == (64, 64)
+    r, g, b = im.convert("RGB").getpixel((32, 32))  # pyright: ignore[reportGeneralTypeIssues]
+    assert r > 250 and g < 5 and b < 5
+    cache.close()
+
+    # The cache is kept in a single file across sessions.
+    cache = CacheManager(tmp_path)
+    assert cache.get_image("red") is not None
+    assert [p.name for p in cache.cache_path.iterdir() if p.is_dir()] == []
+    cache.clear_cache()
+    assert cache.get_image("red") is None
+    assert cache.current_size == 0
+    cache.close()
+
+
+def test_closed_cache(tmp_path: Path):
+    cache = CacheManager(tmp_path)
+    cache.save_image(Image.new("RGB", (64, 64), "#FF0000"), "red")
+    cache.close()
+
+    # Late calls from render threads don't reopen the pack file.
+    assert cache.get_image("red") is None
+    cache.save_image(Image.new("RGB", (64, 64), "#00FF00"), "green")
+    assert "green" not in cache
+    cache.clear_cache()
+    assert cache._connections == []
+
+    cache = CacheManager(tmp_path)
+    assert "red" in cache
+    assert "green" not in cache
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    cache = CacheManager(tmp_path)
+    image = _noise()
+    keys = [str(i) for i in range(6)]
+    cache.save_image(image, keys[0])
+    # Room for five and a half images.
+    cache.max_size = int(cache.current_size * 5.5)
+    for key in keys[1:4]:
+        cache.save_image(image, key)
+    # Using the oldest image keeps it from being evicted.
+    assert cache.get_image(keys[0]) is not None
+    for key in keys[4:]:
+        cache.save_image(image, key)
+
+    assert cache.current_size <= cache.max_size
+    assert keys[0] in cache
+    assert keys[1] not in cache and keys[2] not in cache
+    assert keys[3] in cache and keys[5] in cache
+    cache.close()
+
+    # The recency of images is kept across sessions.
+    cache = CacheManager(tmp_path)
+    assert list(cache._index) == [keys[3], keys[0], keys[4], keys[5]]
+    cache.close()
+
+
+def test_removes_legacy_folders(tmp_path: Path):
+    legacy = tmp_path / TS_FOLDER_NAME / THUMB_CACHE_NAME / "1700000000000"
+    legacy.mkdir(parents=True)
+    Image.new("RGB", (8, 8)).save(legacy / "0123456789abcdef.webp")
+
+    cache = CacheManager(tmp_path)
+    assert not legacy.exists()
+    assert cache.pack_path.is_file()
+    cache.close()
+
+
+def test_recreates_corrupt_pack_file(tmp_path: Path):
+    pack_path = tmp_path / TS_FOLDER_NAME / THUMB_CACHE_NAME / CacheManager.PACK_FILE_NAME
+    pack_path.parent.mkdir(parents=True)
+    pack_path.write_bytes(b"not a database" * 100)
+
+    cache = CacheManager(tmp_path)
+    cache.save_image(Image.new("RGB", (8, 8)), "key")
+    assert cache.get_image("key") is not None
+    cache.close()
+
+
+def test_cache_hits_skip_file_system(
+    library: Library, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    library_dir = unwrap(library.library_dir)
+    filepath = library_dir / "green.png"
+    Image.new("RGB", (64, 64), "#00FF00").save(filepath)
+    entry_id = library.add_entries(
+        [Entry(path=Path("green.png"), fields=[], date_modified=datetime(2020, 1, 1))]
+    )[0]
+    entry = library.get_entries([entry_id])[0]
+
+    cache = CacheManager(tmp_path)
+    renderer = FileRenderer(library, AppSettings())
+    renderer.render(cache, 0, filepath, (64, 64), 1, is_thumb=True, entry=entry)
+    assert cache.current_size > 0
+
+    stats: list[str] = []
+    original_stat = os.stat
+
+    def stat(path: object, *args: object, **kwargs: object) -> os.stat_result:
+        stats.append(str(path))
+        return original_stat(path, *args, **kwargs)  # pyright: ignore
+
+    with monkeypatch.context() as m:
+        m.setattr(os, "stat", stat)
+        renderer.render(cache, 0, filepath, (64, 64), 1, is_thumb=True, entry=entry)
+    assert str(filepath) not in stats
+    cache.close()
+
+
+def test_thumbnail_levels(library: Library, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    filepath = library_dir / "blue.png"
+    Image.new("RGB", (600, 300), "#0000FF").save(filepath)
+    entry_id = library.add_entries(
+        [Entry(path=Path("blue.png"), fields=[], date_modified=datetime(2020, 1, 1))]
+    )[0]
+    entry = library.get_entries([entry_id])[0]
+    cache_key = FileRenderer.thumb_cache_key(filepath, entry.id, entry.date_modified)
+
+    cache = CacheManager(tmp_path)
+    renderer = FileRenderer(library, AppSettings())
+    renderer.render(cache, 0, filepath, (96, 96), 1, is_thumb=True, entry=entry)
+    # Every level is saved from a single render.
+    assert renderer.is_thumb_cached(cache, cache_key)
+    for level in (128, 256, 512):
+        image = unwrap(cache.get_image(FileRenderer.thumb_level_key(cache_key, level)))
+        assert image.size == (level, level // 2)
+
+    loaded: list[str] = []
+    get_image = cache.get_image
+
+    def spy(key: str) -> Image.Image | None:
+        loaded.append(key)
+        return get_image(key)
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("the file was rendered again")
+
+    with monkeypatch.context() as m:
+        m.setattr(cache, "get_image", spy)
+        m.setattr(renderer, "_render", fail)
+        # Other grid sizes and pixel ratios are served by the smallest level that's large enough.
+        for size, dpi_scale, level in ((76, 1, 128), (192, 1, 256), (192, 2, 512), (512, 2, 512)):
+            loaded.clear()
+            image, _, _ = renderer.render(
+                cache, 0, filepath, (size, size), dpi_scale, is_thumb=True, entry=entry
+            )
+            scaled_size = math.ceil(size * dpi_scale)
+            # No thumbnail has been decorated at this size yet.
+            assert loaded == [
+                FileRenderer.decorated_thumb_key(cache_key, scaled_size, dpi_scale, Theme.DARK),
+                FileRenderer.thumb_level_key(cache_key, level),
+            ]
+            assert image.size[0] == scaled_size
+
+        # Larger levels are used when a level was evicted.
+        cache._index.pop(FileRenderer.thumb_level_key(cache_key, 128))
+        loaded.clear()
+        renderer.render(cache, 0, filepath, (112, 112), 1, is_thumb=True, entry=entry)
+        assert loaded[1:] == [
+            FileRenderer.thumb_level_key(cache_key, level) for level in (128, 256)
+        ]
+    cache.close()
+
+
+def test_decorated_thumbnails(library: Library, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    library_dir = unwrap(library.library_dir)
+    filepath = library_dir / "yellow.png"
+    Image.new("RGB", (300, 200), "#FFFF00").save(filepath)
+    entry_id = library.add_entries(
+        [Entry(path=Path("yellow.png"), fields=[], date_modified=datetime(2020, 1, 1))]
+    )[0]
+    entry = library.get_entries([entry_id])[0]
+    cache_key = FileRenderer.thumb_cache_key(filepath, entry.id, entry.date_modified)
+
+    cache = CacheManager(tmp_path)
+    renderer = FileRenderer(library, AppSettings())
+    first, _, _ = renderer.render(
+        cache, 0, filepath, (128, 128), 2, Theme.DARK, is_thumb=True, entry=entry
+    )
+    assert FileRenderer.decorated_thumb_key(cache_key, 256, 2, Theme.DARK) in cache
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("the thumbnail was decorated again")
+
+    with monkeypatch.context() as m:
+        m.setattr(renderer, "_apply_edge", fail)
+        image, _, _ = renderer.render(
+            cache, 0, filepath, (128, 128), 2, Theme.DARK, is_thumb=True, entry=entry
+        )
+    assert image.size == first.size == (256, 256)
+    assert image.mode == "RGBA"
+    # The rounded corners are kept.
+    assert unwrap(image.getpixel((0, 0)))[3] == 0  # pyright: ignore[reportIndexIssue]
+
+    # Other themes are decorated separately.
+    renderer.render(cache, 0, filepath, (128, 128), 2, Theme.LIGHT, is_thumb=True, entry=entry)
+    assert FileRenderer.decorated_thumb_key(cache_key, 256, 2, Theme.LIGHT) in cache
+
+    # Placeholders for files that can't be rendered aren't cached.
+    size = cache.current_size
+    renderer.render(cache, 0, library_dir / "missing.png", (128, 128), 1, is_thumb=True)
+    assert cache.current_size == size
+    cache.close()
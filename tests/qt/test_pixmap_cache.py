@@ -0,0 +1,45 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage, QPixmap
+
+from tagstudio.qt.pixmap_cache import PixmapCache
+
+
+def _pixmap(size: int) -> QPixmap:
+    image = QImage(size, size, QImage.Format.Format_ARGB32)
+    image.fill(0)
+    return QPixmap.fromImage(image)
+
+
+def test_evicts_by_size():
+    pixmap = _pixmap(100)
+    item_size = PixmapCache.pixmap_size(pixmap)
+    assert item_size == 100 * 100 * pixmap.depth() // 8
+
+    cache = PixmapCache(max_size=item_size * 3.5 / PixmapCache.STAT_MULTIPLIER)
+    for key in range(3):
+        cache.put(key, pixmap, QSize(100, 100))
+    # Using the oldest thumbnail keeps it from being evicted.
+    assert cache.get(0) is not None
+    cache.put(3, pixmap, QSize(100, 100))
+
+    assert 0 in cache and 1 not in cache
+    assert len(cache) == 3
+    assert cache.current_size == item_size * 3
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 0, 1)
+    assert cache.get(1) is None
+    assert cache.misses == 1
+
+    # Replacing a thumbnail doesn't count it twice.
+    cache.put(3, pixmap, QSize(100, 100))
+    assert cache.current_size == item_size * 3
+
+    # Thumbnails larger than the whole cache aren't kept.
+    cache.put(4, _pixmap(1000), QSize(1000, 1000))
+    assert 4 not in cache and len(cache) == 3
+
+    cache.clear()
+    assert len(cache) == 0 and cache.current_size == 0
@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import struct
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from tagstudio.core.utils.image_hash import dhash, image_file_hash
+from tagstudio.previews.renderers.raster_image import exif_thumb, fit_size, raster_image_thumb
+
+
+def _gradient(size: tuple[int, int], mode: str = "RGB") -> Image.Image:
+    return Image.linear_gradient("L").resize(size).convert(mode)
+
+
+def _exif_with_thumb(thumb: Image.Image, orientation: int = 1) -> bytes:
+    """Build little-endian EXIF data with an orientation in IFD0 and a JPEG thumbnail in IFD1."""
+    thumb_data = BytesIO()
+    thumb.save(thumb_data, "JPEG")
+    ifd0_offset = 8
+    ifd1_offset = ifd0_offset + 2 + 12 + 4
+    thumb_offset = ifd1_offset + 2 + 2 * 12 + 4
+    data = b"II*\x00" + struct.pack("<I", ifd0_offset)
+    data += struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+    data += struct.pack("<I", ifd1_offset)
+    data += struct.pack("<H", 2)
+    data += struct.pack("<HHII", 0x0201, 4, 1, thumb_offset)
+    data += struct.pack("<HHII", 0x0202, 4, 1, len(thumb_data.getvalue()))
+    data += struct.pack("<I", 0)
+    return b"Exif\x00\x00" + data + thumb_data.getvalue()
+
+
+def test_fit_size():
+    assert fit_size((4000, 3000), 256) == (256, 192)
+    assert fit_size((3000, 4000), 256) == (192, 256)
+    assert fit_size((10000, 10), 256) == (256, 1)
+
+
+def test_jpeg_decoded_at_reduced_scale(tmp_path: Path):
+    filepath = tmp_path / "image.jpg"
+    _gradient((4000, 3000)).save(filepath)
+
+    full = raster_image_thumb(filepath)
+    assert full is not None and full.size == (4000, 3000)
+
+    reduced = raster_image_thumb(filepath, 256)
+    assert reduced is not None
+    # The DCT scaling stops at 1/8, which still covers the requested size.
+    assert reduced.size == (500, 375)
+
+
+@pytest.mark.parametrize("num_resolutions", [2, 6])
+def test_jpeg2000_decoded_at_reduced_scale(tmp_path: Path, num_resolutions: int):
+    filepath = tmp_path / "image.jp2"
+    _gradient((1024, 768)).save(filepath, num_resolutions=num_resolutions)
+
+    image = raster_image_thumb(filepath, 64)
+    assert image is not None
+    if num_resolutions == 6:
+        assert image.size == (64, 48)
+    else:
+        # Files with too few resolution levels are decoded at full size instead.
+        assert image.size[0] >= 64 and image.size[1] >= 48
+
+
+def test_other_formats_shrunk_after_decode(tmp_path: Path):
+    filepath = tmp_path / "image.png"
+    _gradient((1000, 500), "RGBA").save(filepath)
+
+    image = raster_image_thumb(filepath, 100)
+    assert image is not None
+    assert image.mode == "RGB"
+    assert image.size == (100, 50)
+
+
+def test_exif_rotation_kept(tmp_path: Path):
+    filepath = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    _gradient((2000, 1000)).save(filepath, exif=exif)
+
+    image = raster_image_thumb(filepath, 128)
+    assert image is not None
+    assert image.size[0] < image.size[1]
+    assert image.size[1] >= 128
+
+
+@pytest.mark.parametrize(
+    ["name", "image", "orientation"],
+    [
+        ("rotated.jpg", _gradient((2000, 1000)), 6),
+        (
+            "transparent.png",
+            Image.merge(
+                "LA",
+                (_gradient((300, 200), "L"), _gradient((200, 300), "L").rotate(90, expand=True)),
+            ),
+            1,
+        ),
+    ],
+)
+def test_rendered_hash_matches_file_hash(
+    tmp_path: Path, name: str, image: Image.Image, orientation: int
+):
+    filepath = tmp_path / name
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    image.save(filepath, exif=exif)
+
+    # Hashes recorded while rendering and by similar image scans are compared to each other.
+    rendered = raster_image_thumb(filepath, 512)
+    assert rendered is not None
+    assert dhash(rendered) == image_file_hash(filepath)
+
+
+def test_exif_thumbnail_used_when_large_enough(tmp_path: Path):
+    filepath = tmp_path / "image.jpg"
+    # The thumbnail is red so it can be told apart from the grey image.
+    thumb = Image.new("RGB", (320, 240), "#FF0000")
+    _gradient((4000, 3000)).save(filepath, exif=_exif_with_thumb(thumb, orientation=6))
+
+    with Image.open(filepath) as im:
+        assert exif_thumb(im, 512) is None
+        embedded = exif_thumb(im, 256)
+    assert embedded is not None
+    # The orientation of the image is applied to its thumbnail.
+    assert embedded.size == (240, 320)
+
+    image = raster_image_thumb(filepath, 256)
+    assert image is not None
+    r, g, b = image.getpixel((10, 10))  # pyright: ignore[reportGeneralTypeIssues]
+    assert r > 200 and g < 50 and b < 50
+
+    # Too small thumbnails fall back to decoding the image.
+    image = raster_image_thumb(filepath, 512)
+    assert image is not None
+    assert image.size == (750, 1000)
+
+
+def test_letterboxed_exif_thumbnail_ignored(tmp_path: Path):
+    filepath = tmp_path / "image.jpg"
+    _gradient((3000, 2000)).save(filepath, exif=_exif_with_thumb(Image.new("RGB", (320, 240))))
+
+    with Image.open(filepath) as im:
+        assert exif_thumb(im, 128) is None
@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from pathlib import Path
+
+from PIL import Image
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.previews.render_pool import RenderPool
+from tagstudio.qt.app_settings import AppSettings
+
+
+def test_render_pool_matches_in_process(library_dir: Path):
+    image_path = library_dir / "image.png"
+    Image.radial_gradient("L").convert("RGB").save(image_path)
+    in_process = FileRenderer(Library(), AppSettings())._render_file(  # pyright: ignore[reportPrivateUsage]
+        image_path, ".png", 64, 1, with_hash=True
+    )
+    assert in_process is not None
+
+    pool = RenderPool(max_workers=1)
+    try:
+        result = pool.render(image_path, ".png", 64, 1, with_hash=True)
+        assert result is not None
+        image, is_savable_type, image_hash = result
+        assert image.tobytes() == in_process[0].tobytes()
+        assert is_savable_type == in_process[1]
+        assert image_hash == in_process[2]
+
+        # Files that can't be rendered come back empty.
+        assert pool.render(library_dir / "missing.png", ".png", 64, 1) is None
+
+        # The worker processes are stopped while paused, and started again when needed.
+        pool.pause()
+        assert pool.paused
+        assert not pool.is_running
+        # Files are still rendered while paused, without starting the worker processes.
+        paused_result = pool.render(image_path, ".png", 64, 1)
+        assert paused_result is not None
+        assert paused_result[0].tobytes() == in_process[0].tobytes()
+        assert not pool.is_running
+        pool.resume()
+        assert pool.render(image_path, ".png", 64, 1) is not None
+        assert pool.is_running
+    finally:
+        pool.shutdown()
+
+    assert pool.render(image_path, ".png", 64, 1) is None
+
+
+def test_qt_renderers_stay_in_process():
+    assert FileRenderer.needs_qt(".pdf")
+    assert FileRenderer.needs_qt(".svg")
+    assert FileRenderer.needs_qt(".txt")
+    assert not FileRenderer.needs_qt(".png")
+    assert not FileRenderer.needs_qt(".mp4")
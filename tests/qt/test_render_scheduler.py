@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from threading import Thread
+
+import pytest
+
+from tagstudio.core.exceptions import RenderCancelledError
+from tagstudio.previews.render_scheduler import CancelToken, RenderPriority, RenderScheduler
+
+
+def _noop(cancel_token: CancelToken):
+    pass
+
+
+def test_scheduler_priority_order():
+    scheduler = RenderScheduler()
+    scheduler.submit("prefetch", RenderPriority.PREFETCH, _noop)
+    scheduler.submit("visible", RenderPriority.VISIBLE, _noop)
+    scheduler.submit("background", RenderPriority.BACKGROUND, _noop)
+    scheduler.submit("preview", RenderPriority.PREVIEW, _noop)
+    scheduler.submit("visible_2", RenderPriority.VISIBLE, _noop)
+
+    order = []
+    while len(scheduler):
+        job = scheduler.get()
+        assert job is not None
+        order.append(job.key)
+        scheduler.done(job)
+    assert order == ["preview", "visible", "visible_2", "prefetch", "background"]
+
+
+def test_scheduler_dedupe_and_reprioritize():
+    scheduler = RenderScheduler()
+    token = scheduler.submit("a", RenderPriority.PREFETCH, _noop)
+    scheduler.submit("b", RenderPriority.VISIBLE, _noop)
+    # Scrolling "a" into view moves it ahead of the other prefetched jobs, but not twice.
+    assert scheduler.submit("a", RenderPriority.VISIBLE, _noop) is token
+    assert len(scheduler) == 2
+
+    job = scheduler.get()
+    assert job is not None and job.key == "b"
+    job = scheduler.get()
+    assert job is not None and job.key == "a"
+    assert job.priority == RenderPriority.VISIBLE
+
+    # A running job isn't queued again.
+    assert scheduler.submit("a", RenderPriority.VISIBLE, _noop) is token
+    assert len(scheduler) == 0
+    scheduler.done(job)
+
+    # Submitting a pending job again runs the latest function.
+    results: list[str] = []
+    scheduler.submit("e", RenderPriority.PREVIEW, lambda cancel_token: results.append("old"))
+    scheduler.submit("e", RenderPriority.PREVIEW, lambda cancel_token: results.append("new"))
+    job = scheduler.get()
+    assert job is not None and job.key == "e"
+    job.run()
+    scheduler.done(job)
+    assert results == ["new"]
+
+    scheduler.submit("c", RenderPriority.VISIBLE, _noop)
+    scheduler.reprioritize(["c"], RenderPriority.BACKGROUND)
+    scheduler.submit("d", RenderPriority.PREFETCH, _noop)
+    job = scheduler.get()
+    assert job is not None and job.key == "d"
+
+
+def test_scheduler_cancel():
+    scheduler = RenderScheduler()
+    running_token = scheduler.submit("running", RenderPriority.VISIBLE, _noop)
+    running = scheduler.get()
+    assert running is not None
+    kept_token = scheduler.submit("kept", RenderPriority.PREFETCH, _noop)
+    dropped_token = scheduler.submit("dropped", RenderPriority.PREFETCH, _noop)
+    preview_token = scheduler.submit("preview", RenderPriority.PREVIEW, _noop)
+
+    cancelled = scheduler.cancel_all(
+        (RenderPriority.VISIBLE, RenderPriority.PREFETCH), keep=lambda key: key == "kept"
+    )
+    assert set(cancelled) == {"running", "dropped"}
+    assert running_token.cancelled
+    assert dropped_token.cancelled
+    assert not kept_token.cancelled
+    assert not preview_token.cancelled
+    with pytest.raises(RenderCancelledError):
+        running_token.raise_if_cancelled()
+
+    # A cancelled job that is still running is rendered again when submitted.
+    new_token = scheduler.submit("running", RenderPriority.VISIBLE, _noop)
+    assert new_token is not running_token
+    scheduler.done(running)
+
+    keys = []
+    while len(scheduler):
+        job = scheduler.get()
+        assert job is not None
+        keys.append(job.key)
+        scheduler.done(job)
+    assert keys == ["preview", "running", "kept"]
+
+
+def test_scheduler_has_jobs():
+    scheduler = RenderScheduler()
+    urgent = (RenderPriority.PREVIEW, RenderPriority.VISIBLE)
+    scheduler.submit("background", RenderPriority.BACKGROUND, _noop)
+    assert not scheduler.has_jobs(urgent)
+
+    scheduler.submit("visible", RenderPriority.VISIBLE, _noop)
+    assert scheduler.has_jobs(urgent)
+    job = scheduler.get()
+    assert job is not None and job.key == "visible"
+    # Running jobs count until they're done or cancelled.
+    assert scheduler.has_jobs(urgent)
+    scheduler.cancel("visible")
+    assert not scheduler.has_jobs(urgent)
+    scheduler.done(job)
+    assert scheduler.has_jobs((RenderPriority.BACKGROUND,))
+
+
+def test_scheduler_close_wakes_threads():
+    scheduler = RenderScheduler()
+    results = []
+    threads = [Thread(target=lambda: results.append(scheduler.get())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    scheduler.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == [None, None, None]
+
+
+def test_scheduler_wait_running():
+    scheduler = RenderScheduler()
+    scheduler.submit("running", RenderPriority.VISIBLE, _noop)
+    scheduler.submit("pending", RenderPriority.VISIBLE, _noop)
+    job = scheduler.get()
+    assert job is not None
+
+    scheduler.cancel_all()
+    assert not scheduler.wait_running(timeout=0.01)
+    thread = Thread(target=scheduler.done, args=(job,))
+    thread.start()
+    assert scheduler.wait_running(timeout=5)
+    thread.join(timeout=5)
+
+
+def test_scheduler_tracks_replaced_running_jobs():
+    scheduler = RenderScheduler()
+    old_token = scheduler.submit("a", RenderPriority.VISIBLE, _noop)
+    old = scheduler.get()
+    assert old is not None
+    scheduler.cancel("a")
+
+    # The replacement starts while the cancelled job is still finishing up.
+    new_token = scheduler.submit("a", RenderPriority.VISIBLE, _noop)
+    new = scheduler.get()
+    assert new is not None and new.token is new_token
+    scheduler.done(new)
+    assert not scheduler.wait_running(timeout=0.01)
+
+    # Both running jobs are cancelled, including the one that was replaced.
+    scheduler.submit("a", RenderPriority.VISIBLE, _noop)
+    replacement = scheduler.get()
+    assert replacement is not None
+    assert scheduler.cancel_all() == ["a", "a"]
+    assert old_token.cancelled and replacement.token.cancelled
+    scheduler.done(replacement)
+    scheduler.done(old)
+    assert scheduler.wait_running(timeout=0.01)
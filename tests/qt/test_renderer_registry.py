@@ -0,0 +1,251 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews import file_renderer
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.previews.renderer_registry import (
+    BUILTIN_RENDERERS,
+    Renderer,
+    RendererRegistry,
+    RenderRequest,
+)
+from tagstudio.qt.app_settings import AppSettings, Theme
+from tagstudio.qt.cache_manager import CacheManager
+from tagstudio.qt.views.styles.palette import UiColor
+
+
+def test_registry_resolves_builtin_renderers():
+    registry = RendererRegistry(BUILTIN_RENDERERS)
+    expected = {
+        ".png": "image",
+        ".jpeg": "image",
+        ".cr2": "image_raw",
+        ".svg": "image_vector",
+        ".exr": "image_exr",
+        ".mp4": "video",
+        ".pptx": "powerpoint",
+        ".pages": "apple_embedded",
+        ".pxd": "apple_embedded",
+        ".txt": "plaintext",
+        ".ttf": "font",
+        ".mp3": "audio",
+        ".pdf": "pdf",
+        ".zip": "archive",
+    }
+    for ext, name in expected.items():
+        renderer = registry.get(ext)
+        assert renderer is not None, ext
+        assert renderer.name == name, ext
+    assert registry.get(".unknown_ext") is None
+
+    assert registry.resource_id(".png") == "image"
+    assert registry.resource_id(".gif") == "image"
+    assert registry.resource_id(".dll") == "program"
+    assert registry.resource_id(".unknown_ext") == "file_generic"
+
+
+def test_registry_caches_resolution():
+    calls: list[str] = []
+
+    class CountingRenderer(Renderer):
+        def handles(self, ext: str) -> bool:
+            calls.append(ext)
+            return super().handles(ext)
+
+    registry = RendererRegistry(
+        [CountingRenderer(name="counting", render=lambda r: None, extensions=frozenset({".aaa"}))]
+    )
+    for _ in range(3):
+        assert registry.get(".aaa") is not None
+        assert registry.resource_id(".aaa") == "file_generic"
+        assert registry.get(".bbb") is None
+    assert calls == [".aaa", ".bbb"]
+
+
+def test_registered_renderer_takes_precedence(tmp_path: Path):
+    filepath = tmp_path / "image.png"
+    Image.new("RGB", (32, 16), "#FFFFFF").save(filepath)
+    requests: list[RenderRequest] = []
+
+    def render(request: RenderRequest) -> Image.Image | None:
+        requests.append(request)
+        return Image.new("RGB", (request.scaled_size, request.scaled_size), "#FF0000")
+
+    registry = RendererRegistry(BUILTIN_RENDERERS)
+    plugin = Renderer(
+        name="plugin",
+        render=render,
+        extensions=frozenset({".png"}),
+        savable=False,
+        size_dependent=True,
+        icon="plugin_icon",
+    )
+    registry.register(plugin, before="image")
+    assert registry.get(".png") is plugin
+    assert registry.resource_id(".png") == "plugin_icon"
+    assert not registry.is_builtin(plugin)
+
+    registry.unregister("plugin")
+    builtin = registry.get(".png")
+    assert builtin is not None and builtin.name == "image"
+    assert registry.is_builtin(builtin)
+
+
+def test_render_file_uses_capabilities(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def missing(request: RenderRequest) -> Image.Image | None:
+        return None
+
+    def fallback(request: RenderRequest) -> Image.Image | None:
+        return Image.new("RGBA", (8, 8), "#FF0000FF")
+
+    registry = RendererRegistry(
+        [
+            Renderer(
+                name="test",
+                render=missing,
+                extensions=frozenset({".test"}),
+                fallback=Renderer(
+                    name="test_fallback",
+                    render=fallback,
+                    savable=False,
+                    theme_dependent=True,
+                    overlay_color=UiColor.GREEN,
+                ),
+            )
+        ]
+    )
+    monkeypatch.setattr(file_renderer, "renderers", registry)
+    filepath = tmp_path / "file.test"
+    filepath.touch()
+
+    result = FileRenderer(Library(), AppSettings())._render_file(  # pyright: ignore[reportPrivateUsage]
+        filepath, ".test", 16, 1, with_hash=True
+    )
+    assert result is not None
+    image, is_savable_type, image_hash = result
+    assert image.size == (16, 16)
+    assert not is_savable_type
+    assert image_hash is None
+    # The overlay recolors the red foreground.
+    assert image.getpixel((8, 8)) != (255, 0, 0, 255)
+
+
+def test_fallback_probe_is_looked_up_lazily(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    probed: list[Path] = []
+    has_cover: list[bool] = [True]
+
+    def cover(request: RenderRequest) -> Image.Image | None:
+        assert request.probe is None
+        return Image.new("RGB", (8, 8), "#00FF00") if has_cover[0] else None
+
+    def probe(library: Library, filepath: Path) -> object | None:
+        probed.append(filepath)
+        return "peaks"
+
+    def waveform(request: RenderRequest) -> Image.Image | None:
+        assert request.probe == "peaks"
+        return Image.new("RGB", (8, 8), "#0000FF")
+
+    registry = RendererRegistry(
+        [
+            Renderer(
+                name="test",
+                render=cover,
+                extensions=frozenset({".test"}),
+                fallback=Renderer(name="test_waveform", render=waveform, probe=probe),
+            )
+        ]
+    )
+    monkeypatch.setattr(file_renderer, "renderers", registry)
+    filepath = tmp_path / "file.test"
+    filepath.touch()
+    renderer = FileRenderer(Library(), AppSettings())
+
+    image = renderer._render(None, filepath, (16, 16), 1)  # pyright: ignore[reportPrivateUsage]
+    assert image is not None and image.getpixel((8, 8)) == (0, 255, 0)
+    assert probed == []
+
+    has_cover[0] = False
+    image = renderer._render(None, filepath, (16, 16), 1)  # pyright: ignore[reportPrivateUsage]
+    assert image is not None and image.getpixel((8, 8)) == (0, 0, 255)
+    assert probed == [filepath]
+
+
+def test_theme_dependent_thumbnails_are_cached_per_theme(
+    library: Library, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    def themed(request: RenderRequest) -> Image.Image | None:
+        return Image.new("RGB", (8, 8), "#000000" if request.theme is Theme.DARK else "#FFFFFF")
+
+    registry = RendererRegistry(
+        [
+            Renderer(name="test", render=themed, extensions=frozenset({".test"})),
+            Renderer(
+                name="test_themed",
+                render=themed,
+                extensions=frozenset({".themed"}),
+                theme_dependent=True,
+            ),
+        ]
+    )
+    monkeypatch.setattr(file_renderer, "renderers", registry)
+    plain = unwrap(library.library_dir) / "file.test"
+    plain.touch()
+    filepath = unwrap(library.library_dir) / "file.themed"
+    filepath.touch()
+    base_key = FileRenderer.thumb_cache_key(filepath)
+    assert FileRenderer.themed_thumb_key(base_key, plain, Theme.LIGHT) == base_key
+    dark_key = FileRenderer.themed_thumb_key(base_key, filepath, Theme.DARK)
+    light_key = FileRenderer.themed_thumb_key(base_key, filepath, Theme.LIGHT)
+    assert len({base_key, dark_key, light_key}) == 3
+
+    cache = CacheManager(tmp_path)
+    renderer = FileRenderer(library, AppSettings())
+    renderer.render(cache, 0, filepath, (64, 64), 1, Theme.DARK, is_thumb=True)
+    assert renderer.is_thumb_cached(cache, dark_key)
+    assert not renderer.is_thumb_cached(cache, light_key)
+
+    # The dark thumbnail isn't reused, or decorated, for the light theme.
+    image, _, _ = renderer.render(cache, 0, filepath, (64, 64), 1, Theme.LIGHT, is_thumb=True)
+    assert renderer.is_thumb_cached(cache, light_key)
+    assert unwrap(image.getpixel((32, 32)))[:3] == (255, 255, 255)  # pyright: ignore[reportIndexIssue]
+    cache.close()
+
+
+def test_size_dependent_thumbnails_are_not_scaled_up(
+    library: Library, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    sizes: list[int] = []
+
+    def drawn(request: RenderRequest) -> Image.Image | None:
+        sizes.append(request.scaled_size)
+        return Image.new("RGB", (request.scaled_size, request.scaled_size), "#FF0000")
+
+    registry = RendererRegistry(
+        [Renderer(name="test", render=drawn, extensions=frozenset({".test"}), size_dependent=True)]
+    )
+    monkeypatch.setattr(file_renderer, "renderers", registry)
+    filepath = unwrap(library.library_dir) / "file.test"
+    filepath.touch()
+    cache_key = FileRenderer.thumb_cache_key(filepath)
+
+    cache = CacheManager(tmp_path)
+    renderer = FileRenderer(library, AppSettings())
+    largest = renderer._cached_thumb_levels()[-1]  # pyright: ignore[reportPrivateUsage]
+    renderer.render(cache, 0, filepath, (64, 64), 1, is_thumb=True)
+    assert sizes == [largest]
+    assert renderer.is_thumb_cached(cache, cache_key)
+
+    # Sizes past the largest cached level are drawn at that size.
+    image, _, _ = renderer.render(cache, 0, filepath, (largest, largest), 2, is_thumb=True)
+    assert sizes == [largest, largest * 2]
+    assert image.size[0] == largest * 2
+    cache.close()
@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import json
+from collections.abc import Callable, Generator
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread, Timer
+from typing import Any
+
+import pytest
+from PIL import Image
+
+from tagstudio.core.exceptions import RenderCancelledError
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.utils.types import unwrap
+from tagstudio.previews import thumb_pregenerator
+from tagstudio.previews.file_renderer import FileRenderer
+from tagstudio.previews.render_scheduler import RenderPriority, RenderScheduler
+from tagstudio.previews.thumb_pregenerator import ThumbPregenerator
+from tagstudio.qt.app_settings import AppSettings
+from tagstudio.qt.cache_manager import CacheManager
+
+
+@pytest.fixture
+def scheduler(monkeypatch: pytest.MonkeyPatch) -> Generator[RenderScheduler]:
+    """A scheduler with a render thread, on a machine that's plugged in."""
+    monkeypatch.setattr(thumb_pregenerator, "on_battery", lambda: False)
+    scheduler = RenderScheduler()
+
+    def consume():
+        while (job := scheduler.get()) is not None:
+            try:
+                job.run()
+            except RenderCancelledError:
+                pass
+            finally:
+                scheduler.done(job)
+
+    thread = Thread(target=consume)
+    thread.start()
+    yield scheduler
+    scheduler.close()
+    thread.join(timeout=5)
+
+
+def _add_images(library: Library, paths: list[str]) -> dict[str, int]:
+    library_dir = unwrap(library.library_dir)
+    entries: list[Entry] = []
+    for path in paths:
+        filepath = library_dir / path
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        Image.new("RGB", (64, 64), "#0000FF").save(filepath)
+        entries.append(Entry(path=Path(path), fields=[], date_modified=datetime(2020, 1, 1)))
+    return dict(zip(paths, library.add_entries(entries), strict=True))
+
+
+def _is_cached(cache: CacheManager, library: Library, path: str, entry_id: int) -> bool:
+    filepath = unwrap(library.library_dir) / path
+    cache_key = FileRenderer.thumb_cache_key(filepath, entry_id, datetime(2020, 1, 1))
+    return FileRenderer(library, AppSettings()).is_thumb_cached(cache, cache_key)
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_pregenerates_by_locality(library: Library, scheduler: RenderScheduler, tmp_path: Path):
+    ids = _add_images(library, ["b/one.png", "a/two.png", "a/three.png"])
+    cache = CacheManager(tmp_path)
+    pregenerator = ThumbPregenerator(
+        library, FileRenderer(library, AppSettings()), cache, scheduler
+    )
+
+    submitted: list[Any] = []
+    submit = scheduler.submit
+
+    def record(key: Any, priority: RenderPriority, func: Callable[..., Any]):
+        assert priority is RenderPriority.BACKGROUND
+        submitted.append(key)
+        return submit(key, priority, func)
+
+    scheduler.submit = record  # pyright: ignore[reportAttributeAccessIssue]
+    for _ in pregenerator.run():
+        pass
+
+    # Files are read folder by folder, rather than in the order they were added.
+    assert [key[1] for key in submitted[:2]] == sorted([ids["a/two.png"], ids["a/three.png"]])
+    assert submitted[2][1] == ids["b/one.png"]
+    assert all(_is_cached(cache, library, path, entry_id) for path, entry_id in ids.items())
+    # The entries of the fixture have no files, and are skipped.
+    assert (pregenerator.rendered, pregenerator.done, pregenerator.total) == (3, 5, 5)
+    assert not ThumbPregenerator.can_resume(unwrap(library.library_dir))
+
+    # Cached thumbnails aren't rendered again.
+    pregenerator = ThumbPregenerator(
+        library, FileRenderer(library, AppSettings()), cache, scheduler
+    )
+    for _ in pregenerator.run():
+        pass
+    assert pregenerator.rendered == 0
+    cache.close()
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_resumes_from_checkpoint(library: Library, scheduler: RenderScheduler, tmp_path: Path):
+    ids = _add_images(library, ["one.png", "two.png", "three.png"])
+    library_dir = unwrap(library.library_dir)
+    cache = CacheManager(tmp_path)
+    pregenerator = ThumbPregenerator(
+        library, FileRenderer(library, AppSettings()), cache, scheduler
+    )
+
+    # A cancelled job keeps its progress.
+    pregenerator.cancel()
+    assert list(pregenerator.run()) == []
+    assert pregenerator.rendered == 0
+
+    checkpoint_path = ThumbPregenerator.get_checkpoint_path(library_dir)
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    checkpoint_path.write_text(
+        json.dumps(
+            {
+                "version": thumb_pregenerator.CHECKPOINT_VERSION,
+                "after_id": ids["one.png"],
+                "done": 3,
+            }
+        )
+    )
+    assert ThumbPregenerator.can_resume(library_dir)
+
+    pregenerator = ThumbPregenerator(
+        library, FileRenderer(library, AppSettings()), cache, scheduler
+    )
+    for _ in pregenerator.run():
+        pass
+    assert not _is_cached(cache, library, "one.png", ids["one.png"])
+    assert _is_cached(cache, library, "two.png", ids["two.png"])
+    assert _is_cached(cache, library, "three.png", ids["three.png"])
+    assert (pregenerator.rendered, pregenerator.done) == (2, 5)
+    assert not ThumbPregenerator.can_resume(library_dir)
+    cache.close()
+
+
+@pytest.mark.parametrize("library", [TemporaryDirectory()], indirect=True)
+def test_paused_job_queues_nothing(library: Library, scheduler: RenderScheduler, tmp_path: Path):
+    ids = _add_images(library, ["one.png"])
+    cache = CacheManager(tmp_path)
+    pregenerator = ThumbPregenerator(
+        library, FileRenderer(library, AppSettings()), cache, scheduler
+    )
+    pregenerator.pause()
+    assert pregenerator.paused
+
+    submitted_while_paused: list[bool] = []
+    submit = scheduler.submit
+
+    def record(key: Any, priority: RenderPriority, func: Callable[..., Any]):
+        submitted_while_paused.append(pregenerator.paused)
+        return submit(key, priority, func)
+
+    scheduler.submit = record  # pyright: ignore[reportAttributeAccessIssue]
+    timer = Timer(thumb_pregenerator.POLL_INTERVAL * 5, pregenerator.resume)
+    timer.start()
+    for _ in pregenerator.run():
+        pass
+    timer.join()
+
+    assert submitted_while_paused == [False]
+    assert _is_cached(cache, library, "one.png", ids["one.png"])
+    cache.close()
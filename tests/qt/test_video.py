@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: (c) TagStudio Contributors
+# SPDX-License-Identifier: GPL-3.0-only
+
+
+import pickle
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from tagstudio.core.library.alchemy.models import VideoProbe
+from tagstudio.previews.renderers.video import video_thumb
+
+
+def _write_video(path: Path, size: tuple[int, int], frames: int) -> None:
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter.fourcc(*"MJPG"), 10, size)
+    for _ in range(frames):
+        frame = np.zeros((size[1], size[0], 3), np.uint8)
+        frame[:] = (0, 0, 255)
+        writer.write(frame)
+    writer.release()
+
+
+def test_video_thumb_scaled(tmp_path: Path):
+    video_path = tmp_path / "clip.avi"
+    _write_video(video_path, (320, 240), frames=5)
+    probe = VideoProbe(is_readable=True, codec="mjpeg", width=320, height=240)
+
+    # The probe is sent to the render processes.
+    probe = pickle.loads(pickle.dumps(probe))
+
+    im = video_thumb(video_path, 64, probe)
+    assert im is not None
+    assert im.size == (64, 48)
+    r, g, b = im.getpixel((32, 24))  # pyright: ignore[reportGeneralTypeIssues]
+    assert r > 200 and g < 50 and b < 50
+
+    # Frames smaller than the thumbnail aren't upscaled.
+    im = video_thumb(video_path, 1024, probe)
+    assert im is not None and im.size == (320, 240)
+
+    assert video_thumb(video_path, 64, VideoProbe(is_readable=False, is_drm=True)) is None